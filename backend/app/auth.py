@@ -2,8 +2,12 @@
 Autenticação JWT, hash de senha e validação de tokens
 """
 
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
 from uuid import UUID
 
 from jose import JWTError, jwt
@@ -99,6 +103,92 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+# =============================================================================
+# HASH DE SENHA FORA DO EVENT LOOP
+# =============================================================================
+
+class PasswordHashExecutor:
+    """
+    Executor dedicado ao bcrypt (~200 ms de CPU por chamada).
+
+    Os handlers async usam hash_password_async/verify_password_async, que
+    rodam o bcrypt em threads próprias (o bcrypt libera o GIL) em vez de
+    bloquear o event loop. max_workers limita quantos hashes rodam ao mesmo
+    tempo; os excedentes esperam na fila e o tempo de fila é medido.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.queue_ms_total = 0.0
+        self.queue_ms_max = 0.0
+        self.run_ms_total = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    async def run(self, func: Callable, *args):
+        """Executa func(*args) no executor, registrando tempo de fila e de execução"""
+        submitted = time.perf_counter()
+        with self._lock:
+            self.pending += 1
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                finished = time.perf_counter()
+                queue_ms = (started - submitted) * 1000
+                with self._lock:
+                    self.pending -= 1
+                    self.completed += 1
+                    self.queue_ms_total += queue_ms
+                    self.queue_ms_max = max(self.queue_ms_max, queue_ms)
+                    self.run_ms_total += (finished - started) * 1000
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas acumuladas do executor"""
+        with self._lock:
+            completed = self.completed
+            return {
+                "max_workers": self.max_workers,
+                "pending": self.pending,
+                "completed": completed,
+                "queue_ms_avg": round(self.queue_ms_total / completed, 2) if completed else 0.0,
+                "queue_ms_max": round(self.queue_ms_max, 2),
+                "run_ms_avg": round(self.run_ms_total / completed, 2) if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHashExecutor(settings.PASSWORD_HASH_MAX_WORKERS)
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password executado no executor do bcrypt"""
+    return await password_hasher.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password executado no executor do bcrypt"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
 # =============================================================================
 # FUNÇÕES DE TOKEN JWT
 # =============================================================================
@@ -222,6 +312,9 @@ async def get_current_license(
     """
     Dependency que extrai e valida o token JWT do header Authorization.
     Usado para validar licenças na calculadora.
+
+    Aceita também o token de licença assinado (lic1.*); nesse caso o payload
+    vem com offline=True.
     """
     if credentials is None:
         raise HTTPException(
@@ -231,6 +324,20 @@ async def get_current_license(
         )
     
     token = credentials.credentials
+
+    # Token de licença assinado: verificado só com a chave pública (sem banco)
+    from .services.license_token_service import license_token_service
+    if license_token_service.is_license_token(token):
+        payload = license_token_service.verify(token)
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token de licença inválido ou expirado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        payload["offline"] = True
+        return payload
+
     payload = verify_token(token)
     
     if payload is None:
@@ -273,8 +380,9 @@ async def get_current_user(
             detail="Acesso permitido apenas para usuários"
         )
     
-    # Verificar se usuário existe e está ativo
+    # Verificar se usuário existe e está ativo (cache ou banco)
     from .models import User
+    from .services.auth_cache import auth_session_cache
     user_id_str = payload.get("sub")
     
     if not user_id_str:
@@ -291,22 +399,26 @@ async def get_current_user(
             detail="Token inválido: ID do usuário inválido"
         )
     
-    result = await db.execute(
-        select(User).where(User.id == user_id, User.is_active == True)
-    )
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuário não encontrado ou inativo"
+    user = await auth_session_cache.get_user(db, user_id)
+    if user is None:
+        result = await db.execute(
+            select(User).where(User.id == user_id, User.is_active == True)
         )
+        user = result.scalar_one_or_none()
+
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Usuário não encontrado ou inativo"
+            )
+        auth_session_cache.put_user(user)
     
     return {
         "id": str(user.id),
         "email": user.email,
         "name": user.name,
-        "user": user
+        "user": user,
+        "session_token": payload.get("session_token")
     }
 
 
@@ -322,14 +434,14 @@ async def get_current_user_with_session(
     sessão anterior é invalidada, ele perde acesso imediatamente.
     """
     from .models import UserSession
+    from .services.session_activity import session_activity_buffer
+    from .services.auth_cache import auth_session_cache
 
     # 1. Validar JWT (reutiliza lógica existente)
     user_data = await get_current_user(credentials, db)
 
-    # 2. Extrair session_token do JWT
-    token = credentials.credentials
-    payload = verify_token(token)
-    session_token = payload.get("session_token") if payload else None
+    # 2. session_token do JWT (já decodificado em get_current_user)
+    session_token = user_data["session_token"]
 
     if not session_token:
         # JWT antigo sem session_token - forçar re-login
@@ -339,22 +451,26 @@ async def get_current_user_with_session(
             headers={"WWW-Authenticate": "Bearer"}
         )
 
-    # 3. Verificar se sessão existe e está ativa
-    result = await db.execute(
-        select(UserSession).where(
-            UserSession.session_token == session_token,
-            UserSession.user_id == UUID(user_data["id"]),
-            UserSession.is_active == True
+    # 3. Verificar se sessão existe e está ativa (cache ou banco)
+    user_id = UUID(user_data["id"])
+    session = await auth_session_cache.get_session(db, session_token, user_id)
+    if session is None:
+        result = await db.execute(
+            select(UserSession).where(
+                UserSession.session_token == session_token,
+                UserSession.user_id == user_id,
+                UserSession.is_active == True
+            )
         )
-    )
-    session = result.scalar_one_or_none()
+        session = result.scalar_one_or_none()
 
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Sessão encerrada. Sua conta foi acessada em outro dispositivo.",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
+        if not session:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Sessão encerrada. Sua conta foi acessada em outro dispositivo.",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        auth_session_cache.put_session(session)
 
     # 4. Verificar se sessão expirou
     now = datetime.utcnow()
@@ -377,12 +493,15 @@ async def get_current_user_with_session(
             )
 
     # 5. Atualizar last_activity (heartbeat automático)
-    session.last_activity = now
-    await db.commit()
+    # Gravado em lote pelo buffer; requisições de leitura não abrem escrita
+    if session_activity_buffer.enabled:
+        session_activity_buffer.record(session.id, now)
+    else:
+        session.last_activity = now
+        await db.commit()
 
     # 6. Retornar dados do usuário + sessão
     user_data["session"] = session
-    user_data["session_token"] = session_token
     return user_data
 
 
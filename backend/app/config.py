@@ -21,6 +21,15 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 horas
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # Tokens de licença assinados (Ed25519) verificáveis sem o banco.
+    # Chave privada em PEM (PKCS8) ou semente de 32 bytes em base64url
+    LICENSE_SIGNING_KEY: Optional[str] = None
+    LICENSE_TOKEN_TTL_HOURS: int = 24
+    LICENSE_REVOCATION_REFRESH_SECONDS: int = 300
+
+    # Threads dedicadas ao bcrypt (hashes simultâneos; os demais aguardam na fila)
+    PASSWORD_HASH_MAX_WORKERS: int = 2
     
     # Admin
     ADMIN_TOKEN: str = "admin-token-super-secreto-mude-isso"
@@ -66,6 +75,31 @@ class Settings(BaseSettings):
         """Retorna lista de tipos MIME permitidos"""
         return [mt.strip() for mt in self.ALLOWED_MIME_TYPES.split(",")]
 
+    # API SGS do Banco Central (aponte para o servidor local
+    # scripts/bcb_standin_server.py para rodar sem rede)
+    BCB_API_BASE_URL: str = "https://api.bcb.gov.br"
+
+    # Cache em disco das respostas do BCB: off, record ou replay
+    BCB_RESPONSE_CACHE_MODE: str = "off"
+    BCB_RESPONSE_CACHE_DIR: Optional[str] = None
+
+    # Cache das leituras de índices econômicos (segundos; 0 desativa)
+    ECONOMIC_INDEX_CACHE_TTL_SECONDS: int = 3600
+
+    # Intervalo de gravação em lote do last_activity das sessões (segundos;
+    # 0 grava a cada requisição)
+    SESSION_ACTIVITY_FLUSH_SECONDS: int = 60
+
+    # Cache da validação de usuário/sessão nas requisições autenticadas
+    # (segundos; 0 desativa)
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+
+    # Logs de validação de licença gravados em lote (FLUSH_MS 0 grava na requisição)
+    VALIDATION_LOG_BATCH_SIZE: int = 200
+    VALIDATION_LOG_FLUSH_MS: int = 500
+    VALIDATION_LOG_BUFFER_SIZE: int = 10000
+
     # Email SMTP
     SMTP_HOST: str = "smtp.zoho.com"
     SMTP_PORT: int = 587
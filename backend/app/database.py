@@ -131,16 +131,24 @@ async def ensure_economic_indexes_table():
     """
     import sqlalchemy as sa
     async with engine.begin() as conn:
-        # Dropar tabela existente se tiver tipo errado (ENUM em vez de VARCHAR)
-        # Isso corrige o problema de migration anterior
-        await conn.execute(sa.text("""
-            DROP TABLE IF EXISTS economic_indexes CASCADE
-        """))
-
-        # Dropar tipo ENUM se existir
-        await conn.execute(sa.text("""
-            DROP TYPE IF EXISTS economicindextype CASCADE
+        # Migration antiga criou index_type como ENUM: converter para VARCHAR
+        # preservando os dados (antes a tabela era recriada a cada boot)
+        result = await conn.execute(sa.text("""
+            SELECT data_type
+            FROM information_schema.columns
+            WHERE table_name = 'economic_indexes'
+            AND column_name = 'index_type'
         """))
+        row = result.fetchone()
+        if row is not None and row[0] == "USER-DEFINED":
+            await conn.execute(sa.text("""
+                ALTER TABLE economic_indexes
+                ALTER COLUMN index_type TYPE VARCHAR(20) USING lower(index_type::text)
+            """))
+            await conn.execute(sa.text("""
+                DROP TYPE IF EXISTS economicindextype
+            """))
+            print("[OK] Coluna economic_indexes.index_type convertida para VARCHAR")
 
         # Criar tabela economic_indexes com VARCHAR
         await conn.execute(sa.text("""
@@ -149,6 +157,7 @@ async def ensure_economic_indexes_table():
                 index_type VARCHAR(20) NOT NULL,
                 reference_date TIMESTAMP NOT NULL,
                 value VARCHAR(50) NOT NULL,
+                value_numeric NUMERIC(18, 8),
                 source VARCHAR(50) NOT NULL DEFAULT 'BCB',
                 created_at TIMESTAMP NOT NULL DEFAULT NOW()
             )
@@ -169,6 +178,48 @@ async def ensure_economic_indexes_table():
     print("[OK] Tabela economic_indexes verificada/criada com sucesso!")
 
 
+async def ensure_economic_index_accumulated_table():
+    """
+    Garante a coluna economic_indexes.value_numeric e a tabela
+    economic_index_accumulated (fatores mensais e taxa acumulada em 12 meses).
+    O conteúdo é recalculado por BCBService.rebuild_accumulated.
+    """
+    import sqlalchemy as sa
+    async with engine.begin() as conn:
+        await conn.execute(sa.text("""
+            ALTER TABLE economic_indexes
+            ADD COLUMN IF NOT EXISTS value_numeric NUMERIC(18, 8)
+        """))
+
+        # Preencher registros antigos (apenas valores numéricos válidos)
+        await conn.execute(sa.text("""
+            UPDATE economic_indexes
+            SET value_numeric = CAST(value AS NUMERIC)
+            WHERE value_numeric IS NULL
+            AND value ~ '^-?[0-9]+([.][0-9]+)?$'
+        """))
+
+        await conn.execute(sa.text("""
+            CREATE TABLE IF NOT EXISTS economic_index_accumulated (
+                index_id UUID PRIMARY KEY,
+                index_type VARCHAR(20) NOT NULL,
+                reference_date TIMESTAMP NOT NULL,
+                monthly_rate NUMERIC(18, 8),
+                factor NUMERIC(24, 12),
+                accumulated_12m NUMERIC(24, 12) NOT NULL,
+                months_used INTEGER NOT NULL,
+                updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+        """))
+
+        await conn.execute(sa.text("""
+            CREATE INDEX IF NOT EXISTS idx_economic_index_accumulated_type_date
+            ON economic_index_accumulated (index_type, reference_date)
+        """))
+
+    print("[OK] Tabela economic_index_accumulated verificada/criada com sucesso!")
+
+
 async def ensure_reajuste_periodicidade_column():
     """
     Garante que a coluna reajuste_periodicidade existe na tabela contract_versions.
@@ -286,6 +337,350 @@ async def ensure_documents_table():
     print("[OK] Tabela documents verificada/criada com sucesso!")
 
 
+async def ensure_remeasurement_checkpoints_table():
+    """
+    Garante que a tabela remeasurement_checkpoints existe no banco de dados.
+    Usada pelo job de remensuração em modo streaming para retomar execuções.
+    """
+    import sqlalchemy as sa
+    async with engine.begin() as conn:
+        await conn.execute(sa.text("""
+            CREATE TABLE IF NOT EXISTS remeasurement_checkpoints (
+                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                status VARCHAR(20) NOT NULL DEFAULT 'running',
+                last_contract_id VARCHAR(36),
+                pages INTEGER NOT NULL DEFAULT 0,
+                contracts_analyzed INTEGER NOT NULL DEFAULT 0,
+                contracts_remeasured INTEGER NOT NULL DEFAULT 0,
+                contracts_skipped INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                finished_at TIMESTAMP
+            )
+        """))
+
+        await conn.execute(sa.text("""
+            CREATE INDEX IF NOT EXISTS idx_remeasurement_checkpoint_status
+            ON remeasurement_checkpoints(status, started_at)
+        """))
+
+    print("[OK] Tabela remeasurement_checkpoints verificada/criada com sucesso!")
+
+
+async def ensure_contracts_current_version_columns():
+    """
+    Garante as colunas da versão corrente em contracts (current_version_*)
+    e as preenche a partir da versão mais recente de cada contrato.
+    """
+    import sqlalchemy as sa
+    async with engine.begin() as conn:
+        await conn.execute(sa.text("""
+            ALTER TABLE contracts
+            ADD COLUMN IF NOT EXISTS current_version_id UUID,
+            ADD COLUMN IF NOT EXISTS current_version_number INTEGER,
+            ADD COLUMN IF NOT EXISTS current_total_vp DECIMAL(15, 2),
+            ADD COLUMN IF NOT EXISTS current_data_inicio DATE,
+            ADD COLUMN IF NOT EXISTS current_prazo_meses INTEGER
+        """))
+
+        result = await conn.execute(sa.text("""
+            UPDATE contracts c
+            SET current_version_id = cv.id,
+                current_version_number = cv.version_number,
+                current_total_vp = cv.total_vp,
+                current_data_inicio = cv.data_inicio,
+                current_prazo_meses = cv.prazo_meses
+            FROM (
+                SELECT DISTINCT ON (contract_id)
+                    id, contract_id, version_number, total_vp, data_inicio, prazo_meses
+                FROM contract_versions
+                ORDER BY contract_id, version_number DESC
+            ) cv
+            WHERE cv.contract_id = c.id
+            AND c.current_version_id IS DISTINCT FROM cv.id
+        """))
+        print(f"[OK] Versão corrente preenchida em {result.rowcount} contratos")
+
+    print("[OK] Colunas current_version_* de contracts verificadas/criadas com sucesso!")
+
+
+# Número válido no resultados_json (mesma regra de AmortizationEngine.NUMERO_JSON)
+JSON_NUMERIC_PATTERN = '^-?[0-9]+([.][0-9]+)?([eE][-+]?[0-9]+)?$'
+
+
+def _json_numeric(campo: str) -> str:
+    """
+    Expressão SQL que converte e.item->>campo em NUMERIC: ausente ou vazio vale 0
+    e valor não numérico (ex.: "1.234,56") vira NULL em vez de abortar o backfill.
+    """
+    valor = f"e.item->>'{campo}'"
+    return (
+        f"CASE WHEN COALESCE({valor}, '') IN ('', 'false') THEN 0 "
+        f"WHEN {valor} ~ '{JSON_NUMERIC_PATTERN}' THEN ({valor})::numeric END"
+    )
+
+
+async def _create_safe_jsonb_function(conn):
+    """Cria pg_temp.safe_jsonb(text): JSON inválido vira NULL em vez de abortar o backfill"""
+    import sqlalchemy as sa
+    await conn.execute(sa.text("""
+        CREATE OR REPLACE FUNCTION pg_temp.safe_jsonb(value TEXT) RETURNS JSONB AS $$
+        BEGIN
+            RETURN value::jsonb;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE
+    """))
+
+
+async def ensure_contract_versions_summary_columns():
+    """
+    Garante as colunas de resumo da contabilização em contract_versions e
+    preenche as versões existentes a partir do resultados_json.
+    """
+    import sqlalchemy as sa
+    async with engine.begin() as conn:
+        await conn.execute(sa.text("""
+            ALTER TABLE contract_versions
+            ADD COLUMN IF NOT EXISTS despesa_mes1 DECIMAL(15, 2),
+            ADD COLUMN IF NOT EXISTS passivo_cp_inicial DECIMAL(15, 2),
+            ADD COLUMN IF NOT EXISTS passivo_lp_inicial DECIMAL(15, 2),
+            ADD COLUMN IF NOT EXISTS total_juros DECIMAL(15, 2),
+            ADD COLUMN IF NOT EXISTS total_deprec DECIMAL(15, 2),
+            ADD COLUMN IF NOT EXISTS data_fim DATE
+        """))
+
+        await conn.execute(sa.text("""
+            UPDATE contract_versions
+            SET data_fim = (data_inicio + make_interval(months => prazo_meses))::date
+            WHERE data_fim IS NULL
+            AND data_inicio IS NOT NULL
+            AND prazo_meses IS NOT NULL
+        """))
+
+        # Versões antigas: extrai o resumo do JSON uma única vez. Mesma regra de
+        # AmortizationEngine.schedule_summary: JSON inválido, linha que não é
+        # objeto ou valor não numérico deixam o resumo da versão em NULL
+        await _create_safe_jsonb_function(conn)
+        result = await conn.execute(sa.text(f"""
+            UPDATE contract_versions cv
+            SET despesa_mes1 = CASE WHEN s.valido THEN COALESCE(s.despesa_mes1, 0) END,
+                passivo_cp_inicial = CASE WHEN s.valido THEN s.passivo_cp_inicial END,
+                passivo_lp_inicial = CASE WHEN s.valido THEN s.passivo_lp_inicial END,
+                total_juros = CASE WHEN s.valido THEN s.total_juros END,
+                total_deprec = CASE WHEN s.valido THEN s.total_deprec END
+            FROM (
+                SELECT
+                    l.id,
+                    bool_and(
+                        l.objeto
+                        AND l.juros IS NOT NULL
+                        AND l.deprec IS NOT NULL
+                        AND (NOT l.mes1 OR l.desp IS NOT NULL)
+                        AND (l.ord > 1 OR (l.cp IS NOT NULL AND l.lp IS NOT NULL))
+                    ) AS valido,
+                    SUM(l.desp) FILTER (WHERE l.mes1) AS despesa_mes1,
+                    (array_agg(l.cp ORDER BY l.ord))[1] AS passivo_cp_inicial,
+                    (array_agg(l.lp ORDER BY l.ord))[1] AS passivo_lp_inicial,
+                    SUM(l.juros) AS total_juros,
+                    SUM(l.deprec) AS total_deprec
+                FROM (
+                    SELECT
+                        v.id,
+                        e.ord,
+                        jsonb_typeof(e.item) = 'object' AS objeto,
+                        CASE WHEN jsonb_typeof(e.item->'mes') = 'number'
+                            THEN (e.item->>'mes')::numeric = 1
+                            ELSE FALSE
+                        END AS mes1,
+                        {_json_numeric('despTotal')} AS desp,
+                        {_json_numeric('passivoCP')} AS cp,
+                        {_json_numeric('passivoLP')} AS lp,
+                        {_json_numeric('juros')} AS juros,
+                        {_json_numeric('despDeprec')} AS deprec
+                    FROM contract_versions v
+                    CROSS JOIN LATERAL pg_temp.safe_jsonb(v.resultados_json) AS j(doc)
+                    CROSS JOIN LATERAL jsonb_array_elements(
+                        CASE WHEN jsonb_typeof(j.doc->'contabilizacao') = 'array'
+                            THEN j.doc->'contabilizacao'
+                        END
+                    ) WITH ORDINALITY AS e(item, ord)
+                    WHERE v.despesa_mes1 IS NULL
+                ) l
+                GROUP BY l.id
+            ) s
+            WHERE cv.id = s.id
+        """))
+        print(f"[OK] Resumo da contabilização preenchido em {result.rowcount} versões")
+
+    print("[OK] Colunas de resumo de contract_versions verificadas/criadas com sucesso!")
+
+
+async def ensure_contract_schedule_rows_table():
+    """
+    Garante a tabela contract_schedule_rows (cronograma de cada versão em
+    linhas) e preenche as versões existentes a partir do resultados_json.
+    """
+    import sqlalchemy as sa
+    async with engine.begin() as conn:
+        await conn.execute(sa.text("""
+            CREATE TABLE IF NOT EXISTS contract_schedule_rows (
+                version_id UUID NOT NULL REFERENCES contract_versions(id) ON DELETE CASCADE,
+                mes INTEGER NOT NULL,
+                data DATE,
+                passivo_final DECIMAL(15, 2) NOT NULL DEFAULT 0,
+                juros DECIMAL(15, 2) NOT NULL DEFAULT 0,
+                pagamento DECIMAL(15, 2) NOT NULL DEFAULT 0,
+                deprec DECIMAL(15, 2) NOT NULL DEFAULT 0,
+                cp DECIMAL(15, 2) NOT NULL DEFAULT 0,
+                lp DECIMAL(15, 2) NOT NULL DEFAULT 0,
+                PRIMARY KEY (version_id, mes)
+            )
+        """))
+
+        await conn.execute(sa.text("""
+            CREATE INDEX IF NOT EXISTS idx_contract_schedule_rows_data
+            ON contract_schedule_rows (data)
+        """))
+
+        # Versões antigas: explode a contabilização do JSON uma única vez, com as
+        # regras de AmortizationEngine.schedule_rows (linha sem mes inteiro ou com
+        # valor não numérico é descartada; mes repetido fica com a última linha)
+        await _create_safe_jsonb_function(conn)
+        result = await conn.execute(sa.text(f"""
+            INSERT INTO contract_schedule_rows (
+                version_id, mes, data, passivo_final, juros, pagamento, deprec, cp, lp
+            )
+            SELECT DISTINCT ON (l.version_id, l.mes)
+                l.version_id, l.mes, l.data, l.passivo_final, l.juros, l.pagamento,
+                l.deprec, l.cp, l.lp
+            FROM (
+                SELECT
+                    v.id AS version_id,
+                    e.ord,
+                    (e.item->>'mes')::int AS mes,
+                    CASE WHEN e.item->>'data' ~ '^[0-9]{{2}}/[0-9]{{4}}$'
+                        THEN to_date(e.item->>'data', 'MM/YYYY')
+                    END AS data,
+                    {_json_numeric('passivoFinal')} AS passivo_final,
+                    {_json_numeric('juros')} AS juros,
+                    {_json_numeric('pagamento')} AS pagamento,
+                    {_json_numeric('despDeprec')} AS deprec,
+                    {_json_numeric('passivoCP')} AS cp,
+                    {_json_numeric('passivoLP')} AS lp
+                FROM contract_versions v
+                CROSS JOIN LATERAL pg_temp.safe_jsonb(v.resultados_json) AS j(doc)
+                CROSS JOIN LATERAL jsonb_array_elements(
+                    CASE WHEN jsonb_typeof(j.doc->'contabilizacao') = 'array'
+                        THEN j.doc->'contabilizacao'
+                    END
+                ) WITH ORDINALITY AS e(item, ord)
+                WHERE e.item->>'mes' ~ '^[0-9]{{1,9}}$'
+                AND NOT EXISTS (
+                    SELECT 1 FROM contract_schedule_rows r WHERE r.version_id = v.id
+                )
+            ) l
+            WHERE l.passivo_final IS NOT NULL
+            AND l.juros IS NOT NULL
+            AND l.pagamento IS NOT NULL
+            AND l.deprec IS NOT NULL
+            AND l.cp IS NOT NULL
+            AND l.lp IS NOT NULL
+            ORDER BY l.version_id, l.mes, l.ord DESC
+            ON CONFLICT (version_id, mes) DO NOTHING
+        """))
+        print(f"[OK] Cronograma preenchido: {result.rowcount} linhas")
+
+    print("[OK] Tabela contract_schedule_rows verificada/criada com sucesso!")
+
+
+# =============================================================================
+# VERSÃO DO SCHEMA
+# =============================================================================
+
+# Incrementar ao alterar ou incluir funções em SCHEMA_MIGRATIONS
+SCHEMA_VERSION = 4
+
+# DDL idempotente aplicado quando a versão gravada difere de SCHEMA_VERSION
+# (ordem importa: contract_versions precisa existir antes das colunas que dependem dela)
+SCHEMA_MIGRATIONS = [
+    ensure_user_sessions_table,
+    ensure_economic_indexes_table,
+    ensure_economic_index_accumulated_table,
+    ensure_notifications_table,
+    ensure_documents_table,
+    ensure_remeasurement_checkpoints_table,
+    ensure_reajuste_periodicidade_column,
+    ensure_contracts_current_version_columns,
+    ensure_contract_versions_summary_columns,
+    ensure_contract_schedule_rows_table,
+]
+
+
+async def get_schema_version(bind=None):
+    """
+    Lê a versão do schema gravada em schema_version.
+
+    Returns:
+        Versão gravada, ou None se a tabela ainda não existe
+    """
+    import sqlalchemy as sa
+    try:
+        async with (bind or engine).connect() as conn:
+            result = await conn.execute(sa.text(
+                "SELECT version FROM schema_version WHERE id = 1"
+            ))
+            row = result.fetchone()
+    except Exception:
+        return None
+    return row[0] if row else None
+
+
+async def set_schema_version(version: int, bind=None):
+    """Grava a versão do schema (cria a tabela schema_version se necessário)"""
+    import sqlalchemy as sa
+    async with (bind or engine).begin() as conn:
+        await conn.execute(sa.text("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                id INTEGER PRIMARY KEY,
+                version INTEGER NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        await conn.execute(sa.text("""
+            INSERT INTO schema_version (id, version, applied_at)
+            VALUES (1, :version, CURRENT_TIMESTAMP)
+            ON CONFLICT (id) DO UPDATE
+            SET version = excluded.version, applied_at = excluded.applied_at
+        """), {"version": version})
+
+
+async def ensure_schema(bind=None, migrations=None) -> bool:
+    """
+    Garante o schema com uma única leitura no caminho comum.
+
+    Se a versão gravada for igual a SCHEMA_VERSION, nenhum DDL é executado.
+    Caso contrário aplica as migrations (idempotentes, podem rodar em
+    paralelo em várias instâncias) e grava a nova versão.
+
+    Returns:
+        True se as migrations foram aplicadas
+    """
+    current = await get_schema_version(bind)
+    if current == SCHEMA_VERSION:
+        print(f"[OK] Schema na versão {SCHEMA_VERSION}, nenhuma migration necessária")
+        return False
+
+    print(f"[INFO] Schema na versão {current}, aplicando migrations até {SCHEMA_VERSION}...")
+    for migration in (SCHEMA_MIGRATIONS if migrations is None else migrations):
+        await migration()
+    await set_schema_version(SCHEMA_VERSION, bind)
+    print(f"[OK] Schema atualizado para a versão {SCHEMA_VERSION}")
+    return True
+
+
 async def close_db():
     """
     Fecha todas as conexões do pool.
@@ -14,14 +14,12 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from .config import Settings, get_settings
+from .auth import password_hasher
 from .database import (
+    AsyncSessionLocal,
     init_db,
     close_db,
-    ensure_user_sessions_table,
-    ensure_economic_indexes_table,
-    ensure_reajuste_periodicidade_column,
-    ensure_notifications_table,
-    ensure_documents_table,
+    ensure_schema,
 )
 from .routers import (
     licenses_router,
@@ -36,6 +34,10 @@ from .routers import (
 )
 from .routers.contracts import router as contracts_router
 from .routers.debug import router as debug_router
+from .services.bcb_service import BCBService
+from .services.session_activity import session_activity_buffer
+from .services.validation_log_writer import validation_log_writer
+from .services.license_token_service import license_revocations
 
 settings = get_settings()
 
@@ -169,19 +171,44 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
         print("[INFO] Producao: init_db desabilitado (use Alembic migrations)")
 
     # IMPORTANTE: Garantir que tabelas e colunas necessárias existem
+    # (uma leitura de schema_version; DDL só quando a versão muda)
+    schema_migrated = False
     try:
-        await ensure_user_sessions_table()
-        await ensure_economic_indexes_table()
-        await ensure_notifications_table()
-        await ensure_documents_table()
-        await ensure_reajuste_periodicidade_column()
+        schema_migrated = await ensure_schema()
     except Exception as e:
         print(f"[WARN] Erro ao criar tabelas/colunas: {e}")
 
+    # Taxas acumuladas dos índices econômicos (derivadas de economic_indexes).
+    # A sincronização mantém a tabela; recálculo completo só após migration
+    if schema_migrated:
+        try:
+            async with AsyncSessionLocal() as db:
+                await BCBService.rebuild_accumulated(db)
+        except Exception as e:
+            print(f"[WARN] Erro ao recalcular índices acumulados: {e}")
+
+    # Gravação em lote do heartbeat das sessões
+    session_activity_buffer.start()
+
+    # Gravação em lote dos logs de validação de licença
+    validation_log_writer.start()
+
+    # Lista de revogação dos tokens de licença assinados
+    try:
+        async with AsyncSessionLocal() as db:
+            await license_revocations.refresh(db)
+    except Exception as e:
+        print(f"[WARN] Erro ao carregar lista de revogação de licenças: {e}")
+    license_revocations.start()
+
     yield
     
     # Shutdown
     print("[SHUTDOWN] Encerrando API...")
+    await session_activity_buffer.stop()
+    await validation_log_writer.stop()
+    await license_revocations.stop()
+    password_hasher.shutdown()
     await close_db()
 
 
@@ -325,7 +352,9 @@ async def health_check():
     """
     return {
         "status": "healthy",
-        "environment": settings.ENVIRONMENT
+        "environment": settings.ENVIRONMENT,
+        # Fila do bcrypt: queue_ms alto indica rajada de logins acima do limite
+        "password_hashing": password_hasher.stats()
     }
 
 
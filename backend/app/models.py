@@ -8,7 +8,7 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from sqlalchemy import (
-    Column, String, Boolean, DateTime, Integer, 
+    Column, String, Boolean, Date, DateTime, Integer, Numeric,
     Enum as SQLEnum, ForeignKey, Text, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
@@ -445,6 +445,14 @@ class Contract(Base):
 
     numero_sequencial = Column(Integer, nullable=True)
 
+    # Versão mais recente (contract_versions), mantida por
+    # ContractRepository.refresh_current_version a cada versão criada ou excluída
+    current_version_id = Column(UUID(as_uuid=True), nullable=True)
+    current_version_number = Column(Integer, nullable=True)
+    current_total_vp = Column(Numeric(15, 2), nullable=True)
+    current_data_inicio = Column(Date, nullable=True)
+    current_prazo_meses = Column(Integer, nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, nullable=True)
     deleted_at = Column(DateTime, nullable=True)
@@ -547,6 +555,9 @@ class EconomicIndex(Base):
     # Valor do índice (percentual)
     value = Column(String(50), nullable=False)  # String para preservar precisão
 
+    # Mesmo valor em NUMERIC (preenchido na sincronização; NULL se inválido)
+    value_numeric = Column(Numeric(18, 8), nullable=True)
+
     # Fonte dos dados
     source = Column(String(50), nullable=False, default="BCB")
 
@@ -564,6 +575,37 @@ class EconomicIndex(Base):
         return f"<EconomicIndex(type='{self.index_type}', date='{self.reference_date}', value='{self.value}')>"
 
 
+class EconomicIndexAccumulated(Base):
+    """
+    Fator mensal e taxa acumulada em 12 meses de cada registro de economic_indexes.
+    Recalculado pela sincronização com o BCB (BCBService.refresh_accumulated), de
+    modo que a taxa anual usada na remensuração é uma única consulta indexada.
+    """
+    __tablename__ = "economic_index_accumulated"
+
+    # Registro de economic_indexes correspondente
+    index_id = Column(UUID(as_uuid=True), primary_key=True)
+
+    index_type = Column(String(20), nullable=False)
+    reference_date = Column(DateTime, nullable=False)
+
+    # Taxa do mês (%) e fator (1 + taxa/100); NULL se o valor do BCB for inválido
+    monthly_rate = Column(Numeric(18, 8), nullable=True)
+    factor = Column(Numeric(24, 12), nullable=True)
+
+    # Taxa acumulada (%) dos 12 meses terminados no mês do registro
+    accumulated_12m = Column(Numeric(24, 12), nullable=False)
+
+    # Registros na janela de 12 meses
+    months_used = Column(Integer, nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_economic_index_accumulated_type_date', 'index_type', 'reference_date'),
+    )
+
+
 # =============================================================================
 # NOTIFICATIONS (SISTEMA DE ALERTAS)
 # =============================================================================
@@ -697,3 +739,43 @@ class Document(Base):
 
     def __repr__(self):
         return f"<Document(filename='{self.filename}', contract_id='{self.contract_id}')>"
+
+
+# =============================================================================
+# CHECKPOINTS DO JOB DE REMENSURAÇÃO
+# =============================================================================
+
+class RemeasurementCheckpoint(Base):
+    """
+    Progresso do job de remensuração em modo streaming.
+    Gravado a cada página de contratos; uma execução interrompida retoma
+    a partir de last_contract_id.
+    """
+    __tablename__ = "remeasurement_checkpoints"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # Status: running (em andamento ou interrompido) / completed
+    status = Column(String(20), nullable=False, default="running")
+
+    # Cursor keyset: último contrato da última página concluída
+    last_contract_id = Column(String(36), nullable=True)
+
+    # Contadores acumulados da execução
+    pages = Column(Integer, nullable=False, default=0)
+    contracts_analyzed = Column(Integer, nullable=False, default=0)
+    contracts_remeasured = Column(Integer, nullable=False, default=0)
+    contracts_skipped = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+
+    # Datas
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('idx_remeasurement_checkpoint_status', 'status', 'started_at'),
+    )
+
+    def __repr__(self):
+        return f"<RemeasurementCheckpoint(status='{self.status}', last_contract_id='{self.last_contract_id}')>"
@@ -2,11 +2,11 @@
 Repository para operações de banco de dados de contratos
 """
 
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, text, bindparam
 
 from ..models import Contract, User
 
@@ -89,3 +89,64 @@ class ContractRepository:
         """Soft delete de um contrato"""
         contract.is_deleted = True
         await db.commit()
+    
+    @staticmethod
+    async def refresh_current_version(
+        db: AsyncSession,
+        contract_ids: Iterable[str]
+    ) -> None:
+        """
+        Atualiza o ponteiro para a versão mais recente (current_version_*)
+        dos contratos, após criar ou excluir versões.
+        
+        Roda na transação do chamador (sem commit). Contratos sem versões
+        ficam com as colunas em NULL.
+        """
+        ids = list(dict.fromkeys(str(contract_id) for contract_id in contract_ids))
+        if not ids:
+            return
+        
+        query = text("""
+            UPDATE contracts
+            SET (
+                current_version_id, current_version_number, current_total_vp,
+                current_data_inicio, current_prazo_meses
+            ) = (
+                SELECT cv.id, cv.version_number, cv.total_vp, cv.data_inicio, cv.prazo_meses
+                FROM contract_versions cv
+                WHERE cv.contract_id = contracts.id
+                ORDER BY cv.version_number DESC
+                LIMIT 1
+            )
+            WHERE id IN :contract_ids
+        """).bindparams(bindparam("contract_ids", expanding=True))
+        await db.execute(query, {"contract_ids": ids})
+    
+    @staticmethod
+    async def insert_schedule_rows(
+        db: AsyncSession,
+        rows: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Grava as linhas do cronograma em contract_schedule_rows (sem commit).
+        
+        Meses já gravados para a versão são ignorados (ON CONFLICT), como no backfill.
+        
+        Args:
+            rows: Dicts com version_id e as colunas de AmortizationEngine.schedule_rows
+        """
+        if not rows:
+            return
+        
+        await db.execute(
+            text("""
+                INSERT INTO contract_schedule_rows (
+                    version_id, mes, data, passivo_final, juros, pagamento, deprec, cp, lp
+                )
+                VALUES (
+                    :version_id, :mes, :data, :passivo_final, :juros, :pagamento, :deprec, :cp, :lp
+                )
+                ON CONFLICT (version_id, mes) DO NOTHING
+            """),
+            rows
+        )
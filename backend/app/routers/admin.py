@@ -22,6 +22,8 @@ from ..schemas import (
 )
 from ..auth import get_current_admin, get_superadmin
 from .. import crud
+from ..services.auth_cache import auth_session_cache
+from ..services.license_token_service import license_revocations
 
 # Router com autenticação JWT
 router = APIRouter(
@@ -138,6 +140,9 @@ async def revoke_license(
             detail="Licença não encontrada"
         )
     
+    # Tokens de licença já emitidos deixam de valer nesta instância
+    license_revocations.add(license.key)
+    
     return AdminActionResponse(
         success=True,
         message=f"Licença {body.key} revogada com sucesso",
@@ -173,6 +178,8 @@ async def reactivate_license(
             detail="Licença não encontrada"
         )
     
+    license_revocations.discard(license.key)
+    
     return AdminActionResponse(
         success=True,
         message=f"Licença {body.key} reativada com sucesso",
@@ -279,6 +286,7 @@ async def delete_license(
     
     await db.delete(license)
     await db.flush()
+    license_revocations.add(license.key)
     
     return AdminActionResponse(
         success=True,
@@ -300,7 +308,7 @@ from ..schemas import (
     AdminUserUpdate,
     AdminUserResponse,
 )
-from ..auth import hash_password, get_current_admin, get_superadmin
+from ..auth import hash_password_async, get_current_admin, get_superadmin
 
 
 @router.get(
@@ -430,6 +438,7 @@ async def update_user(
         user.email_verified = email_verified
     
     await db.commit()
+    auth_session_cache.invalidate_user(user.id)
     await db.refresh(user)
     
     return UserResponse.model_validate(user)
@@ -474,6 +483,7 @@ async def delete_user(
     email = user.email
     await db.delete(user)
     await db.commit()
+    auth_session_cache.invalidate_user(user_uuid)
     
     return AdminActionResponse(
         success=True,
@@ -627,7 +637,7 @@ async def create_admin(
     admin = AdminUser(
         username=body.username,
         email=body.email.lower(),
-        password_hash=hash_password(body.password),
+        password_hash=await hash_password_async(body.password),
         role=AdminRole(body.role.value),
         is_active=True
     )
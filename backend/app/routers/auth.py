@@ -32,8 +32,8 @@ from ..schemas import (
     LicenseStatusEnum,
 )
 from ..auth import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
     create_admin_token,
     create_user_token,
     create_access_token,
@@ -41,6 +41,8 @@ from ..auth import (
     get_current_user,
 )
 from ..config import get_settings
+from ..services.session_activity import session_activity_buffer
+from ..services.auth_cache import auth_session_cache
 
 settings = get_settings()
 
@@ -89,7 +91,7 @@ async def admin_login(
         )
     
     # Verificar senha
-    if not verify_password(body.password, admin.password_hash):
+    if not await verify_password_async(body.password, admin.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos"
@@ -167,14 +169,14 @@ async def admin_change_password(
     admin = admin_data["admin"]
     
     # Verificar senha atual
-    if not verify_password(body.current_password, admin.password_hash):
+    if not await verify_password_async(body.current_password, admin.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Senha atual incorreta"
         )
     
     # Atualizar senha
-    admin.password_hash = hash_password(body.new_password)
+    admin.password_hash = await hash_password_async(body.new_password)
     await db.commit()
     
     return {
@@ -224,7 +226,7 @@ async def register_user(
     user = User(
         email=body.email.lower(),
         name=body.name,
-        password_hash=hash_password(body.password),
+        password_hash=await hash_password_async(body.password),
         company_name=body.company_name,
         is_active=True,
         email_verified=False,
@@ -302,7 +304,7 @@ async def user_login(
         )
     
     # Verificar senha
-    if not verify_password(body.password, user.password_hash):
+    if not await verify_password_async(body.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos"
@@ -407,6 +409,10 @@ async def user_login(
     db.add(new_session)
     await db.commit()
 
+    # Login em outro dispositivo: a sessão antiga perde acesso imediatamente
+    if len(active_sessions) >= max_sessions:
+        auth_session_cache.invalidate_session(oldest_session.session_token)
+
     # Gerar token JWT COM o session_token incluído
     token = create_user_token(user.id, user.email, session_token=session_token)
 
@@ -673,7 +679,8 @@ async def validate_license_by_user_token(
     Retorna os dados da licença válida ou erro se não houver licença ativa.
     """
     import traceback
-    from ..crud import update_license_validation, log_validation
+    from ..crud import update_license_validation
+    from ..services.validation_log_writer import validation_log_writer
     
     try:
         user = user_data["user"]
@@ -744,7 +751,7 @@ async def validate_license_by_user_token(
             )
             
             # Criar log de validação
-            await log_validation(
+            await validation_log_writer.log(
                 db,
                 license_key=license.key,
                 success=True,
@@ -837,6 +844,7 @@ async def user_logout(
     """
     Logout do usuário.
     """
+    auth_session_cache.invalidate_session(user_data.get("session_token"))
     return {
         "success": True,
         "message": "Logout realizado com sucesso"
@@ -859,7 +867,7 @@ async def user_change_password(
     user = user_data["user"]
     
     # Verificar senha atual
-    if not verify_password(body.current_password, user.password_hash):
+    if not await verify_password_async(body.current_password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Senha atual incorreta"
@@ -873,7 +881,7 @@ async def user_change_password(
         )
 
     # Atualizar senha e limpar flag de troca obrigatória
-    user.password_hash = hash_password(body.new_password)
+    user.password_hash = await hash_password_async(body.new_password)
     user.password_must_change = False  # Senha foi alterada, libera acesso
     user.password_changed_at = datetime.utcnow()  # Registra data da troca
     await db.commit()
@@ -971,7 +979,7 @@ async def reset_password(
         )
 
     # Atualizar senha
-    user.password_hash = hash_password(body.new_password)
+    user.password_hash = await hash_password_async(body.new_password)
     user.password_changed_at = datetime.utcnow()
     user.password_must_change = False  # Usuário já trocou a senha
 
@@ -1054,6 +1062,7 @@ async def register_session(
         oldest_session = active_sessions[-1]
         oldest_session.is_active = False
         await db.commit()
+        auth_session_cache.invalidate_session(oldest_session.session_token)
 
         print(f"[INFO] Sessão antiga invalidada para usuário {user.email} (device: {oldest_session.device_name})")
 
@@ -1164,6 +1173,7 @@ async def session_heartbeat(
         if expires_at is None or expires_at < now:
             session.is_active = False
             await db.commit()
+            auth_session_cache.invalidate_session(session.session_token)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Sessão expirada. Faça login novamente."
@@ -1225,6 +1235,8 @@ async def terminate_session(
     # Marcar como inativa
     session.is_active = False
     await db.commit()
+    auth_session_cache.invalidate_session(session.session_token)
+    session_activity_buffer.discard(session.id)
 
     print(f"[OK] Sessão encerrada para {user.email} (device: {session.device_name})")
 
@@ -1266,7 +1278,10 @@ async def list_active_sessions(
                 "session_token": s.session_token,
                 "device_name": s.device_name,
                 "ip_address": s.ip_address,
-                "last_activity": s.last_activity.isoformat(),
+                # Atividade ainda no buffer é mais recente que a do banco
+                "last_activity": (
+                    session_activity_buffer.last_activity(s.id) or s.last_activity
+                ).isoformat(),
                 "created_at": s.created_at.isoformat(),
                 "expires_at": s.expires_at.isoformat()
             }
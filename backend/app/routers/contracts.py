@@ -17,6 +17,9 @@ from pydantic import BaseModel
 from ..database import get_db
 from ..auth import get_current_user, get_current_user_with_session
 from ..models import User, License, LicenseStatus, Contract, ContractStatus
+from ..services.recalculation_service import RecalculationService
+from ..services.amortization_engine import AmortizationEngine
+from ..repositories.contracts import ContractRepository
 
 
 router = APIRouter(prefix="/api/contracts", tags=["Contratos"])
@@ -112,6 +115,12 @@ class ContractVersionCreate(BaseModel):
     notas: Optional[str] = None
 
 
+class ContractRecalculateRequest(BaseModel):
+    contract_ids: Optional[List[str]] = None
+    all_contracts: bool = False  # True = todos os contratos do usuário
+    include_schedule: bool = False  # True = retorna resultados_json completo
+
+
 class ContractVersionResponse(BaseModel):
     id: str
     contract_id: str
@@ -537,12 +546,14 @@ async def create_version(
         INSERT INTO contract_versions (
             contract_id, version_number, version_id, data_inicio, prazo_meses, carencia_meses,
             parcela_inicial, taxa_desconto_anual, reajuste_tipo, reajuste_periodicidade, reajuste_valor,
-            mes_reajuste, resultados_json, total_vp, total_nominal, avp, notas
+            mes_reajuste, resultados_json, total_vp, total_nominal, avp, notas,
+            despesa_mes1, passivo_cp_inicial, passivo_lp_inicial, total_juros, total_deprec, data_fim
         )
         VALUES (
             :contract_id, :version_number, :version_id, :data_inicio, :prazo_meses, :carencia_meses,
             :parcela_inicial, :taxa_desconto_anual, :reajuste_tipo, :reajuste_periodicidade, :reajuste_valor,
-            :mes_reajuste, :resultados_json, :total_vp, :total_nominal, :avp, :notas
+            :mes_reajuste, :resultados_json, :total_vp, :total_nominal, :avp, :notas,
+            :despesa_mes1, :passivo_cp_inicial, :passivo_lp_inicial, :total_juros, :total_deprec, :data_fim
         )
         RETURNING id, contract_id, version_number, version_id, data_inicio, prazo_meses,
                   total_vp, notas, archived_at, created_at
@@ -560,6 +571,11 @@ async def create_version(
             except ValueError:
                 data_inicio_date = None
     
+    # Resumo da contabilização em colunas (dashboards não precisam ler o JSON)
+    resumo = AmortizationEngine.schedule_summary(
+        data.resultados_json, data_inicio_date, data.prazo_meses
+    )
+    
     result = await db.execute(
         text(insert_query),
         {
@@ -579,10 +595,18 @@ async def create_version(
             "total_vp": data.total_vp,
             "total_nominal": data.total_nominal,
             "avp": data.avp,
-            "notas": data.notas
+            "notas": data.notas,
+            **resumo
         }
     )
     row = result.fetchone()
+    
+    # Cronograma em linhas (relatórios de carteira agregam em SQL)
+    await ContractRepository.insert_schedule_rows(db, [
+        {**linha, "version_id": row[0]}
+        for linha in AmortizationEngine.schedule_rows(data.resultados_json)
+    ])
+    await ContractRepository.refresh_current_version(db, [contract_id])
     await db.commit()
     
     return {
@@ -637,5 +661,61 @@ async def delete_version(
             detail="Versão não encontrada"
         )
     
+    await ContractRepository.refresh_current_version(db, [contract_id])
     await db.commit()
     return None
+
+
+# =============================================================================
+# RECÁLCULO EM LOTE
+# =============================================================================
+
+@router.post(
+    "/recalculate",
+    summary="Recalcular Contratos em Lote",
+    description="Recalcula a última versão de vários contratos (ou de todos) em uma única passada"
+)
+async def recalculate_contracts(
+    data: ContractRecalculateRequest,
+    user_data: dict = Depends(get_current_user_with_session),
+    db: AsyncSession = Depends(get_db)
+):
+    """Recalcula as tabelas de amortização da carteira do usuário no servidor"""
+    user = user_data["user"]
+
+    # Verificar licença ativa
+    user_license = await get_active_license(db, user)
+    if not user_license:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Você precisa de uma licença ativa para gerenciar contratos"
+        )
+
+    if not data.all_contracts and not data.contract_ids:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Informe contract_ids ou all_contracts=true"
+        )
+
+    contract_ids = None
+    if not data.all_contracts:
+        try:
+            contract_ids = list(dict.fromkeys(str(UUID(cid)) for cid in data.contract_ids))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="contract_ids contém IDs inválidos"
+            )
+
+    try:
+        return await RecalculationService.recalculate_portfolio(
+            db,
+            user_id=str(user.id),
+            contract_ids=contract_ids,
+            include_schedule=data.include_schedule
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
@@ -54,13 +54,7 @@ async def debug_contracts(
             cv.data_inicio,
             cv.prazo_meses
         FROM contracts c
-        LEFT JOIN LATERAL (
-            SELECT cv.*
-            FROM contract_versions cv
-            WHERE cv.contract_id = c.id
-            ORDER BY cv.version_number DESC
-            LIMIT 1
-        ) cv ON true
+        LEFT JOIN contract_versions cv ON cv.id = c.current_version_id
         WHERE c.user_id = CAST(:user_id AS uuid)
         ORDER BY c.created_at DESC
     """)
@@ -88,13 +82,7 @@ async def debug_contracts(
             COUNT(DISTINCT c.id) as total_contracts,
             COALESCE(SUM(cv.total_vp), 0) as total_passivos
         FROM contracts c
-        LEFT JOIN LATERAL (
-            SELECT cv.*
-            FROM contract_versions cv
-            WHERE cv.contract_id = c.id
-            ORDER BY cv.version_number DESC
-            LIMIT 1
-        ) cv ON true
+        LEFT JOIN contract_versions cv ON cv.id = c.current_version_id
         WHERE c.user_id = CAST(:user_id AS uuid)
             AND c.is_deleted = false
             AND c.status = 'active'
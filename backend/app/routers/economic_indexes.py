@@ -1,11 +1,18 @@
 """
 Endpoints para índices econômicos (BCB)
 SELIC, IGPM, IPCA, CDI, INPC, TR
+
+As leituras públicas são servidas do cache em memória (com ETag e
+Last-Modified), invalidado quando uma sincronização grava alterações.
 """
 
-from typing import Optional
+import json
+from datetime import date
+from email.utils import format_datetime
+from typing import Any, Awaitable, Callable, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database import get_db
@@ -13,10 +20,13 @@ from ..schemas import (
     EconomicIndexResponse,
     EconomicIndexListResponse,
     EconomicIndexLatestResponse,
+    EconomicIndexAccumulatedResponse,
     EconomicIndexSyncResponse,
     EconomicIndexTypeEnum,
 )
 from ..services.bcb_service import BCBService
+from ..services.remeasurement_service import RemeasurementService
+from ..services.economic_index_cache import economic_index_cache
 from ..auth import verify_admin_token
 
 router = APIRouter(
@@ -25,6 +35,41 @@ router = APIRouter(
 )
 
 
+async def cached_json_response(
+    request: Request,
+    key: str,
+    build: Callable[[], Awaitable[Any]]
+) -> Response:
+    """
+    Serve a resposta a partir do cache de leituras (economic_index_cache).
+
+    Em cache miss, `build` consulta o banco e o resultado serializado é
+    guardado. Responde 304 quando If-None-Match / If-Modified-Since
+    indicam que o cliente já tem a versão atual. Erros (HTTPException)
+    não são armazenados.
+    """
+    entry = economic_index_cache.get(key)
+    if entry is None:
+        content = await build()
+        body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+        entry = economic_index_cache.put(key, body)
+
+    headers = {
+        "ETag": entry['etag'],
+        "Last-Modified": format_datetime(entry['last_modified'], usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+    if economic_index_cache.is_not_modified(
+        entry,
+        request.headers.get("if-none-match"),
+        request.headers.get("if-modified-since")
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=entry['body'], media_type="application/json", headers=headers)
+
+
 @router.get(
     "",
     response_model=EconomicIndexListResponse,
@@ -32,6 +77,7 @@ router = APIRouter(
     description="Lista índices econômicos armazenados no banco de dados"
 )
 async def list_indexes(
+    request: Request,
     index_type: Optional[str] = Query(
         None,
         description="Filtrar por tipo (selic, igpm, ipca, cdi, inpc, tr)"
@@ -60,17 +106,21 @@ async def list_indexes(
                 detail=f"Tipo de índice inválido. Use: {', '.join(valid_types)}"
             )
 
-    indexes, total = await BCBService.get_index_history(
-        db=db,
-        index_type=index_type,
-        limit=limit,
-        offset=offset
-    )
+    async def build() -> EconomicIndexListResponse:
+        indexes, total = await BCBService.get_index_history(
+            db=db,
+            index_type=index_type,
+            limit=limit,
+            offset=offset
+        )
+
+        return EconomicIndexListResponse(
+            indexes=[EconomicIndexResponse.model_validate(idx) for idx in indexes],
+            total=total
+        )
 
-    return EconomicIndexListResponse(
-        indexes=[EconomicIndexResponse.model_validate(idx) for idx in indexes],
-        total=total
-    )
+    key = f"list:{(index_type or '').lower()}:{limit}:{offset}"
+    return await cached_json_response(request, key, build)
 
 
 @router.get(
@@ -97,6 +147,7 @@ async def list_index_types():
     description="Retorna o valor mais recente de um índice econômico"
 )
 async def get_latest_index(
+    request: Request,
     index_type: str,
     db: AsyncSession = Depends(get_db)
 ):
@@ -117,20 +168,78 @@ async def get_latest_index(
             detail=f"Tipo de índice inválido. Use: {', '.join(valid_types)}"
         )
 
-    latest = await BCBService.get_latest_value(db, index_type)
+    async def build() -> EconomicIndexLatestResponse:
+        latest = await BCBService.get_latest_value(db, index_type)
+
+        if not latest:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Nenhum valor encontrado para índice '{index_type}'. Execute sync primeiro."
+            )
+
+        return EconomicIndexLatestResponse(
+            index_type=latest.index_type,
+            reference_date=latest.reference_date,
+            value=latest.value,
+            source=latest.source
+        )
+
+    return await cached_json_response(request, f"latest:{index_type.lower()}", build)
 
-    if not latest:
+
+@router.get(
+    "/{index_type}/accumulated",
+    response_model=EconomicIndexAccumulatedResponse,
+    summary="Taxa acumulada em 12 meses",
+    description="Retorna a taxa acumulada dos 12 meses terminados no último valor publicado"
+)
+async def get_accumulated_index(
+    request: Request,
+    index_type: str,
+    reference_date: Optional[date] = Query(None, description="Data de referência (padrão: hoje)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Retorna a taxa acumulada em 12 meses de um índice econômico.
+
+    Endpoint público. A taxa é pré-calculada na sincronização com o BCB.
+
+    - **index_type**: Tipo do índice (selic, igpm, ipca, cdi, inpc, tr)
+    - **reference_date**: Considera apenas valores publicados até esta data
+    """
+    try:
+        EconomicIndexTypeEnum(index_type.lower())
+    except ValueError:
+        valid_types = [e.value for e in EconomicIndexTypeEnum]
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Nenhum valor encontrado para índice '{index_type}'. Execute sync primeiro."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo de índice inválido. Use: {', '.join(valid_types)}"
         )
 
-    return EconomicIndexLatestResponse(
-        index_type=latest.index_type,
-        reference_date=latest.reference_date,
-        value=latest.value,
-        source=latest.source
-    )
+    ref_date = reference_date or date.today()
+
+    async def build() -> EconomicIndexAccumulatedResponse:
+        accumulated = await RemeasurementService.get_accumulated_annual_index(
+            db, index_type, ref_date
+        )
+
+        if not accumulated:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Nenhum valor acumulado para índice '{index_type}'. Execute sync primeiro."
+            )
+
+        return EconomicIndexAccumulatedResponse(
+            index_type=accumulated['index_type'].lower(),
+            reference_date=accumulated['reference_date'],
+            accumulated_12m=accumulated['value'],
+            monthly_value=accumulated['monthly_value'],
+            months_used=accumulated['months_used'],
+            source=accumulated['source']
+        )
+
+    key = f"accumulated:{index_type.lower()}:{ref_date.isoformat()}"
+    return await cached_json_response(request, key, build)
 
 
 @router.post(
@@ -196,6 +305,12 @@ async def sync_index(
 )
 async def sync_all_indexes(
     last_n: int = Query(12, ge=1, le=120, description="Últimos N registros por índice"),
+    remeasure: bool = Query(False, description="Remensurar os contratos dos índices alterados"),
+    incremental: bool = Query(False, description="Busca só a partir do último mês armazenado (mais a janela de revisão)"),
+    concurrency: int = Query(
+        BCBService.MAX_CONCURRENT_FETCHES, ge=1, le=BCBService.MAX_CONCURRENT_FETCHES,
+        description="Séries buscadas simultaneamente no BCB (1 = sequencial)"
+    ),
     _: bool = Depends(verify_admin_token),
     db: AsyncSession = Depends(get_db)
 ):
@@ -205,20 +320,46 @@ async def sync_all_indexes(
     Requer: Token JWT de administrador
 
     - **last_n**: Quantidade de registros mais recentes por índice
+    - **remeasure**: Se True, remensura apenas os contratos cujo reajuste_tipo
+      teve valores inseridos ou alterados nesta sincronização
+    - **concurrency**: Requisições simultâneas ao BCB (cliente HTTP único com pool)
+    - **incremental**: Usa MAX(reference_date) de cada série para buscar só os
+      meses novos e os REVISION_WINDOW_MONTHS anteriores; last_n vale para séries vazias
     """
     try:
-        results = await BCBService.sync_all_indexes(db=db, last_n=last_n)
+        change_set = set()
+        timings = {}
+        upserts = {}
+        results = await BCBService.sync_all_indexes(
+            db=db, last_n=last_n, change_set=change_set,
+            max_concurrency=concurrency, timings=timings, upsert_counts=upserts,
+            incremental=incremental
+        )
 
         total_synced = sum(v for v in results.values() if v > 0)
         errors = [k for k, v in results.items() if v < 0]
 
-        return {
+        changes = {}
+        for index_type, reference_date in sorted(change_set):
+            changes.setdefault(index_type, []).append(reference_date.date().isoformat())
+
+        response = {
             "success": len(errors) == 0,
             "message": f"Sincronização concluída. Total: {total_synced} registros.",
             "results": results,
-            "errors": errors if errors else None
+            "errors": errors if errors else None,
+            "changes": changes,
+            "upserts": upserts,
+            "timings_ms": timings
         }
 
+        if remeasure:
+            response["remeasurement"] = await RemeasurementService.run_remeasurement_for_changes(
+                db, change_set
+            )
+
+        return response
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
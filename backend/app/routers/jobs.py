@@ -6,8 +6,9 @@ Estes endpoints são protegidos por token interno e não devem ser expostos publ
 import os
 import logging
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database import get_db
@@ -51,6 +52,12 @@ def verify_internal_token(x_internal_token: str = Header(...)):
     description="Executa o job de remensuração automática para todos os contratos elegíveis"
 )
 async def run_remeasurement_job(
+    chunked: bool = Query(False, description="Processa em lotes (cálculo paralelo, uma transação por lote)"),
+    chunk_size: int = Query(RemeasurementService.CHUNK_SIZE, ge=1, le=5000, description="Contratos por lote"),
+    page_size: Optional[int] = Query(None, ge=1, le=10000, description="Modo streaming: contratos por página (keyset + checkpoint)"),
+    resume: bool = Query(True, description="Modo streaming: retoma a execução interrompida do mês"),
+    dry_run: bool = Query(False, description="Calcula sem gravar versões/notificações e retorna o diff"),
+    index_types: Optional[str] = Query(None, description="Só contratos desses reajuste_tipo (separados por vírgula, ex.: ipca,igpm)"),
     _: bool = Depends(verify_internal_token),
     db: AsyncSession = Depends(get_db)
 ):
@@ -59,11 +66,36 @@ async def run_remeasurement_job(
 
     Este endpoint é chamado pelo Cloud Run Job agendado mensalmente.
     Protegido por token interno.
+
+    Args:
+        chunked: Se True, usa o modo em lotes (carteiras grandes)
+        chunk_size: Contratos por lote no modo em lotes
+        page_size: Se informado, lê os contratos em páginas com checkpoint (implica lotes)
+        resume: Retoma a partir do último checkpoint em andamento do mês
+        dry_run: Apenas calcula e retorna o diff por contrato e os tempos por
+            fase (ignora chunked/page_size, que só afetam a gravação)
+        index_types: Restringe aos contratos reajustados pelos índices
+            informados (ex.: os alterados na sincronização com o BCB)
     """
-    logger.info("Iniciando job de remensuração via endpoint")
+    tipos = [t.strip() for t in index_types.split(",") if t.strip()] if index_types else None
+
+    logger.info(
+        f"Iniciando job de remensuração via endpoint "
+        f"(lotes={chunked}, página={page_size}, dry_run={dry_run}, índices={tipos or 'todos'})"
+    )
 
     try:
-        result = await RemeasurementService.run_remeasurement_job(db)
+        if dry_run:
+            result = await RemeasurementService.run_remeasurement_job(
+                db, dry_run=True, index_types=tipos
+            )
+        elif chunked or page_size:
+            result = await RemeasurementService.run_remeasurement_job_chunked(
+                db, chunk_size=chunk_size, page_size=page_size, resume=resume,
+                index_types=tipos
+            )
+        else:
+            result = await RemeasurementService.run_remeasurement_job(db, index_types=tipos)
 
         logger.info(
             f"Job finalizado: {result['contracts_remeasured']} contratos remensurados"
@@ -71,7 +103,10 @@ async def run_remeasurement_job(
 
         return {
             "success": True,
-            "message": "Job de remensuração executado com sucesso",
+            "message": (
+                "Dry-run de remensuração executado (nada foi gravado)" if dry_run
+                else "Job de remensuração executado com sucesso"
+            ),
             "result": result
         }
 
@@ -17,12 +17,16 @@ from ..schemas import (
     ValidationSuccessResponse,
     ValidationErrorResponse,
     CheckLicenseResponse,
+    LicensePublicKeyResponse,
+    LicenseRevocationListResponse,
     LicenseData,
     LicenseFeatures,
     LicenseTypeEnum,
 )
 from ..auth import create_access_token, get_current_license
 from .. import crud
+from ..services.validation_log_writer import validation_log_writer
+from ..services.license_token_service import license_token_service
 
 router = APIRouter(prefix="/api", tags=["Licenses"])
 limiter = Limiter(key_func=get_remote_address)
@@ -71,7 +75,7 @@ async def validate_license(
     
     if not license:
         # Log de tentativa com chave inválida
-        await crud.log_validation(
+        await validation_log_writer.log(
             db,
             license_key=key,
             success=False,
@@ -88,7 +92,7 @@ async def validate_license(
     
     # Verificar se está revogada
     if license.revoked:
-        await crud.log_validation(
+        await validation_log_writer.log(
             db,
             license_key=key,
             success=False,
@@ -105,7 +109,7 @@ async def validate_license(
     
     # Verificar status
     if license.status != LicenseStatus.ACTIVE:
-        await crud.log_validation(
+        await validation_log_writer.log(
             db,
             license_key=key,
             success=False,
@@ -130,7 +134,7 @@ async def validate_license(
         # Atualizar status para expirado
         await crud.update_license_status(db, key, LicenseStatus.EXPIRED)
         
-        await crud.log_validation(
+        await validation_log_writer.log(
             db,
             license_key=key,
             success=False,
@@ -156,7 +160,7 @@ async def validate_license(
         if license.machine_id and body.machine_id and license.machine_id == body.machine_id:
             pass
         else:
-            await crud.log_validation(
+            await validation_log_writer.log(
                 db,
                 license_key=key,
                 success=False,
@@ -181,7 +185,7 @@ async def validate_license(
         )
         
         # Log de sucesso
-        await crud.log_validation(
+        await validation_log_writer.log(
             db,
             license_key=key,
             success=True,
@@ -261,6 +265,7 @@ async def validate_license(
     return ValidationSuccessResponse(
         valid=True,
         token=token,
+        license_token=license_token_service.issue(license),
         data=license_data
     )
 
@@ -280,6 +285,9 @@ async def check_license(
     
     Requer header: `Authorization: Bearer <token>`
     
+    Com o token de licença assinado (license_token) a verificação é feita
+    pela assinatura e pela lista de revogação, sem consultar o banco.
+    
     Retorna o status atual da licença.
     """
     key = license_data.get("key")
@@ -289,6 +297,19 @@ async def check_license(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido"
         )
+
+    if license_data.get("offline"):
+        if license_token_service.revocations.is_revoked(key):
+            return CheckLicenseResponse(
+                valid=False,
+                message="Licença revogada ou inativa"
+            )
+        license_expires_at = license_data.get("license_expires_at")
+        return CheckLicenseResponse(
+            valid=True,
+            status=LicenseStatus.ACTIVE,
+            expires_at=datetime.fromisoformat(license_expires_at) if license_expires_at else None
+        )
     
     # Buscar licença
     license = await crud.get_license_by_key(db, key)
@@ -322,3 +343,48 @@ async def check_license(
         status=license.status,
         expires_at=license.expires_at
     )
+
+
+@router.get(
+    "/license-public-key",
+    response_model=LicensePublicKeyResponse,
+    summary="Chave pública dos tokens de licença",
+    description="Chave Ed25519 para verificar o license_token sem consultar a API"
+)
+async def license_public_key():
+    """
+    Retorna a chave pública usada para assinar os tokens de licença.
+    """
+    if not license_token_service.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tokens de licença assinados não configurados"
+        )
+
+    return LicensePublicKeyResponse(
+        kid=license_token_service.key_id,
+        public_key=license_token_service.public_key_b64(),
+        token_ttl_hours=license_token_service.ttl_hours
+    )
+
+
+@router.get(
+    "/license-revocations",
+    response_model=LicenseRevocationListResponse,
+    summary="Lista de revogação de licenças",
+    description="Chaves revogadas, suspensas ou canceladas, assinadas com a chave dos tokens"
+)
+async def license_revocation_list():
+    """
+    Retorna a lista de revogação assinada.
+
+    Clientes que verificam o license_token offline devem baixá-la
+    periodicamente e rejeitar tokens cujas chaves estejam na lista.
+    """
+    if not license_token_service.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tokens de licença assinados não configurados"
+        )
+
+    return LicenseRevocationListResponse(**license_token_service.signed_revocation_list())
@@ -405,7 +405,7 @@ async def get_dashboard_metrics(
     "/dashboard/evolution",
     response_model=DashboardEvolutionResponse,
     summary="Evolução Temporal",
-    description="Retorna evolução do passivo ao longo do tempo (últimos 12 meses)"
+    description="Retorna evolução mensal do passivo (padrão: últimos 12 meses, máximo: 120)"
 )
 async def get_dashboard_evolution(
     months: int = 12,
@@ -415,10 +415,10 @@ async def get_dashboard_evolution(
     """
     Retorna evolução do passivo ao longo do tempo.
     
-    - **months**: Número de meses para retornar (padrão: 12, máximo: 24)
+    - **months**: Número de meses para retornar (padrão: 12, máximo: 120)
     """
-    if months > 24:
-        months = 24
+    if months > 120:
+        months = 120
     if months < 1:
         months = 1
     
@@ -308,6 +308,10 @@ class ValidationSuccessResponse(BaseModel):
     """Response de validação bem-sucedida"""
     valid: bool = True
     token: str = Field(description="Token JWT para autenticação")
+    license_token: Optional[str] = Field(
+        default=None,
+        description="Token de licença assinado (Ed25519), verificável offline com a chave pública"
+    )
     data: LicenseData
 
 
@@ -325,6 +329,22 @@ class CheckLicenseResponse(BaseModel):
     message: Optional[str] = None
 
 
+class LicensePublicKeyResponse(BaseModel):
+    """Chave pública para verificar tokens de licença offline"""
+    algorithm: str = "Ed25519"
+    kid: str
+    public_key: str = Field(description="Chave pública Ed25519 (32 bytes, base64url)")
+    token_ttl_hours: int
+
+
+class LicenseRevocationListResponse(BaseModel):
+    """Lista de revogação assinada com a chave dos tokens de licença"""
+    issued_at: int = Field(description="Emissão (segundos desde a época, UTC)")
+    keys: List[str]
+    kid: str
+    signature: str = Field(description="Assinatura Ed25519 do JSON {issued_at, keys} (base64url)")
+
+
 class LicenseFullResponse(BaseModel):
     """Response completa de licença (admin)"""
     id: UUID
@@ -458,6 +478,16 @@ class EconomicIndexLatestResponse(BaseModel):
     source: str
 
 
+class EconomicIndexAccumulatedResponse(BaseModel):
+    """Response da taxa acumulada em 12 meses de um índice"""
+    index_type: str
+    reference_date: datetime
+    accumulated_12m: str
+    monthly_value: str
+    months_used: int
+    source: str
+
+
 class EconomicIndexSyncResponse(BaseModel):
     """Response de sincronização com BCB"""
     success: bool
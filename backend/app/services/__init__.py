@@ -8,6 +8,20 @@ from .notification_service import NotificationService
 from .remeasurement_service import RemeasurementService
 from .document_service import DocumentService, document_service
 from .dashboard_service import DashboardService
+from .amortization_engine import AmortizationEngine
+from .recalculation_service import RecalculationService
+from .index_series_cache import IndexSeriesCache
+from .economic_index_cache import EconomicIndexReadCache, economic_index_cache
+from .bcb_response_cache import BCBResponseCache, BCBReplayMissError
+from .session_activity import SessionActivityBuffer, session_activity_buffer
+from .auth_cache import AuthSessionCache, auth_session_cache
+from .validation_log_writer import ValidationLogWriter, validation_log_writer
+from .license_token_service import (
+    LicenseTokenService,
+    LicenseRevocationList,
+    license_token_service,
+    license_revocations,
+)
 
 __all__ = [
     "StripeService",
@@ -17,5 +31,22 @@ __all__ = [
     "DocumentService",
     "document_service",
     "DashboardService",
+    "AmortizationEngine",
+    "RecalculationService",
+    "IndexSeriesCache",
+    "EconomicIndexReadCache",
+    "economic_index_cache",
+    "BCBResponseCache",
+    "BCBReplayMissError",
+    "SessionActivityBuffer",
+    "session_activity_buffer",
+    "AuthSessionCache",
+    "auth_session_cache",
+    "ValidationLogWriter",
+    "validation_log_writer",
+    "LicenseTokenService",
+    "LicenseRevocationList",
+    "license_token_service",
+    "license_revocations",
 ]
 
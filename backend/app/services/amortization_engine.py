@@ -0,0 +1,708 @@
+"""
+Motor de cálculo IFRS 16 vetorizado (NumPy)
+Gera fluxo de caixa, contabilização e CP/LP no mesmo formato de assets/js/calculator.js
+"""
+
+import logging
+import re
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+
+logger = logging.getLogger(__name__)
+
+DateLike = Union[date, datetime, str]
+
+
+class AmortizationEngine:
+    """
+    Motor de amortização do passivo de arrendamento.
+
+    Todas as séries mensais (fator de desconto, juros, passivo, depreciação,
+    CP/LP) são calculadas com operações de array, sem loops por mês.
+    O núcleo trabalha sobre uma matriz (contratos x meses), de modo que um
+    contrato isolado e uma carteira inteira usam o mesmo código.
+    O resultado segue o mesmo schema de `dadosCalculados` do calculator.js,
+    para que o servidor seja a fonte única das tabelas de amortização.
+    """
+
+    # Meses considerados no passivo de curto prazo (circulante)
+    MESES_CURTO_PRAZO = 12
+
+    # Números aceitos no resultados_json enviado pelo cliente (mesma regra do
+    # backfill SQL em database.py; rejeita "1.234,56", NaN e Infinity)
+    NUMERO_JSON = re.compile(r'-?[0-9]+([.][0-9]+)?([eE][-+]?[0-9]+)?')
+    MES_JSON = re.compile(r'[0-9]{1,9}')
+
+    @staticmethod
+    def monthly_rate(taxa_desconto_anual: float) -> float:
+        """Converte taxa anual (%) em taxa mensal equivalente (decimal)"""
+        return (1 + (taxa_desconto_anual or 0) / 100) ** (1 / 12) - 1
+
+    @staticmethod
+    def _numero(value: Any) -> float:
+        """Converte um valor do resultados_json (vazio vale 0); ValueError se não numérico"""
+        if not value:
+            return 0.0
+        if isinstance(value, bool) or not AmortizationEngine.NUMERO_JSON.fullmatch(str(value)):
+            raise ValueError(f"Valor não numérico: {value!r}")
+        return float(value)
+
+    @staticmethod
+    def _as_date(value: DateLike) -> date:
+        """Normaliza data de início (date, datetime ou 'YYYY-MM-DD' / 'DD/MM/YYYY')"""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str):
+            for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+                try:
+                    return datetime.strptime(value[:10], fmt).date()
+                except ValueError:
+                    continue
+        raise ValueError(f"Data de início inválida: {value!r}")
+
+    # =========================================================================
+    # NÚCLEO MATRICIAL (contratos x meses)
+    # =========================================================================
+
+    @staticmethod
+    def build_payments_batch(
+        parcelas_iniciais: np.ndarray,
+        prazos: np.ndarray,
+        carencias: np.ndarray,
+        anos_inicio: np.ndarray,
+        meses_inicio: np.ndarray,
+        reajustes_anuais: np.ndarray,
+        meses_reajuste: np.ndarray
+    ) -> tuple:
+        """
+        Monta a matriz de parcelas (contratos x maior prazo) com carência e reajuste.
+
+        Mesma regra do calculator.js: a cada ano civil após o de início,
+        a parcela é reajustada a partir do mês de reajuste. Meses além do
+        prazo de cada contrato ficam zerados.
+
+        Returns:
+            Tupla (pagamentos, anos, meses), todas com shape (C, N)
+        """
+        prazo_max = int(prazos.max()) if prazos.size else 0
+        colunas = np.arange(prazo_max)[None, :]
+
+        offsets = (meses_inicio[:, None] - 1) + colunas
+        anos = anos_inicio[:, None] + offsets // 12
+        meses = offsets % 12 + 1
+
+        reajustes = np.where(
+            anos > anos_inicio[:, None],
+            (anos - anos_inicio[:, None] - 1) + (meses >= meses_reajuste[:, None]),
+            0
+        )
+        parcelas = parcelas_iniciais[:, None] * (1 + reajustes_anuais[:, None] / 100) ** reajustes
+
+        numero_parcela = colunas + 1
+        ativo = (numero_parcela > carencias[:, None]) & (numero_parcela <= prazos[:, None])
+        return np.where(ativo, parcelas, 0.0), anos, meses
+
+    @staticmethod
+    def compute_schedule_batch(
+        pagamentos: np.ndarray,
+        taxas_mensais: np.ndarray,
+        prazos: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calcula as séries contábeis de vários contratos em uma única passada.
+
+        As matrizes retornadas têm shape (C, N + 1) (coluna 0 = reconhecimento
+        inicial), exceto `fator_desconto` e `valor_presente` (shape (C, N)).
+
+        O saldo do passivo usa a forma fechada
+            passivo[k] = (1 + r)^k * sum(pagamento[j] * v^j, j > k)
+        em vez da recorrência passivo[k] = passivo[k-1] * (1 + r) - pagamento[k].
+
+        Args:
+            pagamentos: Matriz de parcelas mensais, shape (C, N)
+            taxas_mensais: Taxa de desconto mensal de cada contrato, shape (C,)
+            prazos: Prazo em meses de cada contrato, shape (C,)
+
+        Returns:
+            Dicionário de arrays NumPy
+        """
+        pagamentos = np.asarray(pagamentos, dtype=float)
+        taxas = np.asarray(taxas_mensais, dtype=float)[:, None]
+        prazos = np.asarray(prazos)
+        n_contratos, prazo_max = pagamentos.shape
+        n = np.arange(prazo_max + 1)[None, :]
+
+        crescimento = (1 + taxas) ** n
+        fator_desconto = 1 / crescimento[:, 1:]
+        valor_presente = pagamentos * fator_desconto
+
+        # Soma dos VPs ainda não pagos (cumsum reverso evita cancelamento numérico)
+        vp_restante = np.zeros((n_contratos, prazo_max + 1))
+        vp_restante[:, :-1] = np.cumsum(valor_presente[:, ::-1], axis=1)[:, ::-1]
+        passivo_final = vp_restante * crescimento
+
+        passivo_abertura = np.zeros_like(passivo_final)
+        passivo_abertura[:, 1:] = passivo_final[:, :-1]
+
+        juros = passivo_abertura * taxas
+        pagamento = np.zeros_like(passivo_final)
+        pagamento[:, 1:] = pagamentos
+
+        base_ativo = passivo_final[:, 0]
+        deprec_mensal = np.divide(
+            base_ativo, prazos, out=np.zeros(n_contratos), where=prazos > 0
+        )
+        deprec_acum = np.minimum(n, prazos[:, None]) * deprec_mensal[:, None]
+        desp_deprec = np.where((n > 0) & (n <= prazos[:, None]), deprec_mensal[:, None], 0.0)
+
+        # CP = amortização do principal nos próximos 12 meses (janela via cumsum)
+        amort_acum = np.cumsum(pagamento - juros, axis=1)
+        fim_janela = np.minimum(n + AmortizationEngine.MESES_CURTO_PRAZO, prazos[:, None])
+        fim_janela = np.maximum(fim_janela, n)
+        cp = np.take_along_axis(amort_acum, fim_janela, axis=1) - amort_acum
+
+        return {
+            'fator_desconto': fator_desconto,
+            'valor_presente': valor_presente,
+            'passivo_inicial': passivo_abertura,
+            'juros': juros,
+            'pagamento': pagamento,
+            'passivo_final': passivo_final,
+            'ativo_bruto': np.repeat(base_ativo[:, None], prazo_max + 1, axis=1),
+            'deprec_acum': deprec_acum,
+            'ativo_liquido': base_ativo[:, None] - deprec_acum,
+            'desp_deprec': desp_deprec,
+            'desp_total': juros + desp_deprec,
+            'passivo_cp': np.minimum(passivo_final, np.maximum(0.0, cp)),
+            'passivo_lp': np.maximum(0.0, passivo_final - cp),
+            'deprec_mensal': deprec_mensal,
+        }
+
+    @staticmethod
+    def calculate_batch(contratos: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Calcula uma carteira de contratos em uma única passada vetorizada.
+
+        Cada contrato é um dict com as chaves de contract_versions:
+        data_inicio, prazo_meses, parcela_inicial, taxa_desconto_anual e,
+        opcionalmente, carencia_meses, reajuste_anual e mes_reajuste.
+
+        Returns:
+            Dicionário com as séries (shape (C, N + 1)), calendário e parâmetros,
+            para uso em `batch_summary` e `batch_result`
+
+        Raises:
+            ValueError: Se algum prazo_meses não for positivo ou a data for inválida
+        """
+        inicios = [AmortizationEngine._as_date(c['data_inicio']) for c in contratos]
+        prazos = np.array([c['prazo_meses'] or 0 for c in contratos], dtype=int)
+        if prazos.size and prazos.min() <= 0:
+            raise ValueError("prazo_meses deve ser maior que zero")
+
+        taxas = np.array([
+            AmortizationEngine.monthly_rate(c['taxa_desconto_anual']) for c in contratos
+        ], dtype=float)
+
+        pagamentos, anos, meses = AmortizationEngine.build_payments_batch(
+            parcelas_iniciais=np.array([c['parcela_inicial'] or 0 for c in contratos], dtype=float),
+            prazos=prazos,
+            carencias=np.array([c.get('carencia_meses') or 0 for c in contratos], dtype=int),
+            anos_inicio=np.array([d.year for d in inicios], dtype=int),
+            meses_inicio=np.array([d.month for d in inicios], dtype=int),
+            reajustes_anuais=np.array([c.get('reajuste_anual') or 0 for c in contratos], dtype=float),
+            meses_reajuste=np.array([c.get('mes_reajuste') or 1 for c in contratos], dtype=int),
+        )
+
+        return {
+            'series': AmortizationEngine.compute_schedule_batch(pagamentos, taxas, prazos),
+            'taxas_mensais': taxas,
+            'prazos': prazos,
+            'anos': anos,
+            'meses': meses,
+            'inicios': inicios,
+        }
+
+    @staticmethod
+    def batch_summary(batch: Dict[str, Any]) -> List[Dict[str, float]]:
+        """
+        Totais por contrato calculados direto das matrizes, sem montar as tabelas.
+
+        Returns:
+            Lista (na ordem de entrada) com total_vp, total_nominal, avp,
+            total_juros, total_deprec, passivo_cp, passivo_lp e despesa_mes1
+        """
+        if not batch['inicios']:
+            return []
+
+        series = batch['series']
+        total_vp = series['passivo_final'][:, 0]
+        total_nominal = series['pagamento'].sum(axis=1)
+        total_juros = series['juros'].sum(axis=1)
+        despesa_mes1 = series['desp_total'][:, 1]
+
+        colunas = zip(
+            total_vp.tolist(),
+            total_nominal.tolist(),
+            total_juros.tolist(),
+            (series['deprec_mensal'] * batch['prazos']).tolist(),
+            series['passivo_cp'][:, 0].tolist(),
+            series['passivo_lp'][:, 0].tolist(),
+            despesa_mes1.tolist(),
+        )
+        return [
+            {
+                'total_vp': vp,
+                'total_nominal': nominal,
+                'avp': nominal - vp,
+                'total_juros': juros,
+                'total_deprec': deprec,
+                'passivo_cp': cp,
+                'passivo_lp': lp,
+                'despesa_mes1': despesa,
+            }
+            for vp, nominal, juros, deprec, cp, lp, despesa in colunas
+        ]
+
+    @staticmethod
+    def batch_result(batch: Dict[str, Any], index: int) -> Dict[str, Any]:
+        """Extrai o resultado completo (schema do calculator.js) de um contrato do lote"""
+        prazo = int(batch['prazos'][index])
+        series = {
+            key: (value[index] if np.ndim(value) == 1 else value[index, :prazo + 1])
+            for key, value in batch['series'].items()
+        }
+        series['fator_desconto'] = batch['series']['fator_desconto'][index, :prazo]
+        series['valor_presente'] = batch['series']['valor_presente'][index, :prazo]
+        series['deprec_mensal'] = float(series['deprec_mensal'])
+
+        inicio = batch['inicios'][index]
+        return AmortizationEngine.build_result(
+            series,
+            float(batch['taxas_mensais'][index]),
+            batch['anos'][index, :prazo],
+            batch['meses'][index, :prazo],
+            f"{inicio.month:02d}/{inicio.year}"
+        )
+
+    # =========================================================================
+    # API DE CONTRATO ÚNICO
+    # =========================================================================
+
+    @staticmethod
+    def month_calendar(data_inicio: DateLike, prazo_meses: int) -> tuple:
+        """
+        Retorna arrays (ano, mes) do calendário de cada parcela.
+
+        A parcela 1 vence no mês de início; a parcela N, N-1 meses depois.
+        """
+        inicio = AmortizationEngine._as_date(data_inicio)
+        offsets = (inicio.month - 1) + np.arange(prazo_meses)
+        anos = inicio.year + offsets // 12
+        meses = offsets % 12 + 1
+        return anos, meses
+
+    @staticmethod
+    def build_payments(
+        parcela_inicial: float,
+        prazo_meses: int,
+        carencia_meses: int,
+        data_inicio: DateLike,
+        reajuste_anual: float = 0.0,
+        mes_reajuste: int = 1
+    ) -> np.ndarray:
+        """Monta o vetor de parcelas de um contrato (ver `build_payments_batch`)"""
+        inicio = AmortizationEngine._as_date(data_inicio)
+        pagamentos, _, _ = AmortizationEngine.build_payments_batch(
+            parcelas_iniciais=np.array([parcela_inicial], dtype=float),
+            prazos=np.array([prazo_meses]),
+            carencias=np.array([carencia_meses or 0]),
+            anos_inicio=np.array([inicio.year]),
+            meses_inicio=np.array([inicio.month]),
+            reajustes_anuais=np.array([reajuste_anual or 0], dtype=float),
+            meses_reajuste=np.array([mes_reajuste or 1]),
+        )
+        return pagamentos[0]
+
+    @staticmethod
+    def compute_schedule(
+        pagamentos: np.ndarray,
+        taxa_mensal: float
+    ) -> Dict[str, Any]:
+        """Calcula as séries contábeis de um contrato (ver `compute_schedule_batch`)"""
+        pagamentos = np.asarray(pagamentos, dtype=float)
+        series = AmortizationEngine.compute_schedule_batch(
+            pagamentos[None, :], np.array([taxa_mensal]), np.array([pagamentos.shape[0]])
+        )
+        result = {key: value[0] for key, value in series.items()}
+        result['deprec_mensal'] = float(result['deprec_mensal'])
+        return result
+
+    @staticmethod
+    def calculate(
+        data_inicio: DateLike,
+        prazo_meses: int,
+        parcela_inicial: float,
+        taxa_desconto_anual: float,
+        carencia_meses: int = 0,
+        reajuste_anual: float = 0.0,
+        mes_reajuste: int = 1
+    ) -> Dict[str, Any]:
+        """
+        Calcula o contrato completo no formato do calculator.js.
+
+        Returns:
+            Dicionário com taxaMensal, fluxoCaixa, contabilizacao, cpLp,
+            totalNominal, totalVP, avp, totalJuros, totalPagamentos,
+            totalDeprec e deprecMensal
+
+        Raises:
+            ValueError: Se prazo_meses não for positivo ou a data for inválida
+        """
+        batch = AmortizationEngine.calculate_batch([{
+            'data_inicio': data_inicio,
+            'prazo_meses': prazo_meses,
+            'parcela_inicial': parcela_inicial,
+            'taxa_desconto_anual': taxa_desconto_anual,
+            'carencia_meses': carencia_meses,
+            'reajuste_anual': reajuste_anual,
+            'mes_reajuste': mes_reajuste,
+        }])
+        return AmortizationEngine.batch_result(batch, 0)
+
+    @staticmethod
+    def build_result(
+        series: Dict[str, Any],
+        taxa_mensal: float,
+        anos: np.ndarray,
+        meses: np.ndarray,
+        rotulo_inicial: str,
+        mes_inicial: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Converte as séries NumPy nas listas de dicts usadas pelo frontend.
+
+        Args:
+            series: Séries de um contrato (tamanho prazo + 1)
+            taxa_mensal: Taxa de desconto mensal
+            anos, meses: Calendário das parcelas
+            rotulo_inicial: Rótulo 'MM/YYYY' da linha 0 da contabilização
+            mes_inicial: Número do mês da linha 0 (0 = reconhecimento inicial)
+        """
+        rotulos = [f"{m:02d}/{a}" for a, m in zip(anos.tolist(), meses.tolist())]
+        datas = [date(a, m, 1).isoformat() for a, m in zip(anos.tolist(), meses.tolist())]
+        pagamentos = series['pagamento'][1:]
+
+        fluxo_caixa = [
+            {
+                'mes': mes_inicial + i + 1,
+                'data': rotulos[i],
+                'dataObj': datas[i],
+                'parcela': parcela,
+                'fatorDesconto': fator,
+                'valorPresente': vp,
+            }
+            for i, (parcela, fator, vp) in enumerate(zip(
+                pagamentos.tolist(),
+                series['fator_desconto'].tolist(),
+                series['valor_presente'].tolist()
+            ))
+        ]
+
+        rotulos_contabil = [rotulo_inicial] + rotulos
+        colunas = zip(
+            rotulos_contabil,
+            series['passivo_inicial'].tolist(),
+            series['juros'].tolist(),
+            series['pagamento'].tolist(),
+            series['passivo_final'].tolist(),
+            series['ativo_bruto'].tolist(),
+            series['deprec_acum'].tolist(),
+            series['ativo_liquido'].tolist(),
+            series['desp_deprec'].tolist(),
+            series['desp_total'].tolist(),
+            series['passivo_cp'].tolist(),
+            series['passivo_lp'].tolist(),
+        )
+        contabilizacao = [
+            {
+                'mes': mes_inicial + mes,
+                'data': data,
+                'passivoInicial': p_ini,
+                'juros': juros,
+                'pagamento': pag,
+                'passivoFinal': p_fim,
+                'ativoBruto': bruto,
+                'deprecAcum': acum,
+                'ativoLiquido': liquido,
+                'despJuros': juros,
+                'despDeprec': deprec,
+                'despTotal': total,
+                'passivoCP': cp,
+                'passivoLP': lp,
+            }
+            for mes, (data, p_ini, juros, pag, p_fim, bruto, acum, liquido, deprec, total, cp, lp)
+            in enumerate(colunas)
+        ]
+
+        total_nominal = float(pagamentos.sum())
+        total_vp = float(series['passivo_final'][0])
+        prazo = len(fluxo_caixa)
+
+        return {
+            'taxaMensal': taxa_mensal,
+            'fluxoCaixa': fluxo_caixa,
+            'contabilizacao': contabilizacao,
+            'cpLp': contabilizacao,
+            'totalNominal': total_nominal,
+            'totalVP': total_vp,
+            'avp': total_nominal - total_vp,
+            'totalJuros': float(series['juros'].sum()),
+            'totalPagamentos': total_nominal,
+            'totalDeprec': series['deprec_mensal'] * prazo,
+            'deprecMensal': series['deprec_mensal'],
+        }
+
+    # =========================================================================
+    # REMENSURAÇÃO INCREMENTAL
+    # =========================================================================
+
+    @staticmethod
+    def effective_month(data_inicio: DateLike, reference_date: DateLike) -> int:
+        """
+        Número da parcela que vence no mês de reference_date.
+
+        A parcela 1 vence no mês de início do contrato.
+        """
+        inicio = AmortizationEngine._as_date(data_inicio)
+        referencia = AmortizationEngine._as_date(reference_date)
+        return (referencia.year - inicio.year) * 12 + (referencia.month - inicio.month) + 1
+
+    @staticmethod
+    def remeasure_tail(
+        anterior: Dict[str, Any],
+        data_inicio: DateLike,
+        prazo_meses: int,
+        mes_efetivo: int,
+        nova_parcela: float,
+        taxa_desconto_anual: float,
+        carencia_meses: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Remensura o contrato a partir de mes_efetivo reaproveitando o cronograma anterior.
+
+        As linhas anteriores a mes_efetivo são mantidas como estão; apenas as
+        parcelas restantes são recalculadas (custo proporcional ao prazo
+        remanescente). O passivo remensurado é o VP das parcelas restantes e a
+        diferença para o saldo transportado (passivoFinal do mês anterior) é
+        lançada no ativo de direito de uso, depreciado no prazo remanescente.
+
+        Args:
+            anterior: resultados_json da versão anterior (fluxoCaixa e contabilizacao)
+            data_inicio: Data de início do contrato
+            prazo_meses: Prazo total do contrato
+            mes_efetivo: Primeira parcela com o novo valor (1..prazo_meses)
+            nova_parcela: Valor da parcela após o reajuste
+            taxa_desconto_anual: Taxa de desconto anual (%)
+            carencia_meses: Meses de carência (parcela zero)
+
+        Returns:
+            Mesmo formato de `calculate`, com a chave adicional 'remensuracao'
+
+        Raises:
+            ValueError: Se o cronograma anterior não corresponder ao prazo ou
+                mes_efetivo estiver fora do contrato
+        """
+        contab_anterior = anterior.get('contabilizacao') or []
+        fluxo_anterior = anterior.get('fluxoCaixa') or []
+        if len(contab_anterior) != prazo_meses + 1 or len(fluxo_anterior) != prazo_meses:
+            raise ValueError("Cronograma anterior incompatível com o prazo do contrato")
+        if not 1 <= mes_efetivo <= prazo_meses:
+            raise ValueError(f"Mês efetivo fora do prazo do contrato: {mes_efetivo}")
+
+        taxa_mensal = AmortizationEngine.monthly_rate(taxa_desconto_anual)
+        restantes = prazo_meses - mes_efetivo + 1
+        numeros = np.arange(mes_efetivo, prazo_meses + 1)
+        pagamentos = np.where(numeros > (carencia_meses or 0), float(nova_parcela), 0.0)
+
+        # Passivo: VP das parcelas restantes (linha 0 da cauda = mês mes_efetivo - 1)
+        series = AmortizationEngine.compute_schedule(pagamentos, taxa_mensal)
+        base = contab_anterior[mes_efetivo - 1]
+        passivo_anterior = float(base['passivoFinal'])
+        passivo_remensurado = float(series['passivo_final'][0])
+        ajuste = passivo_remensurado - passivo_anterior
+
+        # Ativo: saldo líquido transportado + ajuste, depreciado linearmente
+        ativo_remensurado = float(base['ativoLiquido']) + ajuste
+        deprec_mensal = ativo_remensurado / restantes
+        k = np.arange(restantes + 1)
+        series['ativo_bruto'] = np.full(restantes + 1, float(base['ativoBruto']) + ajuste)
+        series['deprec_acum'] = float(base['deprecAcum']) + k * deprec_mensal
+        series['ativo_liquido'] = ativo_remensurado - k * deprec_mensal
+        series['desp_deprec'] = np.where(k > 0, deprec_mensal, 0.0)
+        series['desp_total'] = series['juros'] + series['desp_deprec']
+        series['deprec_mensal'] = deprec_mensal
+
+        # Fator de desconto continua referenciado à data de início
+        series['fator_desconto'] = (1 + taxa_mensal) ** -numeros.astype(float)
+        series['valor_presente'] = pagamentos * series['fator_desconto']
+
+        anos, meses = AmortizationEngine.month_calendar(data_inicio, prazo_meses)
+        cauda = AmortizationEngine.build_result(
+            series, taxa_mensal,
+            anos[mes_efetivo - 1:], meses[mes_efetivo - 1:],
+            base['data'], mes_inicial=mes_efetivo - 1
+        )
+
+        contabilizacao = contab_anterior[:mes_efetivo] + cauda['contabilizacao'][1:]
+        fluxo_caixa = fluxo_anterior[:mes_efetivo - 1] + cauda['fluxoCaixa']
+
+        # Totais: prefixo anterior + cauda nova (VP referenciado à data de início)
+        passivo_inicial = float(contab_anterior[0]['passivoFinal'])
+        total_nominal = (
+            sum(float(row['pagamento']) for row in contab_anterior[1:mes_efetivo])
+            + float(pagamentos.sum())
+        )
+        total_vp = passivo_inicial + ajuste * (1 + taxa_mensal) ** -(mes_efetivo - 1)
+
+        return {
+            'taxaMensal': taxa_mensal,
+            'fluxoCaixa': fluxo_caixa,
+            'contabilizacao': contabilizacao,
+            'cpLp': contabilizacao,
+            'totalNominal': total_nominal,
+            'totalVP': total_vp,
+            'avp': total_nominal - total_vp,
+            'totalJuros': total_nominal - passivo_inicial - ajuste,
+            'totalPagamentos': total_nominal,
+            'totalDeprec': float(series['deprec_acum'][-1]),
+            'deprecMensal': deprec_mensal,
+            'remensuracao': {
+                'mes_efetivo': mes_efetivo,
+                'passivo_anterior': passivo_anterior,
+                'passivo_remensurado': passivo_remensurado,
+                'ajuste': ajuste,
+            },
+        }
+
+    @staticmethod
+    def schedule_summary(
+        resultados: Dict[str, Any],
+        data_inicio: Optional[DateLike],
+        prazo_meses: Optional[int]
+    ) -> Dict[str, Any]:
+        """
+        Valores derivados da contabilização, gravados nas colunas de resumo
+        de contract_versions.
+
+        Aceita tanto o resultado do motor quanto o resultados_json enviado
+        pelo frontend (mesmo schema de contabilizacao).
+
+        Returns:
+            Dicionário com despesa_mes1 (soma de despTotal do mês 1),
+            passivo_cp_inicial e passivo_lp_inicial (primeira linha),
+            total_juros, total_deprec e data_fim (data_inicio + prazo_meses).
+            Sem contabilização, ou com valor não numérico (ex.: "1.234,56"),
+            os valores numéricos ficam em None
+        """
+        linhas = resultados.get('contabilizacao') if isinstance(resultados, dict) else None
+        resumo: Dict[str, Any] = {
+            'despesa_mes1': None,
+            'passivo_cp_inicial': None,
+            'passivo_lp_inicial': None,
+            'total_juros': None,
+            'total_deprec': None,
+            'data_fim': None,
+        }
+
+        if isinstance(linhas, list) and linhas:
+            def valor(linha: Dict[str, Any], chave: str) -> float:
+                return AmortizationEngine._numero(linha.get(chave))
+
+            try:
+                resumo.update({
+                    'despesa_mes1': sum(valor(l, 'despTotal') for l in linhas if l.get('mes') == 1),
+                    'passivo_cp_inicial': valor(linhas[0], 'passivoCP'),
+                    'passivo_lp_inicial': valor(linhas[0], 'passivoLP'),
+                    'total_juros': sum(valor(l, 'juros') for l in linhas),
+                    'total_deprec': sum(valor(l, 'despDeprec') for l in linhas),
+                })
+            except (TypeError, ValueError, AttributeError) as e:
+                logger.warning(f"Contabilização com valor não numérico, resumo gravado como NULL: {e}")
+
+        if data_inicio and prazo_meses:
+            resumo['data_fim'] = (
+                AmortizationEngine._as_date(data_inicio) + relativedelta(months=prazo_meses)
+            )
+        return resumo
+
+    @staticmethod
+    def _mes_ano(value: Any) -> Optional[date]:
+        """Converte o rótulo 'MM/YYYY' da contabilização no primeiro dia do mês"""
+        try:
+            mes, ano = str(value).split('/')
+            return date(int(ano), int(mes), 1)
+        except (ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def schedule_rows(resultados: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Linhas da contabilização no formato de contract_schedule_rows.
+
+        Linhas sem mes inteiro não negativo ou com valor não numérico são
+        descartadas (com log); meses repetidos mantêm a última linha, pois
+        (version_id, mes) é a chave. O backfill SQL em database.py segue as mesmas regras.
+
+        Returns:
+            Lista de dicts com mes, data, passivo_final, juros, pagamento,
+            deprec, cp e lp, em ordem de mês (vazia se não houver contabilização)
+        """
+        linhas = resultados.get('contabilizacao') if isinstance(resultados, dict) else None
+        if not isinstance(linhas, list):
+            return []
+
+        rows: Dict[int, Dict[str, Any]] = {}
+        descartadas = 0
+        for linha in linhas:
+            if not isinstance(linha, dict):
+                descartadas += 1
+                continue
+            try:
+                mes = linha.get('mes')
+                if isinstance(mes, bool) or not AmortizationEngine.MES_JSON.fullmatch(str(mes)):
+                    raise ValueError(f"mes inválido: {mes!r}")
+                numero = AmortizationEngine._numero
+                rows[int(mes)] = {
+                    'mes': int(mes),
+                    'data': AmortizationEngine._mes_ano(linha.get('data')),
+                    'passivo_final': numero(linha.get('passivoFinal')),
+                    'juros': numero(linha.get('juros')),
+                    'pagamento': numero(linha.get('pagamento')),
+                    'deprec': numero(linha.get('despDeprec')),
+                    'cp': numero(linha.get('passivoCP')),
+                    'lp': numero(linha.get('passivoLP')),
+                }
+            except ValueError:
+                descartadas += 1
+
+        if descartadas or len(rows) < len(linhas):
+            logger.warning(
+                f"Cronograma com {descartadas} linha(s) inválida(s) descartada(s) e "
+                f"{len(linhas) - descartadas - len(rows)} mês(es) repetido(s)"
+            )
+        return [rows[mes] for mes in sorted(rows)]
+
+    @staticmethod
+    def to_resultados_json(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Extrai o subconjunto gravado em contract_versions.resultados_json"""
+        return {
+            'fluxoCaixa': result['fluxoCaixa'],
+            'contabilizacao': result['contabilizacao'],
+            'cpLp': result['cpLp'],
+        }
@@ -0,0 +1,158 @@
+"""
+Cache em memória da validação de usuários e sessões autenticadas
+Evita as consultas de User e UserSession a cada requisição autenticada
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Tuple, Type
+from uuid import UUID
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ..config import get_settings
+from ..models import User, UserSession
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class AuthSessionCache:
+    """
+    Usuários ativos (por id) e sessões ativas (por session_token).
+
+    Guarda apenas os valores das colunas; a cada acerto o objeto é
+    reconstruído e anexado à sessão do banco da requisição com
+    merge(load=False), sem SQL. Resultados negativos não são guardados.
+
+    Invalidação:
+    - explícita, após o commit: encerramento de sessão, logout, login em
+      outro dispositivo e alterações de usuário pelo admin
+    - automática: qualquer UPDATE/DELETE de User ou UserSession feito pelo
+      ORM neste processo (UPDATEs em lote não disparam, por isso a expiração
+      da sessão continua sendo verificada a cada requisição)
+    - TTL: limita a defasagem das demais instâncias, que não recebem a
+      invalidação
+
+    Com TTL 0 o cache fica desativado.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._users: "OrderedDict[UUID, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._sessions: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def _snapshot(obj) -> Optional[Dict[str, Any]]:
+        """Valores das colunas já carregadas (None se alguma estiver expirada)"""
+        state = inspect(obj)
+        values = {}
+        for attr in state.mapper.column_attrs:
+            if attr.key not in state.dict:
+                return None
+            values[attr.key] = state.dict[attr.key]
+        return values
+
+    @staticmethod
+    async def _attach(db: AsyncSession, model: Type, values: Dict[str, Any]):
+        """Reconstrói o objeto e o anexa à sessão da requisição sem consultar o banco"""
+        obj = inspect(model).class_manager.new_instance()
+        for key, value in values.items():
+            set_committed_value(obj, key, value)
+        make_transient_to_detached(obj)
+        return await db.merge(obj, load=False)
+
+    def _get(self, entries: OrderedDict, key) -> Optional[Dict[str, Any]]:
+        entry = entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del entries[key]
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def _put(self, entries: OrderedDict, key, values: Optional[Dict[str, Any]]) -> None:
+        if not self.enabled or values is None:
+            return
+        entries[key] = (time.monotonic() + self.ttl_seconds, values)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    async def get_user(self, db: AsyncSession, user_id: UUID) -> Optional[User]:
+        """Usuário ativo em cache, anexado à sessão da requisição"""
+        if not self.enabled:
+            return None
+        values = self._get(self._users, user_id)
+        if values is None:
+            return None
+        return await self._attach(db, User, values)
+
+    def put_user(self, user: User) -> None:
+        self._put(self._users, user.id, self._snapshot(user))
+
+    async def get_session(
+        self,
+        db: AsyncSession,
+        session_token: str,
+        user_id: UUID
+    ) -> Optional[UserSession]:
+        """Sessão ativa em cache do usuário, anexada à sessão da requisição"""
+        if not self.enabled:
+            return None
+        values = self._get(self._sessions, session_token)
+        if values is None or values["user_id"] != user_id:
+            return None
+        return await self._attach(db, UserSession, values)
+
+    def put_session(self, session: UserSession) -> None:
+        self._put(self._sessions, session.session_token, self._snapshot(session))
+
+    def invalidate_session(self, session_token: Optional[str]) -> None:
+        """Remove a sessão do cache (encerramento, logout, login em outro dispositivo)"""
+        if session_token:
+            self._sessions.pop(session_token, None)
+
+    def invalidate_user(self, user_id: Optional[UUID]) -> None:
+        """Remove o usuário e todas as suas sessões do cache"""
+        if user_id is None:
+            return
+        self._users.pop(user_id, None)
+        for token in [t for t, (_, v) in self._sessions.items() if v["user_id"] == user_id]:
+            del self._sessions[token]
+
+    def invalidate(self) -> None:
+        """Esvazia o cache"""
+        self._users.clear()
+        self._sessions.clear()
+
+
+auth_session_cache = AuthSessionCache(
+    settings.AUTH_CACHE_TTL_SECONDS,
+    settings.AUTH_CACHE_MAX_ENTRIES,
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    auth_session_cache.invalidate_user(target.id)
+
+
+@event.listens_for(UserSession, "after_update")
+@event.listens_for(UserSession, "after_delete")
+def _invalidate_session(mapper, connection, target):
+    auth_session_cache.invalidate_session(target.session_token)
@@ -0,0 +1,135 @@
+"""
+Cache em disco das respostas da API SGS do Banco Central
+Permite gravar respostas reais e reproduzi-las sem acesso à rede
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+class BCBReplayMissError(LookupError):
+    """Resposta não encontrada no cache em disco (modo replay)"""
+    pass
+
+
+class BCBResponseCache:
+    """
+    Respostas do BCB gravadas em disco, uma por (série, parâmetros).
+
+    Modos:
+    - off: não lê nem grava
+    - record: toda resposta obtida da API é gravada, mesclada à gravação
+      anterior da mesma chave (uma sincronização incremental não apaga o
+      histórico gravado antes)
+    - replay: as respostas vêm só do disco; ausência gera BCBReplayMissError
+
+    Os arquivos são JSON com a série, os parâmetros e os dados no formato SGS,
+    então podem ser versionados e inspecionados.
+
+    dataFinal fica fora da chave: a sincronização incremental sempre envia a
+    data de hoje, então uma gravação é reproduzida em qualquer dia seguinte,
+    filtrada pelo intervalo pedido (como o servidor local do BCB).
+    """
+
+    MODES = ("off", "record", "replay")
+
+    # Parâmetros que não identificam a resposta gravada (aplicados como filtro no load)
+    UNKEYED_PARAMS = ("dataFinal",)
+
+    def __init__(self, directory: Optional[str] = None, mode: str = "off"):
+        mode = (mode or "off").lower()
+        if mode not in self.MODES:
+            raise ValueError(f"Modo de cache inválido: '{mode}'. Use: {', '.join(self.MODES)}")
+        if mode != "off" and not directory:
+            raise ValueError(f"Modo de cache '{mode}' exige um diretório")
+
+        self.directory = Path(directory) if directory else None
+        self.mode = mode
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def path_for(self, codigo: int, params: Dict[str, Any]) -> Path:
+        """Arquivo da resposta: sgs-<código>-<hash dos parâmetros, sem dataFinal>.json"""
+        canonical = json.dumps(
+            {
+                key: str(value) for key, value in params.items()
+                if key not in self.UNKEYED_PARAMS
+            },
+            sort_keys=True
+        )
+        digest = hashlib.sha256(canonical.encode()).hexdigest()[:16]
+        return self.directory / f"sgs-{codigo}-{digest}.json"
+
+    def load(self, codigo: int, params: Dict[str, Any]) -> List[Dict]:
+        """
+        Retorna a resposta gravada, filtrada por dataInicial/dataFinal.
+
+        Raises:
+            BCBReplayMissError: Se não houver resposta gravada para a requisição
+        """
+        path = self.path_for(codigo, params)
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)["data"]
+        except FileNotFoundError:
+            raise BCBReplayMissError(
+                f"Resposta do BCB não gravada para série {codigo} com {params} ({path.name})"
+            )
+
+        if params.get("dataInicial"):
+            inicio = self._parse_date(params["dataInicial"])
+            data = [item for item in data if self._parse_date(item["data"]) >= inicio]
+        if params.get("dataFinal"):
+            fim = self._parse_date(params["dataFinal"])
+            data = [item for item in data if self._parse_date(item["data"]) <= fim]
+        return data
+
+    @staticmethod
+    def _parse_date(value: str) -> datetime:
+        return datetime.strptime(value, "%d/%m/%Y")
+
+    def store(self, codigo: int, params: Dict[str, Any], data: List[Dict]) -> Path:
+        """
+        Grava a resposta (escrita atômica: arquivo temporário + rename).
+
+        Se já houver gravação para a mesma chave, os registros são mesclados
+        por data (a resposta nova prevalece nas datas repetidas).
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(codigo, params)
+        tmp_path = path.with_suffix(".tmp")
+
+        try:
+            with open(path, encoding="utf-8") as file:
+                previous = json.load(file)["data"]
+        except FileNotFoundError:
+            previous = []
+        if previous:
+            merged = {item["data"]: item for item in previous}
+            merged.update((item["data"], item) for item in data)
+            data = sorted(merged.values(), key=lambda item: self._parse_date(item["data"]))
+
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({
+                "codigo": codigo,
+                "params": params,
+                "recorded_at": datetime.utcnow().isoformat(),
+                "data": data,
+            }, file, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+        logger.info(f"Resposta do BCB gravada: série {codigo} ({path.name}, {len(data)} registros)")
+        return path
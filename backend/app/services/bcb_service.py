@@ -3,13 +3,22 @@ Serviço de integração com API do Banco Central do Brasil
 Busca índices econômicos: SELIC, IGPM, IPCA, CDI, INPC, TR
 """
 
+import asyncio
+import time
+import uuid
 import httpx
 from datetime import datetime
-from typing import List, Dict, Optional
+from decimal import Decimal, InvalidOperation
+from typing import List, Dict, Optional, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, func, delete, insert as sql_insert
 
-from ..models import EconomicIndex
+from ..config import get_settings
+from ..models import EconomicIndex, EconomicIndexAccumulated
+from .bcb_response_cache import BCBResponseCache
+from .economic_index_cache import economic_index_cache
+
+settings = get_settings()
 
 # Códigos das séries MENSAIS do BCB
 # Referência: https://www3.bcb.gov.br/sgspub/localizarseries/localizarSeries.do
@@ -37,9 +46,24 @@ BCB_INDEX_DESCRIPTIONS = {
 class BCBService:
     """Serviço para buscar índices econômicos do Banco Central do Brasil"""
 
-    BASE_URL = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{codigo}/dados"
+    BASE_URL = settings.BCB_API_BASE_URL.rstrip("/") + "/dados/serie/bcdata.sgs.{codigo}/dados"
     TIMEOUT = 30.0  # segundos
 
+    # Respostas gravadas em disco (record) ou reproduzidas sem rede (replay)
+    response_cache = BCBResponseCache(
+        settings.BCB_RESPONSE_CACHE_DIR, settings.BCB_RESPONSE_CACHE_MODE
+    )
+
+    # Séries buscadas simultaneamente em sync_all_indexes (uma conexão por série)
+    MAX_CONCURRENT_FETCHES = 6
+
+    # Linhas por INSERT ... ON CONFLICT (6 parâmetros por linha)
+    UPSERT_BATCH_ROWS = 1000
+
+    # Sync incremental: meses anteriores ao último armazenado que são buscados
+    # de novo para capturar revisões publicadas pelo BCB
+    REVISION_WINDOW_MONTHS = 3
+
     @classmethod
     def get_supported_indexes(cls) -> Dict[str, str]:
         """Retorna dict com índices suportados e suas descrições"""
@@ -56,7 +80,8 @@ class BCBService:
         index_type: str,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        last_n: Optional[int] = None
+        last_n: Optional[int] = None,
+        client: Optional[httpx.AsyncClient] = None
     ) -> List[Dict]:
         """
         Busca dados de índice econômico da API do BCB.
@@ -66,6 +91,8 @@ class BCBService:
             start_date: Data inicial no formato DD/MM/YYYY
             end_date: Data final no formato DD/MM/YYYY
             last_n: Retorna apenas os últimos N registros
+            client: Cliente HTTP compartilhado (reaproveita conexões);
+                se omitido, abre um cliente só para esta chamada
 
         Returns:
             Lista de dicts com {data: "DD/MM/YYYY", valor: "10.50"}
@@ -73,6 +100,7 @@ class BCBService:
         Raises:
             ValueError: Se index_type não for suportado
             httpx.HTTPError: Se houver erro na requisição
+            BCBReplayMissError: Em modo replay, se a resposta não estiver gravada
         """
         codigo = cls.get_bcb_code(index_type)
         if codigo is None:
@@ -91,16 +119,39 @@ class BCBService:
         if last_n:
             params["ultimos"] = last_n
 
-        async with httpx.AsyncClient(timeout=cls.TIMEOUT) as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
+        if cls.response_cache.replaying:
+            return cls.response_cache.load(codigo, params)
+
+        if client is None:
+            async with httpx.AsyncClient(timeout=cls.TIMEOUT) as own_client:
+                data = await cls._get_json(own_client, url, params)
+        else:
+            data = await cls._get_json(client, url, params)
+
+        if cls.response_cache.recording:
+            cls.response_cache.store(codigo, params, data)
+        return data
+
+    @classmethod
+    async def _get_json(cls, client: httpx.AsyncClient, url: str, params: Dict) -> List[Dict]:
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
 
     @classmethod
     def parse_bcb_date(cls, date_str: str) -> datetime:
         """Converte data do formato BCB (DD/MM/YYYY) para datetime"""
         return datetime.strptime(date_str, "%d/%m/%Y")
 
+    @classmethod
+    def parse_bcb_value(cls, value: Optional[str]) -> Optional[Decimal]:
+        """Converte o valor do BCB (string) para Decimal; None se inválido"""
+        try:
+            number = Decimal(str(value))
+        except (InvalidOperation, TypeError, ValueError):
+            return None
+        return number if number.is_finite() else None
+
     @classmethod
     async def sync_index_to_db(
         cls,
@@ -108,11 +159,12 @@ class BCBService:
         index_type: str,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        last_n: Optional[int] = 12  # Default: últimos 12 meses
+        last_n: Optional[int] = 12,  # Default: últimos 12 meses
+        change_set: Optional[Set[Tuple[str, datetime]]] = None
     ) -> int:
         """
         Busca índices do BCB e salva no banco de dados.
-        Usa upsert para evitar duplicatas.
+        Usa upsert por conjunto (upsert_index_values) para evitar duplicatas.
 
         Args:
             db: Sessão do banco de dados
@@ -120,6 +172,8 @@ class BCBService:
             start_date: Data inicial (DD/MM/YYYY)
             end_date: Data final (DD/MM/YYYY)
             last_n: Número de registros mais recentes
+            change_set: Se informado, recebe os pares (index_type, reference_date)
+                inseridos ou alterados (consumido pela remensuração)
 
         Returns:
             Número de registros sincronizados
@@ -132,76 +186,388 @@ class BCBService:
             last_n=last_n
         )
 
-        if not data:
-            return 0
+        counts = await cls.upsert_index_values(db, index_type, data, change_set)
+        await db.commit()
+
+        synced_count = counts['inserted'] + counts['updated']
+        if synced_count:
+            economic_index_cache.invalidate()
+        return synced_count
+
+    @classmethod
+    async def upsert_index_values(
+        cls,
+        db: AsyncSession,
+        index_type: str,
+        data: List[Dict],
+        change_set: Optional[Set[Tuple[str, datetime]]] = None
+    ) -> Dict[str, int]:
+        """
+        Grava na sessão (sem commit) os itens retornados pelo BCB em upsert por conjunto.
+
+        Um único INSERT ... ON CONFLICT (index_type, reference_date) DO UPDATE
+        por lote de UPSERT_BATCH_ROWS itens, apoiado em uq_economic_index_type_date.
+        Linhas com o mesmo valor não são tocadas (WHERE value IS DISTINCT FROM).
+        Inserções são distinguidas de atualizações pelo created_at do lote:
+        o UPDATE não altera created_at. As taxas acumuladas da série são
+        recalculadas a partir do mês mais antigo alterado.
 
+        Returns:
+            Dict com {inserted, updated}
+        """
         index_type_lower = index_type.lower()
-        synced_count = 0
+        counts = {'inserted': 0, 'updated': 0}
+        changed_dates: List[datetime] = []
 
-        for item in data:
+        # Deduplica por data (a última ocorrência prevalece): o PostgreSQL
+        # rejeita um ON CONFLICT que afete a mesma linha duas vezes
+        values_by_date: Dict[datetime, str] = {}
+        for item in data or []:
             try:
-                reference_date = cls.parse_bcb_date(item["data"])
-                value = item["valor"]
-
-                # Verificar se já existe
-                existing = await db.execute(
-                    select(EconomicIndex).where(
-                        and_(
-                            EconomicIndex.index_type == index_type_lower,
-                            EconomicIndex.reference_date == reference_date
-                        )
-                    )
-                )
-                existing_record = existing.scalar_one_or_none()
-
-                if existing_record:
-                    # Atualizar valor se diferente
-                    if existing_record.value != value:
-                        existing_record.value = value
-                        synced_count += 1
-                else:
-                    # Criar novo registro
-                    new_index = EconomicIndex(
-                        index_type=index_type_lower,
-                        reference_date=reference_date,
-                        value=value,
-                        source="BCB"
-                    )
-                    db.add(new_index)
-                    synced_count += 1
-
+                values_by_date[cls.parse_bcb_date(item["data"])] = item["valor"]
             except (KeyError, ValueError) as e:
                 print(f"[BCB] Erro ao processar item {item}: {e}")
+
+        if not values_by_date:
+            return counts
+
+        if db.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        batch_created_at = datetime.utcnow()
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "index_type": index_type_lower,
+                "reference_date": reference_date,
+                "value": value,
+                "value_numeric": cls.parse_bcb_value(value),
+                "source": "BCB",
+                "created_at": batch_created_at,
+            }
+            for reference_date, value in values_by_date.items()
+        ]
+
+        for start in range(0, len(rows), cls.UPSERT_BATCH_ROWS):
+            stmt = insert(EconomicIndex).values(rows[start:start + cls.UPSERT_BATCH_ROWS])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[EconomicIndex.index_type, EconomicIndex.reference_date],
+                set_={"value": stmt.excluded.value, "value_numeric": stmt.excluded.value_numeric},
+                where=EconomicIndex.value.is_distinct_from(stmt.excluded.value),
+            ).returning(EconomicIndex.reference_date, EconomicIndex.created_at)
+
+            result = await db.execute(stmt)
+            for reference_date, created_at in result.fetchall():
+                counts['inserted' if created_at == batch_created_at else 'updated'] += 1
+                changed_dates.append(reference_date)
+                if change_set is not None:
+                    change_set.add((index_type_lower, reference_date))
+
+        if changed_dates:
+            await cls.refresh_accumulated(db, index_type_lower, since=min(changed_dates))
+
+        return counts
+
+    @staticmethod
+    def _month_key(value: datetime) -> int:
+        return value.year * 12 + value.month - 1
+
+    @classmethod
+    async def refresh_accumulated(
+        cls,
+        db: AsyncSession,
+        index_type: str,
+        since: Optional[datetime] = None
+    ) -> int:
+        """
+        Recalcula (sem commit) economic_index_accumulated de uma série.
+
+        Para cada registro a partir do mês de `since` (ou de toda a série),
+        grava o fator mensal e a taxa acumulada dos 12 meses terminados no mês
+        do registro. Valores inválidos contam em months_used, com fator 1.
+
+        Returns:
+            Número de linhas recalculadas
+        """
+        index_type_lower = index_type.lower()
+        janela = 12
+
+        query = select(
+            EconomicIndex.id, EconomicIndex.reference_date,
+            EconomicIndex.value, EconomicIndex.value_numeric
+        ).where(EconomicIndex.index_type == index_type_lower)
+        removal = delete(EconomicIndexAccumulated).where(
+            EconomicIndexAccumulated.index_type == index_type_lower
+        )
+
+        first_key = None
+        if since is not None:
+            first_key = cls._month_key(since)
+            first_month = datetime(first_key // 12, first_key % 12 + 1, 1)
+            history_key = first_key - (janela - 1)
+            query = query.where(
+                EconomicIndex.reference_date >= datetime(history_key // 12, history_key % 12 + 1, 1)
+            )
+            removal = removal.where(EconomicIndexAccumulated.reference_date >= first_month)
+
+        result = await db.execute(query.order_by(EconomicIndex.reference_date))
+        rows = result.all()
+        await db.execute(removal)
+
+        # Fator e quantidade de registros por mês
+        rates = []
+        month_factor: Dict[int, float] = {}
+        month_count: Dict[int, int] = {}
+        for _, reference_date, value, value_numeric in rows:
+            rate = value_numeric if value_numeric is not None else cls.parse_bcb_value(value)
+            rates.append(rate)
+            key = cls._month_key(reference_date)
+            month_count[key] = month_count.get(key, 0) + 1
+            if rate is not None:
+                month_factor[key] = month_factor.get(key, 1.0) * (1 + float(rate) / 100)
+
+        now = datetime.utcnow()
+        accumulated_rows = []
+        for (index_id, reference_date, _, _), rate in zip(rows, rates):
+            key = cls._month_key(reference_date)
+            if first_key is not None and key < first_key:
                 continue
+            window = range(key - janela + 1, key + 1)
+            accumulated = 1.0
+            for k in window:
+                accumulated *= month_factor.get(k, 1.0)
+            accumulated_rows.append({
+                "index_id": index_id,
+                "index_type": index_type_lower,
+                "reference_date": reference_date,
+                "monthly_rate": rate,
+                "factor": 1 + float(rate) / 100 if rate is not None else None,
+                "accumulated_12m": (accumulated - 1) * 100,
+                "months_used": sum(month_count.get(k, 0) for k in window),
+                "updated_at": now,
+            })
+
+        if accumulated_rows:
+            await db.execute(sql_insert(EconomicIndexAccumulated), accumulated_rows)
+
+        return len(accumulated_rows)
 
+    @classmethod
+    async def rebuild_accumulated(cls, db: AsyncSession) -> Dict[str, int]:
+        """
+        Recalcula economic_index_accumulated de todas as séries armazenadas e faz commit.
+        Executado no startup (a tabela é derivada de economic_indexes).
+        """
+        await db.execute(delete(EconomicIndexAccumulated))
+        result = await db.execute(select(EconomicIndex.index_type).distinct())
+        counts = {
+            index_type: await cls.refresh_accumulated(db, index_type)
+            for index_type in result.scalars().all()
+        }
         await db.commit()
-        return synced_count
+        economic_index_cache.invalidate()
+        return counts
+
+    @classmethod
+    async def get_last_reference_dates(cls, db: AsyncSession) -> Dict[str, datetime]:
+        """Retorna MAX(reference_date) por index_type em uma única consulta"""
+        result = await db.execute(
+            select(EconomicIndex.index_type, func.max(EconomicIndex.reference_date))
+            .group_by(EconomicIndex.index_type)
+        )
+        return {index_type: last_date for index_type, last_date in result.all()}
+
+    @classmethod
+    def incremental_start_date(
+        cls,
+        last_reference_date: datetime,
+        revision_months: Optional[int] = None
+    ) -> datetime:
+        """
+        Data inicial do sync incremental: primeiro dia do mês do último registro
+        armazenado recuado em revision_months (padrão: REVISION_WINDOW_MONTHS).
+        """
+        if revision_months is None:
+            revision_months = cls.REVISION_WINDOW_MONTHS
+        month_key = last_reference_date.year * 12 + last_reference_date.month - 1 - revision_months
+        return datetime(month_key // 12, month_key % 12 + 1, 1)
+
+    @classmethod
+    async def _changed_items(cls, db: AsyncSession, index_type: str, data: List[Dict]) -> List[Dict]:
+        """
+        Filtra os itens do BCB que são novos ou têm valor diferente do armazenado.
+
+        Uma única consulta aos registros do intervalo retornado; itens inválidos
+        são descartados (e registrados em log).
+        """
+        parsed: Dict[datetime, Tuple[Dict, str]] = {}
+        for item in data or []:
+            try:
+                parsed[cls.parse_bcb_date(item["data"])] = (item, item["valor"])
+            except (KeyError, ValueError) as e:
+                print(f"[BCB] Erro ao processar item {item}: {e}")
+
+        if not parsed:
+            return []
+
+        result = await db.execute(
+            select(EconomicIndex.reference_date, EconomicIndex.value).where(
+                EconomicIndex.index_type == index_type.lower(),
+                EconomicIndex.reference_date >= min(parsed),
+                EconomicIndex.reference_date <= max(parsed)
+            )
+        )
+        stored = dict(result.all())
+
+        return [
+            item for reference_date, (item, value) in parsed.items()
+            if stored.get(reference_date) != value
+        ]
+
+    @classmethod
+    async def fetch_all_concurrently(
+        cls,
+        index_types: Optional[List[str]] = None,
+        last_n: Optional[int] = 12,
+        max_concurrency: Optional[int] = None,
+        start_dates: Optional[Dict[str, datetime]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Busca várias séries em paralelo usando um único cliente HTTP com pool.
+
+        As conexões TLS são reaproveitadas entre as séries e no máximo
+        max_concurrency requisições ficam em andamento ao mesmo tempo.
+
+        Args:
+            index_types: Séries a buscar (padrão: todas as suportadas)
+            last_n: Número de registros mais recentes por série
+            max_concurrency: Requisições simultâneas (padrão: MAX_CONCURRENT_FETCHES)
+            start_dates: Data inicial por série; séries presentes são buscadas
+                de start_date até hoje em vez dos últimos last_n registros
+
+        Returns:
+            Dict por índice com {data, error, fetch_ms}; data é None em caso de erro
+        """
+        index_types = index_types or list(BCB_SERIES_CODES.keys())
+        max_concurrency = max_concurrency or cls.MAX_CONCURRENT_FETCHES
+        semaphore = asyncio.Semaphore(max_concurrency)
+        limits = httpx.Limits(
+            max_connections=max_concurrency,
+            max_keepalive_connections=max_concurrency
+        )
+
+        start_dates = start_dates or {}
+        today = datetime.utcnow().strftime("%d/%m/%Y")
+
+        async def fetch(client: httpx.AsyncClient, index_type: str) -> Dict:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    if index_type in start_dates:
+                        data = await cls.fetch_from_bcb(
+                            index_type,
+                            start_date=start_dates[index_type].strftime("%d/%m/%Y"),
+                            end_date=today,
+                            client=client
+                        )
+                    else:
+                        data = await cls.fetch_from_bcb(index_type, last_n=last_n, client=client)
+                    error = None
+                except Exception as e:
+                    data, error = None, str(e)
+                elapsed = (time.perf_counter() - started) * 1000
+                return {'data': data, 'error': error, 'fetch_ms': round(elapsed, 2)}
+
+        async with httpx.AsyncClient(timeout=cls.TIMEOUT, limits=limits) as client:
+            fetched = await asyncio.gather(*(fetch(client, t) for t in index_types))
+
+        return dict(zip(index_types, fetched))
 
     @classmethod
     async def sync_all_indexes(
         cls,
         db: AsyncSession,
-        last_n: int = 12
+        last_n: int = 12,
+        change_set: Optional[Set[Tuple[str, datetime]]] = None,
+        max_concurrency: Optional[int] = None,
+        timings: Optional[Dict[str, Dict[str, float]]] = None,
+        upsert_counts: Optional[Dict[str, Dict[str, int]]] = None,
+        incremental: bool = False
     ) -> Dict[str, int]:
         """
         Sincroniza todos os índices suportados.
 
+        As séries são buscadas em paralelo (fetch_all_concurrently) e gravadas
+        em seguida, uma a uma, na mesma sessão: a duração total fica próxima
+        da série mais lenta em vez da soma de todas. Cada série é confirmada
+        separadamente, então um erro em uma não desfaz as demais.
+
+        Com incremental=True, cada série com dados armazenados é buscada a
+        partir de MAX(reference_date) menos REVISION_WINDOW_MONTHS (séries
+        vazias usam last_n) e só os itens novos ou revisados são gravados;
+        sem alterações, a série não gera escrita nem commit.
+
         Args:
             db: Sessão do banco de dados
             last_n: Número de registros mais recentes por índice
+            change_set: Se informado, recebe os pares (index_type, reference_date) alterados
+            max_concurrency: Requisições simultâneas ao BCB (1 = sequencial)
+            timings: Se informado, recebe {index_type: {fetch, write}} em ms
+            upsert_counts: Se informado, recebe {index_type: {inserted, updated}}
+            incremental: Busca só a partir do último mês armazenado (mais a janela de revisão)
 
         Returns:
             Dict com contagem de registros sincronizados por índice
         """
+        start_dates = None
+        if incremental:
+            last_dates = await cls.get_last_reference_dates(db)
+            start_dates = {
+                index_type: cls.incremental_start_date(last_dates[index_type])
+                for index_type in BCB_SERIES_CODES if index_type in last_dates
+            }
+
+        fetched = await cls.fetch_all_concurrently(
+            last_n=last_n, max_concurrency=max_concurrency, start_dates=start_dates
+        )
+
         results = {}
-        for index_type in BCB_SERIES_CODES.keys():
-            try:
-                count = await cls.sync_index_to_db(db, index_type, last_n=last_n)
-                results[index_type] = count
-                print(f"[BCB] {index_type.upper()}: {count} registros sincronizados")
-            except Exception as e:
-                print(f"[BCB] Erro ao sincronizar {index_type}: {e}")
+        for index_type, outcome in fetched.items():
+            write_ms = 0.0
+            if outcome['error'] is not None:
+                print(f"[BCB] Erro ao sincronizar {index_type}: {outcome['error']}")
                 results[index_type] = -1  # Indica erro
+            else:
+                started = time.perf_counter()
+                changed: Set[Tuple[str, datetime]] = set()
+                try:
+                    data = outcome['data']
+                    if incremental:
+                        data = await cls._changed_items(db, index_type, data)
+                    if data:
+                        upserted = await cls.upsert_index_values(db, index_type, data, changed)
+                        await db.commit()
+                        if changed:
+                            economic_index_cache.invalidate()
+                    else:
+                        upserted = {'inserted': 0, 'updated': 0}
+                    count = upserted['inserted'] + upserted['updated']
+                    if upsert_counts is not None:
+                        upsert_counts[index_type] = upserted
+                    if change_set is not None:
+                        change_set.update(changed)
+                    results[index_type] = count
+                    print(f"[BCB] {index_type.upper()}: {count} registros sincronizados")
+                except Exception as e:
+                    await db.rollback()
+                    print(f"[BCB] Erro ao sincronizar {index_type}: {e}")
+                    results[index_type] = -1
+                write_ms = round((time.perf_counter() - started) * 1000, 2)
+
+            if timings is not None:
+                timings[index_type] = {'fetch': outcome['fetch_ms'], 'write': write_ms}
 
         return results
 
@@ -218,6 +584,9 @@ class BCBService:
         Se max_age_days for fornecido, verifica se o índice é recente o suficiente.
         Se o índice for antigo (> max_age_days), retorna None para forçar refresh.
 
+        A leitura passa pelo economic_index_cache (invalidado após o commit de
+        uma sincronização); o objeto retornado não está ligado à sessão.
+
         Args:
             db: Sessão do banco de dados
             index_type: Tipo do índice
@@ -228,13 +597,28 @@ class BCBService:
         """
         from datetime import datetime, timedelta
         
-        result = await db.execute(
-            select(EconomicIndex)
-            .where(EconomicIndex.index_type == index_type.lower())
-            .order_by(EconomicIndex.reference_date.desc())
-            .limit(1)
-        )
-        index = result.scalar_one_or_none()
+        key = f"latest_value:{index_type.lower()}"
+        entry = economic_index_cache.get(key)
+        if entry is not None:
+            snapshot = entry['value']
+        else:
+            result = await db.execute(
+                select(EconomicIndex)
+                .where(EconomicIndex.index_type == index_type.lower())
+                .order_by(EconomicIndex.reference_date.desc())
+                .limit(1)
+            )
+            row = result.scalar_one_or_none()
+            snapshot = None
+            if row is not None:
+                # Série ainda sem valores não fica em cache (como as respostas 404)
+                snapshot = {
+                    column.key: getattr(row, column.key)
+                    for column in EconomicIndex.__table__.columns
+                }
+                economic_index_cache.put_value(key, snapshot)
+
+        index = EconomicIndex(**snapshot) if snapshot else None
         
         # Cache agressivo: se max_age_days fornecido e índice é antigo, retornar None
         if index and max_age_days:
@@ -270,7 +654,6 @@ class BCBService:
             query = query.where(EconomicIndex.index_type == index_type.lower())
 
         # Contar total
-        from sqlalchemy import func
         count_query = select(func.count()).select_from(EconomicIndex)
         if index_type:
             count_query = count_query.where(EconomicIndex.index_type == index_type.lower())
@@ -11,7 +11,6 @@ from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import Contract, User, NotificationType
-from sqlalchemy import text
 from .notification_service import NotificationService
 
 logger = logging.getLogger(__name__)
@@ -40,11 +39,13 @@ class ContractExpirationService:
         today = date.today()
         future_date = today + timedelta(days=days_ahead)
 
-        # Buscar contratos ativos
+        # Buscar contratos ativos com versão (início e prazo da versão corrente)
         contracts_query = select(Contract).where(
             and_(
                 Contract.status == "active",
-                Contract.is_deleted == False
+                Contract.is_deleted == False,
+                Contract.current_data_inicio.isnot(None),
+                Contract.current_prazo_meses.isnot(None)
             )
         )
         contracts_result = await db.execute(contracts_query)
@@ -53,30 +54,8 @@ class ContractExpirationService:
         expiring_contracts = []
 
         for contract in contracts:
-            # Buscar versão mais recente do contrato usando SQL direto
-            version_query = text("""
-                SELECT data_inicio, prazo_meses, version_number
-                FROM contract_versions
-                WHERE contract_id = :contract_id
-                ORDER BY version_number DESC
-                LIMIT 1
-            """)
-            version_result = await db.execute(version_query, {"contract_id": str(contract.id)})
-            version_row = version_result.first()
-
-            if not version_row or not version_row.data_inicio or not version_row.prazo_meses:
-                continue
-
-            # Calcular data de vencimento
-            if isinstance(version_row.data_inicio, date):
-                start_date = version_row.data_inicio
-            elif isinstance(version_row.data_inicio, datetime):
-                start_date = version_row.data_inicio.date()
-            else:
-                continue
-
             # Calcular data de vencimento (data_inicio + prazo_meses)
-            end_date = start_date + relativedelta(months=version_row.prazo_meses)
+            end_date = contract.current_data_inicio + relativedelta(months=contract.current_prazo_meses)
 
             # Verificar se está no período de alerta
             if today <= end_date <= future_date:
@@ -97,7 +76,7 @@ class ContractExpirationService:
                         "user_name": user.name,
                         "end_date": end_date,
                         "days_until_expiry": days_until_expiry,
-                        "version_number": version_row.version_number
+                        "version_number": contract.current_version_number
                     })
 
         return expiring_contracts
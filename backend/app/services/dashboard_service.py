@@ -4,8 +4,13 @@ Service para agregar métricas do dashboard analítico
 
 from datetime import date, timedelta
 from typing import Dict, List
+from uuid import UUID
+
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
+
+from ..models import Contract
 
 
 class DashboardService:
@@ -25,31 +30,15 @@ class DashboardService:
             - total_ativos: float
             - total_despesas_mensais: float
         """
-        # Buscar última versão de cada contrato ativo do usuário
+        # Última versão de cada contrato ativo do usuário (contracts.current_version_id)
         query = text("""
             SELECT 
-                COUNT(DISTINCT c.id) as total_contracts,
-                COALESCE(SUM(cv.total_vp), 0) as total_passivos,
-                COALESCE(SUM(cv.total_vp), 0) as total_ativos,
-                COALESCE(SUM(
-                    CASE 
-                        WHEN cv.resultados_json IS NOT NULL AND cv.resultados_json != ''
-                        THEN (
-                            SELECT SUM((item->>'despTotal')::numeric)
-                            FROM jsonb_array_elements(cv.resultados_json::jsonb->'contabilizacao') item
-                            WHERE (item->>'mes')::int = 1
-                        )
-                        ELSE 0
-                    END
-                ), 0) as total_despesas_mensais
+                COUNT(c.id) as total_contracts,
+                COALESCE(SUM(c.current_total_vp), 0) as total_passivos,
+                COALESCE(SUM(c.current_total_vp), 0) as total_ativos,
+                COALESCE(SUM(cv.despesa_mes1), 0) as total_despesas_mensais
             FROM contracts c
-            LEFT JOIN LATERAL (
-                SELECT cv.*
-                FROM contract_versions cv
-                WHERE cv.contract_id = c.id
-                ORDER BY cv.version_number DESC
-                LIMIT 1
-            ) cv ON true
+            LEFT JOIN contract_versions cv ON cv.id = c.current_version_id
             WHERE c.user_id = CAST(:user_id AS uuid)
                 AND c.is_deleted = false
                 AND c.status = 'active'
@@ -72,60 +61,81 @@ class DashboardService:
         """
         Retorna evolução do passivo ao longo do tempo.
         
+        Para cada mês da janela soma o passivoFinal do cronograma da versão
+        corrente de cada contrato ativo (contract_schedule_rows). Meses fora
+        do prazo do contrato contam como zero.
+        
         Args:
             user_id: ID do usuário
-            months: Número de meses para retornar (padrão: 12)
+            months: Número de meses até o mês atual (padrão: 12)
             
         Returns:
             Lista de dicts com {month: str, passivo: float}
         """
-        # Calcular data inicial (months meses atrás)
-        end_date = date.today()
-        start_date = end_date - timedelta(days=months * 30)
+        fim = np.datetime64(date.today(), 'M')
+        inicio = fim - (months - 1)
         
-        # Buscar evolução mensal do passivo
-        # Versão simplificada: soma o passivo atual de todos os contratos ativos
-        # Para cada mês, retorna a soma do passivo das últimas versões
         query = text("""
-            WITH months AS (
-                SELECT generate_series(
-                    DATE_TRUNC('month', CAST(:start_date AS date)),
-                    DATE_TRUNC('month', CAST(:end_date AS date)),
-                    '1 month'::interval
-                )::date as month
-            )
-            SELECT 
-                TO_CHAR(m.month, 'YYYY-MM') as month,
-                COALESCE(SUM(cv.total_vp), 0) as passivo
-            FROM months m
-            CROSS JOIN contracts c
-            LEFT JOIN LATERAL (
-                SELECT cv.*
-                FROM contract_versions cv
-                WHERE cv.contract_id = c.id
-                    AND DATE_TRUNC('month', cv.archived_at::date) <= m.month
-                ORDER BY cv.version_number DESC
-                LIMIT 1
-            ) cv ON true
-            WHERE c.user_id = CAST(:user_id AS uuid)
+            SELECT r.version_id, r.data, r.mes, r.passivo_final
+            FROM contracts c
+            JOIN contract_schedule_rows r ON r.version_id = c.current_version_id
+            WHERE c.user_id = :user_id
                 AND c.is_deleted = false
                 AND c.status = 'active'
-            GROUP BY m.month
-            ORDER BY m.month
-        """)
+                AND r.data BETWEEN :start_date AND :end_date
+        """).bindparams(bindparam("user_id", type_=Contract.__table__.c.user_id.type))
         
         result = await self.db.execute(query, {
-            "user_id": user_id,
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat()
+            "user_id": UUID(str(user_id)),
+            "start_date": inicio.astype(date),
+            "end_date": (fim + 1).astype(date) - timedelta(days=1)
         })
-        
         rows = result.fetchall()
+        
+        passivos = self.aggregate_by_month(rows, inicio, months)
+        meses = np.arange(inicio, inicio + months)
         return [
-            {"month": row[0], "passivo": float(row[1]) if row[1] else 0.0}
-            for row in rows
+            {"month": str(mes), "passivo": round(float(passivo), 2)}
+            for mes, passivo in zip(meses, passivos)
         ]
 
+    @staticmethod
+    def aggregate_by_month(rows, inicio: np.datetime64, months: int) -> np.ndarray:
+        """
+        Soma o passivoFinal por mês em uma única passada vetorizada.
+        
+        Args:
+            rows: Linhas (version_id, data, mes, passivo_final) do cronograma
+            inicio: Primeiro mês da janela (datetime64[M])
+            months: Tamanho da janela
+            
+        Returns:
+            Array (months,) com o passivo total de cada mês
+        """
+        if not rows:
+            return np.zeros(months)
+        
+        versoes, datas, numeros, passivos = zip(*rows)
+        _, versao = np.unique(np.array([str(v) for v in versoes]), return_inverse=True)
+        mes = (
+            np.array(datas, dtype='datetime64[D]').astype('datetime64[M]') - inicio
+        ).astype(int)
+        numeros = np.array(numeros, dtype=int)
+        passivos = np.array(passivos, dtype=float)
+        
+        # A linha 0 (reconhecimento inicial) cai no mesmo mês da parcela 1:
+        # em cada (versão, mês) vale o saldo da última linha
+        grupo = versao * months + mes
+        ordem = np.lexsort((numeros, grupo))
+        grupo = grupo[ordem]
+        ultima = np.append(grupo[1:] != grupo[:-1], True)
+        
+        return np.bincount(
+            mes[ordem][ultima],
+            weights=passivos[ordem][ultima],
+            minlength=months
+        )[:months]
+
     async def get_distribution(self, user_id: str) -> List[Dict]:
         """
         Retorna distribuição de contratos por categoria.
@@ -136,16 +146,9 @@ class DashboardService:
         query = text("""
             SELECT 
                 c.categoria,
-                COUNT(DISTINCT c.id) as count,
-                COALESCE(SUM(cv.total_vp), 0) as value
+                COUNT(c.id) as count,
+                COALESCE(SUM(c.current_total_vp), 0) as value
             FROM contracts c
-            LEFT JOIN LATERAL (
-                SELECT cv.*
-                FROM contract_versions cv
-                WHERE cv.contract_id = c.id
-                ORDER BY cv.version_number DESC
-                LIMIT 1
-            ) cv ON true
             WHERE c.user_id = CAST(:user_id AS uuid)
                 AND c.is_deleted = false
                 AND c.status = 'active'
@@ -175,19 +178,9 @@ class DashboardService:
         query = text("""
             SELECT 
                 c.name as contract_name,
-                COALESCE((
-                    SELECT SUM((item->>'despTotal')::numeric)
-                    FROM jsonb_array_elements(cv.resultados_json::jsonb->'contabilizacao') item
-                    WHERE (item->>'mes')::int = 1
-                ), 0) as despesa_mensal
+                COALESCE(cv.despesa_mes1, 0) as despesa_mensal
             FROM contracts c
-            LEFT JOIN LATERAL (
-                SELECT cv.*
-                FROM contract_versions cv
-                WHERE cv.contract_id = c.id
-                ORDER BY cv.version_number DESC
-                LIMIT 1
-            ) cv ON true
+            LEFT JOIN contract_versions cv ON cv.id = c.current_version_id
             WHERE c.user_id = CAST(:user_id AS uuid)
                 AND c.is_deleted = false
                 AND c.status = 'active'
@@ -221,21 +214,14 @@ class DashboardService:
             SELECT 
                 c.id::text as contract_id,
                 c.name as contract_name,
-                (cv.data_inicio + (cv.prazo_meses || ' months')::interval)::date as expiration_date,
-                (cv.data_inicio + (cv.prazo_meses || ' months')::interval)::date - CURRENT_DATE as days_until_expiration
+                cv.data_fim as expiration_date,
+                cv.data_fim - CURRENT_DATE as days_until_expiration
             FROM contracts c
-            LEFT JOIN LATERAL (
-                SELECT cv.*
-                FROM contract_versions cv
-                WHERE cv.contract_id = c.id
-                ORDER BY cv.version_number DESC
-                LIMIT 1
-            ) cv ON true
+            JOIN contract_versions cv ON cv.id = c.current_version_id
             WHERE c.user_id = CAST(:user_id AS uuid)
                 AND c.is_deleted = false
                 AND c.status = 'active'
-                AND cv.id IS NOT NULL
-                AND (cv.data_inicio + (cv.prazo_meses || ' months')::interval)::date BETWEEN CURRENT_DATE AND (CURRENT_DATE + CAST(:days AS interval))
+                AND cv.data_fim BETWEEN CURRENT_DATE AND (CURRENT_DATE + CAST(:days AS interval))
             ORDER BY expiration_date ASC
         """)
         
@@ -0,0 +1,126 @@
+"""
+Cache em memória das respostas de leitura de índices econômicos
+Os dados mudam no máximo uma vez por dia (sincronização com o BCB)
+"""
+
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Any, Tuple
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class EconomicIndexReadCache:
+    """
+    Respostas serializadas dos endpoints /api/economic-indexes, por chave
+    (e o último valor de cada índice usado pelos serviços, via put_value).
+
+    Cada entrada guarda o corpo JSON, o ETag (hash do corpo) e o Last-Modified.
+    A sincronização com o BCB invalida o cache após o commit; o TTL limita a
+    defasagem das demais instâncias, que não recebem a invalidação.
+
+    O Last-Modified acompanha o conteúdo, não a invalidação: o último ETag de
+    cada chave é mantido mesmo após expirar ou invalidar, e ao reconstruir a
+    entrada o Last-Modified só avança (para o momento da reconstrução) se o
+    ETag mudou. Assim uma instância que nunca recebeu invalidate() não
+    responde 304 a If-Modified-Since com dados antigos.
+    """
+
+    # Chaves com ETag/Last-Modified lembrados (as mais antigas são descartadas)
+    MAX_VERSIONS = 10000
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, Tuple[str, datetime]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _now() -> datetime:
+        # Last-Modified tem resolução de segundos
+        return datetime.now(timezone.utc).replace(microsecond=0)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retorna a entrada válida da chave ou None"""
+        entry = self._entries.get(key)
+        if entry is None or entry['expires_at'] <= time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, body: bytes) -> Dict[str, Any]:
+        """
+        Armazena o corpo serializado de uma resposta.
+
+        Com TTL 0 o cache fica desativado: a entrada é retornada (para os
+        cabeçalhos da resposta atual) mas não é guardada.
+        """
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        previous = self._versions.pop(key, None)
+        last_modified = previous[1] if previous and previous[0] == etag else self._now()
+        self._versions[key] = (etag, last_modified)
+        while len(self._versions) > self.MAX_VERSIONS:
+            del self._versions[next(iter(self._versions))]
+
+        entry = {
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'expires_at': time.monotonic() + self.ttl_seconds,
+        }
+        if self.ttl_seconds > 0:
+            self._entries[key] = entry
+        return entry
+
+    def put_value(self, key: str, value: Any) -> None:
+        """
+        Armazena um valor já desserializado (ex.: último valor de um índice
+        lido por BCBService.get_latest_value). Mesmo TTL e invalidação das
+        respostas; sem ETag/Last-Modified.
+        """
+        if self.ttl_seconds > 0:
+            self._entries[key] = {
+                'value': value,
+                'expires_at': time.monotonic() + self.ttl_seconds,
+            }
+
+    def invalidate(self) -> None:
+        """Descarta todas as entradas (chamado após o commit de uma sincronização)"""
+        if self._entries:
+            logger.info(f"Cache de índices econômicos invalidado ({len(self._entries)} entradas)")
+        self._entries.clear()
+
+    @staticmethod
+    def is_not_modified(
+        entry: Dict[str, Any],
+        if_none_match: Optional[str],
+        if_modified_since: Optional[str]
+    ) -> bool:
+        """
+        Avalia os cabeçalhos condicionais da requisição (RFC 9110).
+        If-None-Match tem precedência sobre If-Modified-Since.
+        """
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or entry['etag'] in tags
+
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return entry['last_modified'] <= since
+
+        return False
+
+
+economic_index_cache = EconomicIndexReadCache(get_settings().ECONOMIC_INDEX_CACHE_TTL_SECONDS)
@@ -0,0 +1,205 @@
+"""
+Cache em memória das séries de índices econômicos para o job de remensuração
+Carrega cada série uma única vez e pré-calcula o acumulado de 12 meses por mês
+"""
+
+import logging
+from datetime import date
+from typing import Optional, Iterable, List, Dict, Any
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import EconomicIndex
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSeriesCache:
+    """
+    Séries de índices indexadas por mês (ano * 12 + mês - 1).
+
+    Substitui as consultas por contrato de RemeasurementService.get_latest_index
+    e get_accumulated_annual_index durante o job. A resolução é mensal: as
+    séries do BCB são datadas no dia 1, então a janela "mês do último índice
+    publicado e os 11 anteriores" equivale à de economic_index_accumulated.
+    """
+
+    JANELA_MESES = 12
+
+    def __init__(self, reference_date: date, series: Dict[str, Dict[str, Any]]):
+        self.reference_date = reference_date
+        self.series = series
+
+    @staticmethod
+    def _month_key(value: date) -> int:
+        return value.year * 12 + value.month - 1
+
+    @classmethod
+    async def load(
+        cls,
+        db: AsyncSession,
+        index_types: Iterable[str],
+        reference_date: Optional[date] = None
+    ) -> "IndexSeriesCache":
+        """
+        Carrega as séries dos tipos informados em uma única consulta.
+
+        Args:
+            db: Sessão do banco
+            index_types: Tipos de índice usados pelos contratos
+            reference_date: Data de referência (padrão: hoje); índices posteriores são ignorados
+
+        Returns:
+            Cache com as séries pré-calculadas
+        """
+        ref_date = reference_date or date.today()
+        tipos = sorted({t.lower() for t in index_types if t})
+        if not tipos:
+            return cls(ref_date, {})
+
+        query = select(EconomicIndex).where(
+            EconomicIndex.index_type.in_(tipos),
+            EconomicIndex.reference_date <= ref_date
+        ).order_by(EconomicIndex.index_type, EconomicIndex.reference_date.asc())
+
+        result = await db.execute(query)
+
+        rows_by_type: Dict[str, List[EconomicIndex]] = {}
+        for index in result.scalars().all():
+            rows_by_type.setdefault(index.index_type, []).append(index)
+
+        ref_key = cls._month_key(ref_date)
+        series = {
+            index_type: cls._build_series(rows, ref_key)
+            for index_type, rows in rows_by_type.items()
+        }
+
+        logger.info(
+            "Séries de índices carregadas: "
+            + ", ".join(f"{t}={len(r)}" for t, r in rows_by_type.items())
+        )
+
+        return cls(ref_date, series)
+
+    @classmethod
+    def _build_series(cls, rows: List[EconomicIndex], ref_key: int) -> Dict[str, Any]:
+        """
+        Monta os arrays mensais de uma série (ordenada por data).
+
+        - acumulado[k]: produto de (1 + taxa/100) dos meses k-11..k
+        - meses_usados[k]: quantidade de registros nessa janela
+        - ultimo[k]: posição do registro mais recente até o mês k (-1 se nenhum)
+        """
+        keys = np.array([cls._month_key(r.reference_date) for r in rows])
+        primeiro = int(keys[0])
+        tamanho = max(ref_key, int(keys[-1])) - primeiro + 1
+        posicoes = keys - primeiro
+
+        valores = np.full(len(rows), np.nan)
+        for i, r in enumerate(rows):
+            try:
+                valores[i] = float(r.value)
+            except (ValueError, TypeError):
+                continue
+        validos = ~np.isnan(valores)
+
+        fatores = np.ones(tamanho)
+        np.multiply.at(fatores, posicoes[validos], 1 + valores[validos] / 100)
+        contagem = np.zeros(tamanho, dtype=int)
+        np.add.at(contagem, posicoes, 1)
+        ultimo = np.full(tamanho, -1)
+        np.maximum.at(ultimo, posicoes, np.arange(len(rows)))
+
+        janela = cls.JANELA_MESES
+        acumulado = sliding_window_view(
+            np.concatenate([np.ones(janela - 1), fatores]), janela
+        ).prod(axis=1)
+        meses_usados = sliding_window_view(
+            np.concatenate([np.zeros(janela - 1, dtype=int), contagem]), janela
+        ).sum(axis=1)
+
+        return {
+            'primeiro': primeiro,
+            'rows': rows,
+            'acumulado': acumulado,
+            'meses_usados': meses_usados,
+            'ultimo': np.maximum.accumulate(ultimo),
+        }
+
+    def _month_index(self, serie: Dict[str, Any], reference_date: Optional[date]) -> int:
+        ref_date = reference_date or self.reference_date
+        if ref_date > self.reference_date:
+            raise ValueError(
+                f"Data {ref_date} posterior à referência do cache ({self.reference_date})"
+            )
+        return self._month_key(ref_date) - serie['primeiro']
+
+    def get_latest_index(
+        self,
+        index_type: str,
+        reference_date: Optional[date] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Equivalente em memória de RemeasurementService.get_latest_index"""
+        serie = self.series.get(index_type.lower())
+        if not serie:
+            return None
+
+        k = self._month_index(serie, reference_date)
+        if k < 0 or serie['ultimo'][k] < 0:
+            return None
+
+        index = serie['rows'][serie['ultimo'][k]]
+        return {
+            'id': str(index.id),
+            'index_type': index.index_type,
+            'reference_date': index.reference_date,
+            'value': index.value,
+            'source': index.source
+        }
+
+    def get_accumulated_annual_index(
+        self,
+        index_type: str,
+        reference_date: Optional[date] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Equivalente em memória de RemeasurementService.get_accumulated_annual_index"""
+        serie = self.series.get(index_type.lower())
+        if not serie:
+            return None
+
+        k_ref = self._month_index(serie, reference_date)
+        if k_ref < 0 or serie['ultimo'][k_ref] < 0:
+            return None
+
+        # Janela de 12 meses terminada no mês do último índice publicado
+        last_index = serie['rows'][serie['ultimo'][k_ref]]
+        k = self._month_key(last_index.reference_date) - serie['primeiro']
+        if k_ref - k >= self.JANELA_MESES:
+            return None
+
+        accumulated_pct = (float(serie['acumulado'][k]) - 1) * 100
+
+        return {
+            'id': str(last_index.id),
+            'index_type': index_type,
+            'reference_date': last_index.reference_date,
+            'value': str(round(accumulated_pct, 4)),
+            'monthly_value': last_index.value,
+            'source': last_index.source,
+            'months_used': int(serie['meses_usados'][k]),
+            'is_accumulated': True
+        }
+
+    def get_index_for_remeasurement(
+        self,
+        index_type: str,
+        periodicidade: str,
+        reference_date: Optional[date] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Equivalente em memória de RemeasurementService.get_index_for_remeasurement"""
+        if periodicidade == 'mensal':
+            return self.get_latest_index(index_type, reference_date)
+        return self.get_accumulated_annual_index(index_type, reference_date)
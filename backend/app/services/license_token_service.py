@@ -0,0 +1,282 @@
+"""
+Tokens de licença assinados com Ed25519, verificáveis sem acesso ao banco
+Inclui a lista de revogação mantida em memória e atualizada periodicamente
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Any, Callable, List, Set
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import (
+    Ed25519PrivateKey,
+    Ed25519PublicKey,
+)
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..database import AsyncSessionLocal
+from ..models import License, LicenseStatus
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _epoch(value: datetime) -> int:
+    """Segundos desde a época de um datetime UTC sem timezone (padrão do projeto)"""
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+class LicenseRevocationList:
+    """
+    Chaves de licenças revogadas, suspensas ou canceladas (ainda não expiradas).
+
+    O refresh substitui a lista pelo estado do banco. Revogações feitas
+    nesta instância entram na hora (add) e são mantidas por local_ttl_seconds
+    mesmo que a licença seja excluída, pois tokens emitidos antes continuam
+    válidos até expirar.
+    """
+
+    def __init__(self, refresh_seconds: int, local_ttl_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self.local_ttl_seconds = local_ttl_seconds
+        self._keys: Set[str] = set()
+        self._local: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed_at: Optional[datetime] = None
+
+    def _prune_local(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, added in self._local.items() if now - added > self.local_ttl_seconds]:
+            del self._local[key]
+
+    def is_revoked(self, key: str) -> bool:
+        key = key.upper()
+        return key in self._keys or key in self._local
+
+    def add(self, key: str) -> None:
+        """Revoga a chave nesta instância imediatamente"""
+        self._local[key.upper()] = time.monotonic()
+
+    def discard(self, key: str) -> None:
+        """Remove a chave da lista (licença reativada)"""
+        key = key.upper()
+        self._keys.discard(key)
+        self._local.pop(key, None)
+
+    def keys(self) -> List[str]:
+        self._prune_local()
+        return sorted(self._keys | set(self._local))
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """
+        Recarrega a lista a partir do banco.
+
+        Returns:
+            Quantidade de chaves revogadas
+        """
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(License.key).where(
+                or_(
+                    License.revoked == True,
+                    License.status.in_([LicenseStatus.SUSPENDED, LicenseStatus.CANCELLED]),
+                ),
+                or_(License.expires_at.is_(None), License.expires_at > now),
+            )
+        )
+        self._keys = {key.upper() for key in result.scalars().all()}
+        self._prune_local()
+        self.refreshed_at = now
+        return len(self._keys)
+
+    async def _run(self, session_factory: Callable) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                async with session_factory() as db:
+                    await self.refresh(db)
+            except Exception as e:
+                logger.warning(f"Erro ao atualizar lista de revogação de licenças: {e}")
+
+    def start(self, session_factory: Optional[Callable] = None) -> None:
+        """Inicia a atualização periódica (chamado no startup da aplicação)"""
+        if self.refresh_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(session_factory or AsyncSessionLocal))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class LicenseTokenService:
+    """
+    Emissão e verificação de tokens de licença assinados (Ed25519).
+
+    Formato: lic1.<payload>.<assinatura>, ambos em base64url. O payload é o
+    JSON com chave, tipo, max_activations, máquina, expiração da licença e
+    expiração do token (exp). O token expira em LICENSE_TOKEN_TTL_HOURS ou
+    na expiração da licença, o que vier primeiro; depois disso o cliente
+    revalida em /api/validate-license.
+
+    A verificação usa só a chave pública e a lista de revogação em memória,
+    sem consultar o banco. Sem LICENSE_SIGNING_KEY, fora de produção é
+    gerada uma chave efêmera (tokens deixam de valer ao reiniciar); em
+    produção a emissão fica desativada.
+    """
+
+    PREFIX = "lic1"
+
+    def __init__(
+        self,
+        private_key: Optional[Ed25519PrivateKey],
+        ttl_hours: int,
+        revocations: LicenseRevocationList
+    ):
+        self._private_key = private_key
+        self.ttl_hours = ttl_hours
+        self.revocations = revocations
+        self._public_key: Optional[Ed25519PublicKey] = (
+            private_key.public_key() if private_key else None
+        )
+
+    @staticmethod
+    def load_private_key(value: Optional[str], environment: str) -> Optional[Ed25519PrivateKey]:
+        """
+        Carrega a chave privada: PEM (PKCS8) ou semente de 32 bytes em base64.
+        """
+        if value:
+            value = value.strip()
+            if value.startswith("-----BEGIN"):
+                key = serialization.load_pem_private_key(value.encode(), password=None)
+                if not isinstance(key, Ed25519PrivateKey):
+                    raise ValueError("LICENSE_SIGNING_KEY não é uma chave Ed25519")
+                return key
+            return Ed25519PrivateKey.from_private_bytes(_b64decode(value))
+
+        if environment == "production":
+            logger.warning("LICENSE_SIGNING_KEY ausente: tokens de licença assinados desativados")
+            return None
+
+        logger.warning("LICENSE_SIGNING_KEY ausente: usando chave efêmera (apenas desenvolvimento)")
+        return Ed25519PrivateKey.generate()
+
+    @property
+    def enabled(self) -> bool:
+        return self._private_key is not None
+
+    @property
+    def public_key_bytes(self) -> bytes:
+        return self._public_key.public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+
+    @property
+    def key_id(self) -> str:
+        return hashlib.sha256(self.public_key_bytes).hexdigest()[:16]
+
+    def public_key_b64(self) -> str:
+        return _b64encode(self.public_key_bytes)
+
+    def sign(self, data: bytes) -> str:
+        return _b64encode(self._private_key.sign(data))
+
+    def issue(self, license: License, now: Optional[datetime] = None) -> Optional[str]:
+        """
+        Emite o token assinado da licença (None se a emissão estiver desativada).
+        """
+        if not self.enabled:
+            return None
+
+        now = now or datetime.utcnow()
+        expires = now + timedelta(hours=self.ttl_hours)
+        if license.expires_at and license.expires_at < expires:
+            expires = license.expires_at
+
+        payload = {
+            "key": license.key,
+            "type": license.license_type.value if license.license_type else None,
+            "max_activations": license.max_activations,
+            "machine_id": license.machine_id,
+            "license_expires_at": license.expires_at.isoformat() if license.expires_at else None,
+            "iat": _epoch(now),
+            "exp": _epoch(expires),
+            "kid": self.key_id,
+        }
+        body = _b64encode(json.dumps(payload, separators=(",", ":"), sort_keys=True).encode())
+        signing_input = f"{self.PREFIX}.{body}"
+        return f"{signing_input}.{self.sign(signing_input.encode())}"
+
+    @classmethod
+    def is_license_token(cls, token: str) -> bool:
+        return token.startswith(f"{cls.PREFIX}.")
+
+    def verify(self, token: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Verifica assinatura e expiração do token, sem consultar o banco.
+
+        Returns:
+            Payload do token, ou None se inválido ou expirado
+        """
+        if not self.enabled or not self.is_license_token(token):
+            return None
+
+        try:
+            prefix, body, signature = token.split(".")
+            self._public_key.verify(_b64decode(signature), f"{prefix}.{body}".encode())
+            payload = json.loads(_b64decode(body))
+        except (ValueError, InvalidSignature):
+            return None
+
+        now = now or datetime.utcnow()
+        if payload.get("exp", 0) <= _epoch(now):
+            return None
+        return payload
+
+    def check(self, token: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Verifica o token e a lista de revogação (None se inválido ou revogado)"""
+        payload = self.verify(token, now)
+        if payload is None or self.revocations.is_revoked(payload["key"]):
+            return None
+        return payload
+
+    def signed_revocation_list(self) -> Dict[str, Any]:
+        """Lista de revogação assinada, para verificação offline pelos clientes"""
+        data = {
+            "issued_at": _epoch(datetime.utcnow()),
+            "keys": self.revocations.keys(),
+        }
+        canonical = json.dumps(data, separators=(",", ":"), sort_keys=True).encode()
+        return {**data, "kid": self.key_id, "signature": self.sign(canonical)}
+
+
+license_revocations = LicenseRevocationList(
+    settings.LICENSE_REVOCATION_REFRESH_SECONDS,
+    settings.LICENSE_TOKEN_TTL_HOURS * 3600,
+)
+
+license_token_service = LicenseTokenService(
+    LicenseTokenService.load_private_key(settings.LICENSE_SIGNING_KEY, settings.ENVIRONMENT),
+    settings.LICENSE_TOKEN_TTL_HOURS,
+    license_revocations,
+)
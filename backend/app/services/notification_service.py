@@ -32,6 +32,7 @@ class NotificationService:
         entity_id: Optional[UUID] = None,
         metadata: Optional[dict] = None,
         send_email: bool = True,
+        commit: bool = True,
     ) -> Notification:
         """
         Cria uma nova notificação para um usuário.
@@ -46,6 +47,7 @@ class NotificationService:
             entity_id: ID da entidade relacionada (opcional)
             metadata: Metadados adicionais em JSON (opcional)
             send_email: Se True, envia email ao usuário (padrão: True)
+            commit: Se False, apenas adiciona à sessão do chamador (gravada no commit dele)
 
         Returns:
             Notification: Notificação criada
@@ -62,8 +64,9 @@ class NotificationService:
         )
 
         db.add(notification)
-        await db.commit()
-        await db.refresh(notification)
+        if commit:
+            await db.commit()
+            await db.refresh(notification)
 
         logger.info(
             f"Notificação criada: user_id={user_id}, type={notification_type.value}"
@@ -71,41 +74,54 @@ class NotificationService:
 
         # Enviar email se solicitado
         if send_email:
-            try:
-                # Buscar usuário para obter email
-                user_result = await db.execute(select(User).where(User.id == user_id))
-                user = user_result.scalar_one_or_none()
-
-                if user and user.email:
-                    # Gerar template de email baseado no tipo
-                    html_content, text_content = (
-                        NotificationService._generate_email_template(
-                            notification_type=notification_type,
-                            title=title,
-                            message=message,
-                            metadata=metadata,
-                            entity_type=entity_type,
-                            entity_id=entity_id,
-                        )
-                    )
+            await NotificationService.send_notification_email(db, notification, metadata)
 
-                    subject = title
-                    await EmailService.send_email(
-                        to_email=user.email,
-                        subject=subject,
-                        html_content=html_content,
-                        text_content=text_content,
-                    )
-                    logger.info(
-                        f"Email enviado para {user.email} sobre notificação {notification.id}"
+        return notification
+
+    @staticmethod
+    async def send_notification_email(
+        db: AsyncSession,
+        notification: Notification,
+        metadata: Optional[dict] = None,
+    ) -> None:
+        """
+        Envia o email de uma notificação já criada.
+
+        Falhas são apenas registradas em log (não afetam a notificação).
+        """
+        try:
+            # Buscar usuário para obter email
+            user_result = await db.execute(select(User).where(User.id == notification.user_id))
+            user = user_result.scalar_one_or_none()
+
+            if user and user.email:
+                # Gerar template de email baseado no tipo
+                html_content, text_content = (
+                    NotificationService._generate_email_template(
+                        notification_type=notification.notification_type,
+                        title=notification.title,
+                        message=notification.message,
+                        metadata=metadata,
+                        entity_type=notification.entity_type,
+                        entity_id=notification.entity_id,
                     )
-            except Exception as e:
-                # Não falhar a criação da notificação se o email falhar
-                logger.error(
-                    f"Erro ao enviar email para notificação {notification.id}: {e}"
                 )
 
-        return notification
+                subject = notification.title
+                await EmailService.send_email(
+                    to_email=user.email,
+                    subject=subject,
+                    html_content=html_content,
+                    text_content=text_content,
+                )
+                logger.info(
+                    f"Email enviado para {user.email} sobre notificação {notification.id}"
+                )
+        except Exception as e:
+            # Não falhar a criação da notificação se o email falhar
+            logger.error(
+                f"Erro ao enviar email para notificação {notification.id}: {e}"
+            )
 
     @staticmethod
     async def get_user_notifications(
@@ -350,6 +366,8 @@ class NotificationService:
         index_type: str,
         old_value: float,
         new_value: float,
+        send_email: bool = True,
+        commit: bool = True,
     ) -> Notification:
         """Cria notificação de remensuração automática realizada"""
         return await NotificationService.create_notification(
@@ -366,6 +384,8 @@ class NotificationService:
                 "old_value": old_value,
                 "new_value": new_value,
             },
+            send_email=send_email,
+            commit=commit,
         )
 
     @staticmethod
@@ -0,0 +1,272 @@
+"""
+Serviço de Recálculo em Lote de Contratos IFRS 16
+Carrega as versões mais recentes em uma consulta e recalcula a carteira com o AmortizationEngine
+"""
+
+import logging
+import time
+from typing import Optional, List, Dict, Any
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .amortization_engine import AmortizationEngine
+from .bcb_service import BCBService
+
+logger = logging.getLogger(__name__)
+
+
+class RecalculationService:
+    """Serviço para recálculo vetorizado de carteiras de contratos"""
+
+    # Contratos por matriz (limita memória: ~N x 361 x 8 bytes por série)
+    CHUNK_SIZE = 1000
+
+    @staticmethod
+    async def get_latest_versions(
+        db: AsyncSession,
+        user_id: str,
+        contract_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca a versão mais recente de cada contrato do usuário em uma única consulta.
+
+        Args:
+            db: Sessão do banco
+            user_id: ID do usuário dono dos contratos
+            contract_ids: IDs específicos; None busca todos os contratos do usuário
+
+        Returns:
+            Lista de dicts com os parâmetros da versão mais recente
+        """
+        filtro_ids = "AND c.id IN :contract_ids" if contract_ids else ""
+        query = text(f"""
+            SELECT
+                c.id as contract_id,
+                c.name as contract_name,
+                cv.id as version_id,
+                cv.version_number,
+                cv.data_inicio,
+                cv.prazo_meses,
+                cv.carencia_meses,
+                cv.parcela_inicial,
+                cv.taxa_desconto_anual,
+                cv.reajuste_tipo,
+                cv.reajuste_valor,
+                cv.mes_reajuste,
+                cv.total_vp,
+                cv.total_nominal,
+                cv.avp
+            FROM contracts c
+            JOIN contract_versions cv ON cv.id = c.current_version_id
+            WHERE c.user_id = :user_id
+            AND c.is_deleted = FALSE
+            {filtro_ids}
+            ORDER BY c.id
+        """)
+
+        params: Dict[str, Any] = {"user_id": user_id}
+        if contract_ids:
+            query = query.bindparams(bindparam("contract_ids", expanding=True))
+            params["contract_ids"] = list(contract_ids)
+
+        result = await db.execute(query, params)
+
+        return [
+            {
+                'contract_id': str(row[0]),
+                'contract_name': row[1],
+                'version_id': str(row[2]),
+                'version_number': row[3],
+                'data_inicio': row[4],
+                'prazo_meses': row[5],
+                'carencia_meses': row[6] or 0,
+                'parcela_inicial': float(row[7]) if row[7] else 0,
+                'taxa_desconto_anual': float(row[8]) if row[8] else 0,
+                'reajuste_tipo': row[9] or 'manual',
+                'reajuste_valor': float(row[10]) if row[10] is not None else None,
+                'mes_reajuste': row[11] or 1,
+                'total_vp': float(row[12]) if row[12] else 0,
+                'total_nominal': float(row[13]) if row[13] else 0,
+                'avp': float(row[14]) if row[14] else 0,
+            }
+            for row in result.fetchall()
+        ]
+
+    @staticmethod
+    async def get_latest_indexes(
+        db: AsyncSession,
+        versions: List[Dict[str, Any]]
+    ) -> Dict[str, float]:
+        """
+        Busca o valor mais recente de cada índice usado pelas versões ainda não
+        remensuradas (uma consulta por tipo).
+
+        Returns:
+            Dict tipo -> valor arredondado a 2 casas, como o campo reajusteAnual do navegador
+        """
+        tipos = sorted({
+            v['reajuste_tipo'] for v in versions
+            if v['reajuste_tipo'] != 'manual' and v['reajuste_valor'] is None
+        })
+        latest = {}
+        for tipo in tipos:
+            index = await BCBService.get_latest_value(db, tipo)
+            if index is not None:
+                latest[tipo] = round(float(index.value), 2)
+        return latest
+
+    @staticmethod
+    def invalid_reason(version: Dict[str, Any]) -> Optional[str]:
+        """
+        Motivo pelo qual a versão não entra na matriz do motor (None se válida).
+
+        Uma versão legada com prazo ou data inválidos faria calculate_batch
+        rejeitar o lote inteiro; ela é reportada à parte.
+        """
+        if not version['prazo_meses'] or version['prazo_meses'] <= 0:
+            return "prazo_meses deve ser maior que zero"
+        try:
+            AmortizationEngine._as_date(version['data_inicio'])
+        except ValueError as e:
+            return str(e)
+        return None
+
+    @staticmethod
+    def to_engine_params(
+        version: Dict[str, Any],
+        latest_indexes: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Converte uma versão em parâmetros do motor.
+
+        Reajuste manual usa reajuste_valor como taxa anual (como no calculator.js).
+        Contratos indexados ainda não remensurados (reajuste_valor NULL, como o
+        navegador grava) usam o valor mais recente do índice, como o
+        handleReajusteChange do contracts.js. Versões remensuradas gravam o índice
+        aplicado em reajuste_valor e já o têm em parcela_inicial, então são
+        calculadas com parcela constante, como na própria remensuração.
+        """
+        if version['reajuste_tipo'] == 'manual':
+            reajuste_anual = version['reajuste_valor']
+        elif version['reajuste_valor'] is None:
+            reajuste_anual = (latest_indexes or {}).get(version['reajuste_tipo'])
+        else:
+            reajuste_anual = 0
+        return {
+            'data_inicio': version['data_inicio'],
+            'prazo_meses': version['prazo_meses'],
+            'parcela_inicial': version['parcela_inicial'],
+            'taxa_desconto_anual': version['taxa_desconto_anual'],
+            'carencia_meses': version['carencia_meses'],
+            'reajuste_anual': reajuste_anual or 0,
+            'mes_reajuste': version['mes_reajuste'],
+        }
+
+    @staticmethod
+    def recalculate_versions(
+        versions: List[Dict[str, Any]],
+        include_schedule: bool = False,
+        latest_indexes: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recalcula as versões informadas em lotes de CHUNK_SIZE contratos.
+
+        Cada lote vira uma matriz (contratos x meses) processada em uma
+        única passada pelo AmortizationEngine.
+
+        Args:
+            versions: Saída de get_latest_versions
+            include_schedule: Se True, inclui resultados_json completo por contrato
+            latest_indexes: Saída de get_latest_indexes
+
+        Returns:
+            Lista de resultados na mesma ordem de `versions`
+        """
+        results = []
+        chunk_size = RecalculationService.CHUNK_SIZE
+
+        for start in range(0, len(versions), chunk_size):
+            chunk = versions[start:start + chunk_size]
+            batch = AmortizationEngine.calculate_batch(
+                [RecalculationService.to_engine_params(v, latest_indexes) for v in chunk]
+            )
+            summaries = AmortizationEngine.batch_summary(batch)
+
+            for index, (version, summary) in enumerate(zip(chunk, summaries)):
+                item = {
+                    'contract_id': version['contract_id'],
+                    'contract_name': version['contract_name'],
+                    'version_id': version['version_id'],
+                    'version_number': version['version_number'],
+                    **{key: round(value, 2) for key, value in summary.items()},
+                    'stored_total_vp': version['total_vp'],
+                }
+                if include_schedule:
+                    item['resultados_json'] = AmortizationEngine.to_resultados_json(
+                        AmortizationEngine.batch_result(batch, index)
+                    )
+                results.append(item)
+
+        return results
+
+    @staticmethod
+    async def recalculate_portfolio(
+        db: AsyncSession,
+        user_id: str,
+        contract_ids: Optional[List[str]] = None,
+        include_schedule: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Recalcula a carteira do usuário (ou os contratos informados).
+
+        Returns:
+            Relatório com resultados por contrato, IDs sem versão, versões
+            inválidas (não recalculadas) e tempos
+        """
+        started = time.perf_counter()
+        versions = await RecalculationService.get_latest_versions(db, user_id, contract_ids)
+
+        invalid = []
+        valid_versions = []
+        for version in versions:
+            reason = RecalculationService.invalid_reason(version)
+            if reason:
+                invalid.append({
+                    'contract_id': version['contract_id'],
+                    'version_id': version['version_id'],
+                    'error': reason,
+                })
+            else:
+                valid_versions.append(version)
+        if invalid:
+            logger.warning(f"Recálculo em lote: {len(invalid)} versões inválidas ignoradas")
+
+        latest_indexes = await RecalculationService.get_latest_indexes(db, valid_versions)
+        fetched = time.perf_counter()
+
+        results = RecalculationService.recalculate_versions(
+            valid_versions, include_schedule, latest_indexes
+        )
+        finished = time.perf_counter()
+
+        not_found = []
+        if contract_ids:
+            found = {v['contract_id'] for v in versions}
+            not_found = [cid for cid in contract_ids if cid not in found]
+
+        logger.info(
+            f"Recálculo em lote: {len(results)} contratos em "
+            f"{(finished - started) * 1000:.1f} ms"
+        )
+
+        return {
+            'total': len(results),
+            'not_found': not_found,
+            'invalid': invalid,
+            'timings_ms': {
+                'fetch': round((fetched - started) * 1000, 2),
+                'calculation': round((finished - fetched) * 1000, 2),
+            },
+            'contracts': results,
+        }
@@ -3,18 +3,30 @@ Serviço de Remensuração Automática de Contratos IFRS 16
 Detecta mudanças em índices econômicos e cria novas versões de contratos automaticamente
 """
 
+import asyncio
 import json
 import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
 from decimal import Decimal
-from typing import Optional, List, Dict, Any
+from typing import Optional, Iterable, List, Dict, Any, Set, Tuple
 from uuid import UUID
 
-from sqlalchemy import select, text
+from sqlalchemy import select, text, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models import Contract, User, EconomicIndex, NotificationType
+from ..models import (
+    Contract, User, EconomicIndex, EconomicIndexAccumulated, NotificationType,
+    RemeasurementCheckpoint
+)
+from ..repositories.contracts import ContractRepository
 from .notification_service import NotificationService
+from .amortization_engine import AmortizationEngine
+from .bcb_service import BCBService
+from .index_series_cache import IndexSeriesCache
 
 logger = logging.getLogger(__name__)
 
@@ -32,16 +44,58 @@ class RemeasurementService:
         'tr': 'tr'
     }
 
+    # Modo em lotes: contratos por lote (uma transação por lote)
+    CHUNK_SIZE = 500
+
+    # Modo em lotes: sessões simultâneas de gravação (pool: 1 + 2 overflow)
+    MAX_WRITE_CONNECTIONS = 2
+
+    # Linhas por INSERT multi-row (23 parâmetros por linha; limite do PostgreSQL: 32767)
+    BULK_INSERT_ROWS = 1000
+
+    # Colunas gravadas em contract_versions por uma remensuração
+    VERSION_COLUMNS = (
+        'contract_id', 'version_number', 'version_id', 'data_inicio', 'prazo_meses',
+        'carencia_meses', 'parcela_inicial', 'taxa_desconto_anual', 'reajuste_tipo',
+        'reajuste_periodicidade', 'reajuste_valor', 'mes_reajuste', 'resultados_json',
+        'total_vp', 'total_nominal', 'avp', 'notas', 'despesa_mes1', 'passivo_cp_inicial',
+        'passivo_lp_inicial', 'total_juros', 'total_deprec', 'data_fim'
+    )
+
     @staticmethod
-    async def get_contracts_for_remeasurement(db: AsyncSession) -> List[Dict[str, Any]]:
+    async def get_contracts_for_remeasurement(
+        db: AsyncSession,
+        after_contract_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        index_types: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Busca todos os contratos que usam índices econômicos para reajuste.
 
+        Com `limit`, retorna uma página ordenada por c.id (keyset):
+        a próxima página começa após o último contract_id recebido.
+
+        Args:
+            db: Sessão do banco
+            after_contract_id: Cursor keyset (retorna contratos com id maior)
+            limit: Tamanho da página; None retorna todos
+            index_types: Restringe aos contratos desses reajuste_tipo; None usa todos os índices
+
         Returns:
             Lista de contratos com suas versões mais recentes
         """
+        tipos = sorted(
+            RemeasurementService.REAJUSTE_TO_INDEX if index_types is None
+            else {t.lower() for t in index_types} & set(RemeasurementService.REAJUSTE_TO_INDEX)
+        )
+        if not tipos:
+            return []
+
+        keyset = "AND c.id > :after_contract_id" if after_contract_id else ""
+        paging = "ORDER BY c.id LIMIT :limit" if limit else "ORDER BY c.user_id, c.id"
+
         # Buscar contratos ativos que usam índices econômicos
-        query = text("""
+        query = text(f"""
             SELECT
                 c.id as contract_id,
                 c.name as contract_name,
@@ -66,18 +120,20 @@ class RemeasurementService:
                 cv.notas,
                 cv.created_at as version_created_at
             FROM contracts c
-            JOIN contract_versions cv ON c.id = cv.contract_id
+            JOIN contract_versions cv ON cv.id = c.current_version_id
             WHERE c.is_deleted = FALSE
-            AND cv.reajuste_tipo IN ('igpm', 'ipca', 'selic', 'cdi', 'inpc', 'tr')
-            AND cv.version_number = (
-                SELECT MAX(cv2.version_number)
-                FROM contract_versions cv2
-                WHERE cv2.contract_id = c.id
-            )
-            ORDER BY c.user_id, c.id
-        """)
-
-        result = await db.execute(query)
+            AND cv.reajuste_tipo IN :index_types
+            {keyset}
+            {paging}
+        """).bindparams(bindparam("index_types", expanding=True))
+
+        params: Dict[str, Any] = {'index_types': tipos}
+        if after_contract_id:
+            params['after_contract_id'] = after_contract_id
+        if limit:
+            params['limit'] = limit
+
+        result = await db.execute(query, params)
         rows = result.fetchall()
 
         contracts = []
@@ -126,17 +182,17 @@ class RemeasurementService:
         Returns:
             Dicionário com dados do índice ou None
         """
-        query = select(EconomicIndex).where(
-            EconomicIndex.index_type == index_type.lower()
-        )
-
-        if reference_date:
-            query = query.where(EconomicIndex.reference_date <= reference_date)
-
-        query = query.order_by(EconomicIndex.reference_date.desc()).limit(1)
+        if reference_date is None:
+            # Sem data de referência: último valor, servido pelo cache de índices
+            index = await BCBService.get_latest_value(db, index_type)
+        else:
+            query = select(EconomicIndex).where(
+                EconomicIndex.index_type == index_type.lower(),
+                EconomicIndex.reference_date <= reference_date
+            ).order_by(EconomicIndex.reference_date.desc()).limit(1)
 
-        result = await db.execute(query)
-        index = result.scalar_one_or_none()
+            result = await db.execute(query)
+            index = result.scalar_one_or_none()
 
         if index:
             return {
@@ -156,10 +212,12 @@ class RemeasurementService:
         reference_date: Optional[date] = None
     ) -> Optional[Dict[str, Any]]:
         """
-        Calcula o índice acumulado dos últimos 12 meses.
+        Retorna a taxa acumulada dos 12 meses terminados no último índice
+        publicado até a data de referência.
 
-        A taxa acumulada é calculada como:
-        ((1 + taxa_mes1/100) * (1 + taxa_mes2/100) * ... * (1 + taxa_mes12/100) - 1) * 100
+        A taxa é pré-calculada na sincronização (economic_index_accumulated):
+        ((1 + taxa_mes1/100) * ... * (1 + taxa_mes12/100) - 1) * 100
+        Índices sem publicação nos 12 meses anteriores à referência são ignorados.
 
         Args:
             db: Sessão do banco
@@ -169,50 +227,35 @@ class RemeasurementService:
         Returns:
             Dicionário com taxa acumulada ou None
         """
-        from datetime import timedelta
         from dateutil.relativedelta import relativedelta
 
         # Data de referência (usa hoje se não especificada)
         ref_date = reference_date or date.today()
 
-        # Buscar últimos 12 meses de índices
-        start_date = ref_date - relativedelta(months=12)
-
-        query = select(EconomicIndex).where(
-            EconomicIndex.index_type == index_type.lower(),
-            EconomicIndex.reference_date > start_date,
-            EconomicIndex.reference_date <= ref_date
-        ).order_by(EconomicIndex.reference_date.asc())
+        query = select(EconomicIndexAccumulated, EconomicIndex).join(
+            EconomicIndex, EconomicIndex.id == EconomicIndexAccumulated.index_id
+        ).where(
+            EconomicIndexAccumulated.index_type == index_type.lower(),
+            EconomicIndexAccumulated.reference_date > ref_date - relativedelta(months=12),
+            EconomicIndexAccumulated.reference_date <= ref_date
+        ).order_by(EconomicIndexAccumulated.reference_date.desc()).limit(1)
 
         result = await db.execute(query)
-        indexes = result.scalars().all()
+        row = result.first()
 
-        if not indexes:
+        if not row:
             return None
 
-        # Calcular taxa acumulada
-        accumulated = 1.0
-        for idx in indexes:
-            try:
-                monthly_rate = float(idx.value) / 100  # Converter de % para decimal
-                accumulated *= (1 + monthly_rate)
-            except (ValueError, TypeError):
-                continue
-
-        # Converter de volta para percentual
-        accumulated_pct = (accumulated - 1) * 100
-
-        # Usar a data do último índice como referência
-        last_index = indexes[-1]
+        accumulated, last_index = row
 
         return {
             'id': str(last_index.id),
             'index_type': index_type,
             'reference_date': last_index.reference_date,
-            'value': str(round(accumulated_pct, 4)),
+            'value': str(round(float(accumulated.accumulated_12m), 4)),
             'monthly_value': last_index.value,  # Taxa mensal para referência
             'source': last_index.source,
-            'months_used': len(indexes),
+            'months_used': accumulated.months_used,
             'is_accumulated': True
         }
 
@@ -247,7 +290,8 @@ class RemeasurementService:
     @staticmethod
     async def check_if_needs_remeasurement(
         db: AsyncSession,
-        contract: Dict[str, Any]
+        contract: Dict[str, Any],
+        index_cache: Optional[IndexSeriesCache] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Verifica se um contrato precisa de remensuração.
@@ -258,6 +302,11 @@ class RemeasurementService:
         2. Existe um índice econômico mais recente do que a última versão
         3. O índice mudou significativamente
 
+        Args:
+            db: Sessão do banco
+            contract: Dados do contrato
+            index_cache: Séries pré-carregadas; se None, consulta o banco
+
         Returns:
             Dicionário com dados da remensuração necessária ou None
         """
@@ -275,9 +324,12 @@ class RemeasurementService:
         # Buscar índice correto baseado na periodicidade
         # - Mensal: taxa do último mês
         # - Anual: taxa acumulada dos últimos 12 meses
-        latest_index = await RemeasurementService.get_index_for_remeasurement(
-            db, index_type, periodicidade
-        )
+        if index_cache is not None:
+            latest_index = index_cache.get_index_for_remeasurement(index_type, periodicidade)
+        else:
+            latest_index = await RemeasurementService.get_index_for_remeasurement(
+                db, index_type, periodicidade
+            )
 
         if not latest_index:
             logger.warning(
@@ -329,22 +381,37 @@ class RemeasurementService:
     @staticmethod
     async def calculate_new_values(
         contract: Dict[str, Any],
-        new_index_value: float
+        new_index_value: float,
+        reference_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Versão assíncrona de `compute_new_values` (mesma assinatura)"""
+        return RemeasurementService.compute_new_values(contract, new_index_value, reference_date)
+
+    @staticmethod
+    def compute_new_values(
+        contract: Dict[str, Any],
+        new_index_value: float,
+        reference_date: Optional[date] = None
     ) -> Dict[str, Any]:
         """
         Calcula os novos valores do contrato após remensuração.
 
-        Aplica o novo índice às parcelas e recalcula VP, AVP, etc.
+        Aplica o novo índice às parcelas e recalcula VP, AVP e a tabela
+        de contabilização via AmortizationEngine (mesmo formato do
+        calculator.js). Quando a versão anterior tem cronograma gravado,
+        os meses anteriores a reference_date são reaproveitados e só o
+        prazo remanescente é recalculado; caso contrário, recalcula tudo.
+
+        Args:
+            contract: Dados do contrato (saída de get_contracts_for_remeasurement)
+            new_index_value: Novo valor do índice
+            reference_date: Data a partir da qual vale a nova parcela (padrão: hoje)
         """
         # Obter dados da versão atual
         parcela_inicial = contract['parcela_inicial']
         prazo_meses = contract['prazo_meses']
         carencia_meses = contract['carencia_meses']
         taxa_anual = contract['taxa_desconto_anual']
-        resultados_atuais = contract['resultados_json'] or {}
-
-        # Taxa mensal
-        taxa_mensal = (1 + taxa_anual / 100) ** (1/12) - 1
 
         # Calcular nova parcela com reajuste
         previous_value = contract['reajuste_valor'] or 0
@@ -355,46 +422,79 @@ class RemeasurementService:
 
         nova_parcela = parcela_inicial * fator_reajuste
 
-        # Recalcular fluxo de caixa
-        parcelas = []
-        for mes in range(1, prazo_meses + 1):
-            if mes <= carencia_meses:
-                # Durante carência: apenas juros
-                parcelas.append({
-                    'mes': mes,
-                    'parcela': 0,
-                    'tipo': 'carencia'
-                })
-            else:
-                parcelas.append({
-                    'mes': mes,
-                    'parcela': nova_parcela,
-                    'tipo': 'normal'
-                })
-
-        # Calcular VP
-        total_vp = 0
-        for i, p in enumerate(parcelas):
-            if p['parcela'] > 0:
-                # VP = Parcela / (1 + taxa)^n
-                vp_parcela = p['parcela'] / ((1 + taxa_mensal) ** (i + 1))
-                total_vp += vp_parcela
-
-        # Calcular total nominal
-        total_nominal = sum(p['parcela'] for p in parcelas)
-
-        # AVP = Total Nominal - Total VP
-        avp = total_nominal - total_vp
+        # Remensuração incremental: reaproveita os meses já realizados
+        resultado = None
+        anterior = RemeasurementService._parse_resultados(contract.get('resultados_json'))
+        if anterior.get('contabilizacao'):
+            try:
+                mes_efetivo = AmortizationEngine.effective_month(
+                    contract['data_inicio'], reference_date or date.today()
+                )
+                resultado = AmortizationEngine.remeasure_tail(
+                    anterior=anterior,
+                    data_inicio=contract['data_inicio'],
+                    prazo_meses=prazo_meses,
+                    mes_efetivo=mes_efetivo,
+                    nova_parcela=nova_parcela,
+                    taxa_desconto_anual=taxa_anual,
+                    carencia_meses=carencia_meses or 0
+                )
+            except (ValueError, KeyError, TypeError) as e:
+                logger.info(f"Remensuração incremental indisponível, recalculando tudo: {e}")
+
+        # Recalcular fluxo de caixa e contabilização (parcela constante após carência)
+        if resultado is None:
+            resultado = AmortizationEngine.calculate(
+                data_inicio=contract['data_inicio'],
+                prazo_meses=prazo_meses,
+                parcela_inicial=nova_parcela,
+                taxa_desconto_anual=taxa_anual,
+                carencia_meses=carencia_meses or 0
+            )
 
         return {
             'nova_parcela': nova_parcela,
-            'total_vp': round(total_vp, 2),
-            'total_nominal': round(total_nominal, 2),
-            'avp': round(avp, 2),
+            'total_vp': round(resultado['totalVP'], 2),
+            'total_nominal': round(resultado['totalNominal'], 2),
+            'avp': round(resultado['avp'], 2),
             'fator_reajuste': fator_reajuste,
-            'parcelas': parcelas
+            'remensuracao': resultado.get('remensuracao'),
+            'resultados': AmortizationEngine.to_resultados_json(resultado),
+            'resumo': AmortizationEngine.schedule_summary(
+                resultado, contract['data_inicio'], prazo_meses
+            ),
+            'cronograma': AmortizationEngine.schedule_rows(resultado)
         }
 
+    @staticmethod
+    def _merge_resultados_json(resultados: Any, remeasurement_info: Dict[str, Any]) -> str:
+        """
+        Serializa resultados_json com a chave remeasurement_info.
+
+        Aceita resultados já serializados (str), como os devolvidos pelo
+        pool de processos do modo em lotes; a string é decodificada e precisa
+        ser um objeto JSON. NaN/Infinity (rejeitados pelo jsonb) geram ValueError.
+        """
+        if isinstance(resultados, str):
+            resultados = json.loads(resultados)
+        if not isinstance(resultados, dict):
+            raise ValueError(
+                f"resultados_json deve ser um objeto JSON, recebido {type(resultados).__name__}"
+            )
+        return json.dumps(
+            {**resultados, 'remeasurement_info': remeasurement_info}, allow_nan=False
+        )
+
+    @staticmethod
+    def _parse_resultados(value: Any) -> Dict[str, Any]:
+        """Normaliza resultados_json (TEXT ou JSON) em dict; vazio se inválido"""
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return {}
+        return value if isinstance(value, dict) else {}
+
     @staticmethod
     async def create_remeasured_version(
         db: AsyncSession,
@@ -402,7 +502,8 @@ class RemeasurementService:
         new_values: Dict[str, Any],
         new_index_value: float,
         index_type: str,
-        periodicidade: str = 'anual'
+        periodicidade: str = 'anual',
+        commit: bool = True
     ) -> Dict[str, Any]:
         """
         Cria uma nova versão do contrato com os valores remensurados.
@@ -414,17 +515,117 @@ class RemeasurementService:
             new_index_value: Valor do índice utilizado
             index_type: Tipo do índice
             periodicidade: 'mensal' ou 'anual'
+            commit: Se False, a versão fica na transação do chamador
 
         Returns:
             Dados da nova versão criada
         """
-        # Próximo número de versão
-        new_version_number = contract['version_number'] + 1
+        created = await RemeasurementService.create_remeasured_versions_bulk(db, [{
+            'contract': contract,
+            'new_values': new_values,
+            'new_index_value': new_index_value,
+            'index_type': index_type,
+            'periodicidade': periodicidade,
+        }])
+
+        if commit:
+            await db.commit()
+
+        return created[0]
+
+    @staticmethod
+    async def create_remeasured_versions_bulk(
+        db: AsyncSession,
+        items: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Cria as versões remensuradas de um lote com INSERTs multi-row (sem commit),
+        grava o cronograma em contract_schedule_rows e atualiza a versão
+        corrente dos contratos.
+
+        Os números de versão são atribuídos para o lote inteiro: um contrato
+        que aparece mais de uma vez recebe números consecutivos.
 
+        Args:
+            db: Sessão do banco
+            items: Dicts com contract, new_values, new_index_value, index_type
+                e periodicidade (mesmos argumentos de create_remeasured_version)
+
+        Returns:
+            Dados das versões criadas (id, version_number, version_id,
+            created_at), na mesma ordem de `items`
+        """
+        rows = []
+        next_numbers: Dict[str, int] = {}
+        for item in items:
+            contract = item['contract']
+            version_number = next_numbers.get(
+                contract['contract_id'], contract['version_number']
+            ) + 1
+            next_numbers[contract['contract_id']] = version_number
+            rows.append(RemeasurementService._version_row(
+                contract,
+                item['new_values'],
+                item['new_index_value'],
+                item['index_type'],
+                item.get('periodicidade', 'anual'),
+                version_number
+            ))
+
+        columns = RemeasurementService.VERSION_COLUMNS
+        created: Dict[tuple, Dict[str, Any]] = {}
+        cronogramas = [item['new_values'].get('cronograma') or [] for item in items]
+
+        for start in range(0, len(rows), RemeasurementService.BULK_INSERT_ROWS):
+            batch = rows[start:start + RemeasurementService.BULK_INSERT_ROWS]
+            values_sql = []
+            params: Dict[str, Any] = {}
+            for i, row in enumerate(batch):
+                values_sql.append("(" + ", ".join(f":{col}_{i}" for col in columns) + ")")
+                params.update({f"{col}_{i}": row[col] for col in columns})
+
+            insert_query = text(f"""
+                INSERT INTO contract_versions ({', '.join(columns)})
+                VALUES {', '.join(values_sql)}
+                RETURNING id, contract_id, version_number, version_id, created_at
+            """)
+            result = await db.execute(insert_query, params)
+
+            # RETURNING não garante a ordem das linhas: mapear por (contrato, versão)
+            for row in result.fetchall():
+                created[(str(row[1]), row[2])] = {
+                    'id': str(row[0]),
+                    'version_number': row[2],
+                    'version_id': row[3],
+                    'created_at': row[4]
+                }
+
+            # Cronograma em linhas e ponteiro para a versão mais recente dos contratos do lote
+            await ContractRepository.insert_schedule_rows(db, [
+                {**linha, 'version_id': created[(row['contract_id'], row['version_number'])]['id']}
+                for row, cronograma in zip(batch, cronogramas[start:start + len(batch)])
+                for linha in cronograma
+            ])
+            await ContractRepository.refresh_current_version(
+                db, (row['contract_id'] for row in batch)
+            )
+
+        return [created[(row['contract_id'], row['version_number'])] for row in rows]
+
+    @staticmethod
+    def _version_row(
+        contract: Dict[str, Any],
+        new_values: Dict[str, Any],
+        new_index_value: float,
+        index_type: str,
+        periodicidade: str,
+        version_number: int
+    ) -> Dict[str, Any]:
+        """Monta os valores de contract_versions para uma versão remensurada"""
         # Gerar version_id
         categoria = contract['categoria'] or 'OT'
         numero_seq = contract['numero_sequencial'] or 1
-        version_id = f"ID{categoria}{new_version_number}-{numero_seq:04d}"
+        version_id = f"ID{categoria}{version_number}-{numero_seq:04d}"
 
         # Nota explicando a remensuração
         periodicidade_label = "mensal" if periodicidade == "mensal" else "anual (acumulado 12m)"
@@ -436,116 +637,129 @@ class RemeasurementService:
             nota = f"{contract['notas']}\n\n{nota}"
 
         # Resultados JSON com informações da remensuração
-        resultados_json = {
-            'parcelas': new_values['parcelas'],
-            'remeasurement_info': {
+        resultados_json = RemeasurementService._merge_resultados_json(
+            new_values['resultados'],
+            {
                 'type': 'automatic',
                 'index_type': index_type,
                 'periodicidade': periodicidade,
                 'previous_value': contract['reajuste_valor'],
                 'new_value': new_index_value,
                 'adjustment_factor': new_values['fator_reajuste'],
+                'incremental': new_values.get('remensuracao'),
                 'date': datetime.utcnow().isoformat()
             }
-        }
-
-        # Inserir nova versão
-        insert_query = text("""
-            INSERT INTO contract_versions (
-                contract_id, version_number, version_id, data_inicio, prazo_meses, carencia_meses,
-                parcela_inicial, taxa_desconto_anual, reajuste_tipo, reajuste_periodicidade,
-                reajuste_valor, mes_reajuste, resultados_json, total_vp, total_nominal, avp, notas
-            )
-            VALUES (
-                :contract_id, :version_number, :version_id, :data_inicio, :prazo_meses, :carencia_meses,
-                :parcela_inicial, :taxa_desconto_anual, :reajuste_tipo, :reajuste_periodicidade,
-                :reajuste_valor, :mes_reajuste, :resultados_json, :total_vp, :total_nominal, :avp, :notas
-            )
-            RETURNING id, version_number, version_id, created_at
-        """)
-
-        result = await db.execute(
-            insert_query,
-            {
-                'contract_id': contract['contract_id'],
-                'version_number': new_version_number,
-                'version_id': version_id,
-                'data_inicio': contract['data_inicio'],
-                'prazo_meses': contract['prazo_meses'],
-                'carencia_meses': contract['carencia_meses'],
-                'parcela_inicial': new_values['nova_parcela'],
-                'taxa_desconto_anual': contract['taxa_desconto_anual'],
-                'reajuste_tipo': index_type,
-                'reajuste_periodicidade': periodicidade,
-                'reajuste_valor': new_index_value,
-                'mes_reajuste': contract['mes_reajuste'],
-                'resultados_json': json.dumps(resultados_json),
-                'total_vp': new_values['total_vp'],
-                'total_nominal': new_values['total_nominal'],
-                'avp': new_values['avp'],
-                'notas': nota
-            }
         )
 
-        row = result.fetchone()
-        await db.commit()
-
         return {
-            'id': str(row[0]),
-            'version_number': row[1],
-            'version_id': row[2],
-            'created_at': row[3]
+            'contract_id': contract['contract_id'],
+            'version_number': version_number,
+            'version_id': version_id,
+            'data_inicio': contract['data_inicio'],
+            'prazo_meses': contract['prazo_meses'],
+            'carencia_meses': contract['carencia_meses'],
+            'parcela_inicial': new_values['nova_parcela'],
+            'taxa_desconto_anual': contract['taxa_desconto_anual'],
+            'reajuste_tipo': index_type,
+            'reajuste_periodicidade': periodicidade,
+            'reajuste_valor': new_index_value,
+            'mes_reajuste': contract['mes_reajuste'],
+            'resultados_json': resultados_json,
+            'total_vp': new_values['total_vp'],
+            'total_nominal': new_values['total_nominal'],
+            'avp': new_values['avp'],
+            'notas': nota,
+            **new_values['resumo']
         }
 
     @staticmethod
-    async def run_remeasurement_job(db: AsyncSession) -> Dict[str, Any]:
+    async def run_remeasurement_job(
+        db: AsyncSession,
+        dry_run: bool = False,
+        index_types: Optional[Iterable[str]] = None
+    ) -> Dict[str, Any]:
         """
         Executa o job de remensuração automática para todos os contratos elegíveis.
 
         Este método é chamado pelo Cloud Run Job agendado mensalmente.
 
+        Args:
+            db: Sessão do banco
+            dry_run: Se True, calcula os novos valores sem gravar versões nem
+                notificações e retorna o diff por contrato em 'diffs'
+            index_types: Restringe aos contratos reajustados por esses índices
+                (ex.: os alterados na última sincronização); None analisa todos
+
         Returns:
-            Relatório com resultados da remensuração
+            Relatório com resultados da remensuração e tempos por fase
+            (fetch, index_lookup, calculation, write) em 'timings_ms'
         """
-        logger.info("Iniciando job de remensuração automática")
+        logger.info(f"Iniciando job de remensuração automática (dry_run={dry_run})")
 
         results = {
             'started_at': datetime.utcnow().isoformat(),
+            'dry_run': dry_run,
             'contracts_analyzed': 0,
             'contracts_remeasured': 0,
             'contracts_skipped': 0,
             'errors': [],
             'remeasurements': []
         }
+        if dry_run:
+            results['diffs'] = []
+
+        timings = {'fetch': 0.0, 'index_lookup': 0.0, 'calculation': 0.0, 'write': 0.0}
 
         try:
             # Buscar contratos elegíveis
-            contracts = await RemeasurementService.get_contracts_for_remeasurement(db)
+            started = time.perf_counter()
+            contracts = await RemeasurementService.get_contracts_for_remeasurement(
+                db, index_types=index_types
+            )
             results['contracts_analyzed'] = len(contracts)
+            timings['fetch'] += time.perf_counter() - started
 
             logger.info(f"Encontrados {len(contracts)} contratos para análise")
 
+            # Carregar cada série de índice uma única vez para todo o job
+            started = time.perf_counter()
+            index_cache = await IndexSeriesCache.load(
+                db, {c['reajuste_tipo'] for c in contracts}
+            )
+            timings['index_lookup'] += time.perf_counter() - started
+
             for contract in contracts:
                 try:
                     # Verificar se precisa remensurar
+                    started = time.perf_counter()
                     remeasurement_data = await RemeasurementService.check_if_needs_remeasurement(
-                        db, contract
+                        db, contract, index_cache
                     )
+                    timings['index_lookup'] += time.perf_counter() - started
 
                     if not remeasurement_data:
                         results['contracts_skipped'] += 1
                         continue
 
                     # Calcular novos valores
+                    started = time.perf_counter()
                     new_values = await RemeasurementService.calculate_new_values(
                         contract,
                         remeasurement_data['new_value']
                     )
+                    timings['calculation'] += time.perf_counter() - started
+
+                    if dry_run:
+                        results['diffs'].append(
+                            RemeasurementService._remeasurement_diff(remeasurement_data, new_values)
+                        )
+                        continue
 
                     # Obter periodicidade do contrato
                     periodicidade = remeasurement_data.get('periodicidade', 'anual')
 
                     # Criar nova versão
+                    started = time.perf_counter()
                     new_version = await RemeasurementService.create_remeasured_version(
                         db,
                         contract,
@@ -566,19 +780,12 @@ class RemeasurementService:
                         old_value=remeasurement_data['previous_value'],
                         new_value=remeasurement_data['new_value']
                     )
+                    timings['write'] += time.perf_counter() - started
 
                     results['contracts_remeasured'] += 1
-                    results['remeasurements'].append({
-                        'contract_id': contract['contract_id'],
-                        'contract_name': contract['contract_name'],
-                        'user_id': contract['user_id'],
-                        'new_version_number': new_version['version_number'],
-                        'index_type': contract['reajuste_tipo'],
-                        'periodicidade': periodicidade,
-                        'old_value': remeasurement_data['previous_value'],
-                        'new_value': remeasurement_data['new_value'],
-                        'variation_pct': remeasurement_data['variation_pct']
-                    })
+                    results['remeasurements'].append(
+                        RemeasurementService._remeasurement_entry(remeasurement_data, new_version)
+                    )
 
                     logger.info(
                         f"Contrato {contract['contract_id']} remensurado: "
@@ -596,11 +803,482 @@ class RemeasurementService:
             results['errors'].append(error_msg)
 
         results['finished_at'] = datetime.utcnow().isoformat()
+        results['timings_ms'] = {phase: round(value * 1000, 2) for phase, value in timings.items()}
+
+        if dry_run:
+            logger.info(
+                f"Dry-run finalizado: {len(results['diffs'])} contratos seriam remensurados, "
+                f"{results['contracts_skipped']} ignorados, "
+                f"{len(results['errors'])} erros"
+            )
+        else:
+            logger.info(
+                f"Job finalizado: {results['contracts_remeasured']} remensurados, "
+                f"{results['contracts_skipped']} ignorados, "
+                f"{len(results['errors'])} erros"
+            )
+
+        return results
+
+    @staticmethod
+    def index_types_from_changes(change_set: Iterable[Tuple[str, Any]]) -> List[str]:
+        """
+        Converte o change set da sincronização com o BCB nos reajuste_tipo afetados.
+
+        Args:
+            change_set: Pares (index_type, reference_date) inseridos ou alterados
+
+        Returns:
+            Tipos de reajuste cujos contratos precisam ser reavaliados (ordenados)
+        """
+        changed = {index_type.lower() for index_type, _ in change_set}
+        return sorted(
+            reajuste for reajuste, index_type in RemeasurementService.REAJUSTE_TO_INDEX.items()
+            if index_type in changed
+        )
+
+    @staticmethod
+    async def run_remeasurement_for_changes(
+        db: AsyncSession,
+        change_set: Set[Tuple[str, Any]],
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Remensura apenas os contratos dos índices alterados em uma sincronização.
+
+        Complementa o job mensal: contratos cujo índice não mudou não são
+        carregados. Contratos que só chegam ao mês de reajuste sem índice novo
+        continuam cobertos pela execução agendada completa.
+
+        Args:
+            db: Sessão do banco
+            change_set: Saída de BCBService.sync_index_to_db / sync_all_indexes
+            dry_run: Repassado a run_remeasurement_job
+
+        Returns:
+            Relatório de run_remeasurement_job com os tipos analisados em 'index_types'
+        """
+        index_types = RemeasurementService.index_types_from_changes(change_set)
+        logger.info(f"Remensuração por alteração de índices: {index_types or 'nenhum'}")
+
+        results = await RemeasurementService.run_remeasurement_job(
+            db, dry_run=dry_run, index_types=index_types
+        )
+        results['index_types'] = index_types
+        return results
+
+    @staticmethod
+    def _remeasurement_diff(
+        remeasurement_data: Dict[str, Any],
+        new_values: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Diferença entre a versão atual e a remensurada (relatório do dry-run)"""
+        contract = remeasurement_data['contract']
+        return {
+            'contract_id': contract['contract_id'],
+            'contract_name': contract['contract_name'],
+            'version_number': contract['version_number'],
+            'index_type': contract['reajuste_tipo'],
+            'periodicidade': remeasurement_data.get('periodicidade', 'anual'),
+            'old_index_value': remeasurement_data['previous_value'],
+            'new_index_value': remeasurement_data['new_value'],
+            'total_vp': {'old': contract['total_vp'], 'new': new_values['total_vp']},
+            'avp': {'old': contract['avp'], 'new': new_values['avp']},
+            'parcela': {'old': contract['parcela_inicial'], 'new': round(new_values['nova_parcela'], 2)},
+        }
+
+    @staticmethod
+    def _remeasurement_entry(
+        remeasurement_data: Dict[str, Any],
+        new_version: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Item do relatório do job para um contrato remensurado"""
+        contract = remeasurement_data['contract']
+        return {
+            'contract_id': contract['contract_id'],
+            'contract_name': contract['contract_name'],
+            'user_id': contract['user_id'],
+            'new_version_number': new_version['version_number'],
+            'index_type': contract['reajuste_tipo'],
+            'periodicidade': remeasurement_data.get('periodicidade', 'anual'),
+            'old_value': remeasurement_data['previous_value'],
+            'new_value': remeasurement_data['new_value'],
+            'variation_pct': remeasurement_data['variation_pct']
+        }
+
+    @staticmethod
+    async def run_remeasurement_job_chunked(
+        db: AsyncSession,
+        chunk_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        session_factory=None,
+        page_size: Optional[int] = None,
+        resume: bool = True,
+        index_types: Optional[Iterable[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa o job de remensuração em lotes, com concorrência limitada.
+
+        1. Carrega contratos e séries de índices (sessão `db`)
+        2. Seleciona os contratos elegíveis em memória
+        3. Calcula os lotes em paralelo em um pool de processos
+        4. Grava cada lote (versões + notificações) em uma única transação,
+           com no máximo max_connections sessões simultâneas; emails são
+           enviados após o commit do lote
+
+        Se a gravação de um lote falhar, o lote inteiro é desfeito e seus
+        contratos voltam a ser elegíveis na próxima execução.
+
+        Com page_size (modo streaming), os contratos são lidos em páginas
+        por keyset (contract_id > último visto) e um checkpoint é gravado
+        após cada página; o relatório não lista os contratos remensurados,
+        só os contadores, para manter a memória constante. Com resume=True,
+        uma execução interrompida no mesmo mês continua do último checkpoint.
+        Depois de um lote com falha de gravação o checkpoint não avança além
+        do contrato anterior ao primeiro desse lote e fica em andamento, para
+        que a retomada o reavalie (os já remensurados são ignorados por
+        check_if_needs_remeasurement).
+
+        Args:
+            db: Sessão usada para as leituras (e para os checkpoints)
+            chunk_size: Contratos por lote (padrão: CHUNK_SIZE)
+            max_workers: Processos de cálculo (padrão: min(4, CPUs)); 1 calcula no próprio processo
+            max_connections: Sessões simultâneas de gravação (padrão: MAX_WRITE_CONNECTIONS)
+            session_factory: Fábrica de sessões para gravação (padrão: AsyncSessionLocal)
+            page_size: Contratos por página no modo streaming; None carrega tudo
+            resume: No modo streaming, retoma o checkpoint em andamento do mês
+            index_types: Restringe aos contratos reajustados por esses índices;
+                execuções filtradas não gravam nem retomam checkpoints
+
+        Returns:
+            Relatório do job, com lotes, duração e vazão (contratos/s)
+        """
+        from ..database import AsyncSessionLocal
+
+        chunk_size = chunk_size or RemeasurementService.CHUNK_SIZE
+        max_workers = max_workers or min(4, os.cpu_count() or 1)
+        max_connections = max_connections or RemeasurementService.MAX_WRITE_CONNECTIONS
+        session_factory = session_factory or AsyncSessionLocal
+        streaming = page_size is not None
+
+        logger.info(
+            f"Iniciando job de remensuração em lotes (lote={chunk_size}, "
+            f"processos={max_workers}, conexões={max_connections}, página={page_size})"
+        )
+        started = time.perf_counter()
+
+        results = {
+            'started_at': datetime.utcnow().isoformat(),
+            'mode': 'streaming' if streaming else 'chunked',
+            'contracts_analyzed': 0,
+            'contracts_remeasured': 0,
+            'contracts_skipped': 0,
+            'chunks': 0,
+            'chunk_size': chunk_size,
+            'errors': [],
+        }
+        if streaming:
+            results.update({'pages': 0, 'page_size': page_size, 'resumed_from': None})
+        else:
+            results['remeasurements'] = []
+
+        analyzed_this_run = 0
+        pool = None
+
+        try:
+            checkpoint = None
+            after_contract_id = None
+            previous_errors = 0
+            # Cursor gravado no checkpoint; congela após a primeira falha de gravação
+            checkpoint_cursor = None
+            checkpoint_frozen = False
+            if streaming and index_types is None:
+                checkpoint = await RemeasurementService._start_checkpoint(db, resume)
+                after_contract_id = checkpoint.last_contract_id
+                checkpoint_cursor = after_contract_id
+                previous_errors = checkpoint.errors or 0
+                if after_contract_id:
+                    results['resumed_from'] = after_contract_id
+                    results['pages'] = checkpoint.pages
+                    results['contracts_analyzed'] = checkpoint.contracts_analyzed
+                    results['contracts_remeasured'] = checkpoint.contracts_remeasured
+                    results['contracts_skipped'] = checkpoint.contracts_skipped
+                    logger.info(f"Retomando job após o contrato {after_contract_id}")
+
+            index_cache = None
+            reference_date = date.today()
+            loop = asyncio.get_running_loop()
+            write_slots = asyncio.Semaphore(max_connections)
+            # Limita lotes calculados aguardando gravação (memória)
+            in_flight = asyncio.Semaphore(max_workers + max_connections)
+
+            async def process(chunk: List[Dict[str, Any]]) -> bool:
+                async with in_flight:
+                    items = [(data['contract'], data['new_value']) for data in chunk]
+                    if pool:
+                        computed = await loop.run_in_executor(
+                            pool, _compute_chunk, items, reference_date
+                        )
+                    else:
+                        computed = _compute_chunk(items, reference_date)
+
+                    async with write_slots:
+                        return await RemeasurementService._write_chunk(
+                            session_factory, chunk, computed, results
+                        )
+
+            while True:
+                contracts = await RemeasurementService.get_contracts_for_remeasurement(
+                    db, after_contract_id=after_contract_id, limit=page_size,
+                    index_types=index_types
+                )
+                if not contracts:
+                    break
+
+                results['contracts_analyzed'] += len(contracts)
+                analyzed_this_run += len(contracts)
+
+                if index_cache is None:
+                    # Streaming não conhece os tipos de antemão: carrega todos
+                    cache_types = (
+                        (index_types or RemeasurementService.REAJUSTE_TO_INDEX.values())
+                        if streaming else {c['reajuste_tipo'] for c in contracts}
+                    )
+                    index_cache = await IndexSeriesCache.load(db, cache_types, reference_date)
+
+                eligible = []
+                for contract in contracts:
+                    try:
+                        remeasurement_data = await RemeasurementService.check_if_needs_remeasurement(
+                            db, contract, index_cache
+                        )
+                    except Exception as e:
+                        results['errors'].append(
+                            f"Erro ao processar contrato {contract['contract_id']}: {str(e)}"
+                        )
+                        continue
+
+                    if remeasurement_data:
+                        eligible.append(remeasurement_data)
+                    else:
+                        results['contracts_skipped'] += 1
+
+                chunks = [
+                    eligible[start:start + chunk_size]
+                    for start in range(0, len(eligible), chunk_size)
+                ]
+                results['chunks'] += len(chunks)
+                logger.info(f"{len(eligible)} contratos elegíveis em {len(chunks)} lotes")
+
+                if pool is None and max_workers > 1 and len(chunks) > 1:
+                    pool = ProcessPoolExecutor(
+                        max_workers=max_workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+
+                written = await asyncio.gather(*(process(chunk) for chunk in chunks))
+
+                if not streaming:
+                    break
+
+                # Checkpoint para antes do primeiro contrato de um lote não gravado
+                failed = [chunk for chunk, ok in zip(chunks, written) if not ok]
+                if failed and not checkpoint_frozen:
+                    positions = {c['contract_id']: i for i, c in enumerate(contracts)}
+                    first = min(positions[chunk[0]['contract']['contract_id']] for chunk in failed)
+                    if first > 0:
+                        checkpoint_cursor = contracts[first - 1]['contract_id']
+                    checkpoint_frozen = True
+
+                after_contract_id = contracts[-1]['contract_id']
+                if not checkpoint_frozen:
+                    checkpoint_cursor = after_contract_id
+                results['pages'] += 1
+                if checkpoint is not None:
+                    await RemeasurementService._save_checkpoint(
+                        db, checkpoint, checkpoint_cursor, results, previous_errors
+                    )
+
+                if len(contracts) < page_size:
+                    break
+
+            if checkpoint is not None:
+                await RemeasurementService._save_checkpoint(
+                    db, checkpoint, checkpoint_cursor, results, previous_errors,
+                    completed=not checkpoint_frozen
+                )
+
+        except Exception as e:
+            error_msg = f"Erro geral no job de remensuração: {str(e)}"
+            logger.error(error_msg)
+            results['errors'].append(error_msg)
+
+        finally:
+            if pool:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        results['finished_at'] = datetime.utcnow().isoformat()
+        results['duration_seconds'] = round(elapsed, 3)
+        results['contracts_per_second'] = (
+            round(analyzed_this_run / elapsed, 1) if elapsed > 0 else None
+        )
 
         logger.info(
-            f"Job finalizado: {results['contracts_remeasured']} remensurados, "
-            f"{results['contracts_skipped']} ignorados, "
-            f"{len(results['errors'])} erros"
+            f"Job em lotes finalizado: {results['contracts_remeasured']} remensurados, "
+            f"{results['contracts_skipped']} ignorados, {len(results['errors'])} erros, "
+            f"{results['contracts_per_second']} contratos/s"
         )
 
         return results
+
+    @staticmethod
+    async def _start_checkpoint(db: AsyncSession, resume: bool) -> RemeasurementCheckpoint:
+        """
+        Retorna o checkpoint em andamento do mês corrente (se resume) ou cria um novo.
+
+        Checkpoints de meses anteriores não são retomados: os índices mudaram
+        e todos os contratos precisam ser reavaliados.
+        """
+        if resume:
+            month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            result = await db.execute(
+                select(RemeasurementCheckpoint).where(
+                    RemeasurementCheckpoint.status == 'running',
+                    RemeasurementCheckpoint.started_at >= month_start
+                ).order_by(RemeasurementCheckpoint.started_at.desc()).limit(1)
+            )
+            checkpoint = result.scalar_one_or_none()
+            if checkpoint:
+                return checkpoint
+
+        checkpoint = RemeasurementCheckpoint(status='running')
+        db.add(checkpoint)
+        await db.commit()
+        return checkpoint
+
+    @staticmethod
+    async def _save_checkpoint(
+        db: AsyncSession,
+        checkpoint: RemeasurementCheckpoint,
+        last_contract_id: Optional[str],
+        results: Dict[str, Any],
+        previous_errors: int = 0,
+        completed: bool = False
+    ) -> None:
+        """Grava o cursor e os contadores acumulados após uma página"""
+        checkpoint.last_contract_id = last_contract_id
+        checkpoint.pages = results['pages']
+        checkpoint.contracts_analyzed = results['contracts_analyzed']
+        checkpoint.contracts_remeasured = results['contracts_remeasured']
+        checkpoint.contracts_skipped = results['contracts_skipped']
+        checkpoint.errors = previous_errors + len(results['errors'])
+        checkpoint.updated_at = datetime.utcnow()
+        if completed:
+            checkpoint.status = 'completed'
+            checkpoint.finished_at = datetime.utcnow()
+        await db.commit()
+
+    @staticmethod
+    async def _write_chunk(
+        session_factory,
+        chunk: List[Dict[str, Any]],
+        computed: List[tuple],
+        results: Dict[str, Any]
+    ) -> bool:
+        """
+        Grava as versões e notificações de um lote em uma única transação.
+
+        Returns:
+            False se a gravação falhou e o lote foi desfeito
+        """
+        async with session_factory() as session:
+            valid = []
+            for remeasurement_data, (new_values, error) in zip(chunk, computed):
+                if error:
+                    results['errors'].append(
+                        f"Erro ao processar contrato "
+                        f"{remeasurement_data['contract']['contract_id']}: {error}"
+                    )
+                else:
+                    valid.append((remeasurement_data, new_values))
+
+            written = []
+            try:
+                # Versões do lote em INSERTs multi-row
+                new_versions = await RemeasurementService.create_remeasured_versions_bulk(
+                    session,
+                    [
+                        {
+                            'contract': remeasurement_data['contract'],
+                            'new_values': new_values,
+                            'new_index_value': remeasurement_data['new_value'],
+                            'index_type': remeasurement_data['contract']['reajuste_tipo'],
+                            'periodicidade': remeasurement_data.get('periodicidade', 'anual'),
+                        }
+                        for remeasurement_data, new_values in valid
+                    ]
+                )
+
+                for (remeasurement_data, _), new_version in zip(valid, new_versions):
+                    contract = remeasurement_data['contract']
+                    notification = await NotificationService.notify_remeasurement_done(
+                        db=session,
+                        user_id=UUID(contract['user_id']),
+                        contract_id=UUID(contract['contract_id']),
+                        contract_name=contract['contract_name'],
+                        version_number=new_version['version_number'],
+                        index_type=contract['reajuste_tipo'],
+                        old_value=remeasurement_data['previous_value'],
+                        new_value=remeasurement_data['new_value'],
+                        send_email=False,
+                        commit=False
+                    )
+                    written.append((remeasurement_data, new_version, notification))
+
+                await session.commit()
+
+            except Exception as e:
+                await session.rollback()
+                error_msg = f"Erro ao gravar lote de {len(chunk)} contratos: {str(e)}"
+                logger.error(error_msg)
+                results['errors'].append(error_msg)
+                return False
+
+            for remeasurement_data, new_version, notification in written:
+                results['contracts_remeasured'] += 1
+                if 'remeasurements' in results:
+                    results['remeasurements'].append(
+                        RemeasurementService._remeasurement_entry(remeasurement_data, new_version)
+                    )
+                metadata = json.loads(notification.extra_data) if notification.extra_data else None
+                await NotificationService.send_notification_email(session, notification, metadata)
+            return True
+
+
+def _compute_chunk(
+    items: List[tuple],
+    reference_date: date
+) -> List[tuple]:
+    """
+    Calcula os novos valores de um lote de contratos (executado no pool de processos).
+
+    Os resultados já saem serializados em JSON: uma string é transferida entre
+    processos bem mais rápido que a árvore de dicts. NaN/Infinity (rejeitados
+    pelo jsonb) viram erro do contrato aqui, sem derrubar o lote.
+
+    Returns:
+        Lista de (new_values, None) ou (None, mensagem de erro), na ordem de `items`
+    """
+    computed = []
+    for contract, new_index_value in items:
+        try:
+            new_values = RemeasurementService.compute_new_values(
+                contract, new_index_value, reference_date
+            )
+            new_values['resultados'] = json.dumps(new_values['resultados'], allow_nan=False)
+            computed.append((new_values, None))
+        except Exception as e:
+            computed.append((None, str(e)))
+    return computed
@@ -0,0 +1,134 @@
+"""
+Buffer em memória do heartbeat das sessões (last_activity)
+As atividades são acumuladas por sessão e gravadas em lote periodicamente
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Callable
+from uuid import UUID
+
+from sqlalchemy import update, bindparam
+
+from ..config import get_settings
+from ..database import AsyncSessionLocal
+from ..models import UserSession
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class SessionActivityBuffer:
+    """
+    Última atividade pendente de cada sessão, ainda não gravada no banco.
+
+    get_current_user_with_session registra a atividade aqui em vez de fazer
+    um commit por requisição. O flush grava todas as sessões pendentes em um
+    único UPDATE em lote, então cada sessão recebe no máximo uma escrita por
+    intervalo. O UPDATE nunca retrocede last_activity (uma gravação mais
+    recente, como a do endpoint de heartbeat, prevalece).
+
+    Com intervalo 0 o buffer fica desativado e a atividade é gravada na
+    própria requisição (comportamento anterior).
+    """
+
+    def __init__(self, flush_interval_seconds: int):
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: Dict[UUID, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_rows = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval_seconds > 0
+
+    def record(self, session_id: UUID, when: datetime) -> None:
+        """Registra a atividade da sessão (só o horário mais recente é mantido)"""
+        current = self._pending.get(session_id)
+        if current is None or when > current:
+            self._pending[session_id] = when
+
+    def last_activity(self, session_id: UUID) -> Optional[datetime]:
+        """Atividade pendente da sessão, ou None se já foi gravada"""
+        return self._pending.get(session_id)
+
+    def discard(self, session_id: UUID) -> None:
+        """Descarta a atividade pendente (ex.: sessão encerrada)"""
+        self._pending.pop(session_id, None)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def flush(self, session_factory: Optional[Callable] = None) -> int:
+        """
+        Grava as atividades pendentes em um único UPDATE em lote.
+
+        Args:
+            session_factory: Fábrica de sessões do banco (padrão: AsyncSessionLocal)
+
+        Returns:
+            Quantidade de sessões enviadas ao banco
+        """
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        table = UserSession.__table__
+        stmt = (
+            update(table)
+            .where(
+                table.c.id == bindparam("b_id"),
+                table.c.last_activity < bindparam("b_last_activity"),
+            )
+            .values(last_activity=bindparam("b_last_activity"))
+        )
+        params = [
+            {"b_id": session_id, "b_last_activity": when}
+            for session_id, when in pending.items()
+        ]
+
+        try:
+            async with (session_factory or AsyncSessionLocal)() as db:
+                await db.execute(stmt, params)
+                await db.commit()
+        except Exception:
+            # Devolve ao buffer sem sobrescrever atividades mais novas
+            for session_id, when in pending.items():
+                self.record(session_id, when)
+            raise
+
+        self.flushed_rows += len(params)
+        return len(params)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                count = await self.flush()
+                if count:
+                    logger.debug(f"Heartbeat de sessões gravado: {count} sessões")
+            except Exception as e:
+                logger.warning(f"Erro ao gravar heartbeat de sessões: {e}")
+
+    def start(self) -> None:
+        """Inicia o flush periódico (chamado no startup da aplicação)"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Interrompe o flush periódico e grava o que estiver pendente"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Erro ao gravar heartbeat de sessões no shutdown: {e}")
+
+
+session_activity_buffer = SessionActivityBuffer(settings.SESSION_ACTIVITY_FLUSH_SECONDS)
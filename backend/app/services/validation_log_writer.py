@@ -0,0 +1,210 @@
+"""
+Gravação assíncrona em lote dos logs de validação de licença
+Os logs entram em uma fila em memória e são inseridos em lotes multi-linha
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Optional, Any, Callable, List
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..database import AsyncSessionLocal
+from ..models import ValidationLog
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class ValidationLogWriter:
+    """
+    Fila de logs de validação gravada em segundo plano.
+
+    A validação de licença apenas enfileira o registro (com id e timestamp
+    já definidos). A tarefa de fundo grava a fila em INSERTs multi-linha a
+    cada batch_size registros ou flush_interval_ms, o que vier primeiro.
+
+    - A fila é limitada a max_buffer registros; acima disso os novos logs
+      são descartados (contados em dropped) para não crescer sem limite
+      se o banco ficar indisponível
+    - Se o lote falhar, os registros são regravados um a um para que um
+      registro inválido não descarte o lote inteiro
+    - O shutdown grava o que estiver pendente
+
+    Enquanto a tarefa de fundo não está rodando (scripts, jobs, testes sem
+    lifespan), log() grava o registro na própria sessão da requisição.
+    """
+
+    def __init__(self, batch_size: int, flush_interval_ms: int, max_buffer: int):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_ms = flush_interval_ms
+        self.max_buffer = max_buffer
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval_ms > 0 and self.max_buffer > 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def pending_count(self) -> int:
+        return len(self._buffer)
+
+    @staticmethod
+    def _record(
+        license_key: str,
+        success: bool,
+        message: Optional[str] = None,
+        machine_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        app_version: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return {
+            "id": uuid.uuid4(),
+            "license_key": license_key.upper(),
+            "timestamp": datetime.utcnow(),
+            "success": success,
+            "message": message,
+            "machine_id": machine_id,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "app_version": app_version,
+        }
+
+    def enqueue(self, **fields) -> bool:
+        """
+        Enfileira um log de validação.
+
+        Returns:
+            False se a fila estiver cheia e o log foi descartado
+        """
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(
+                    f"Fila de logs de validação cheia ({self.max_buffer}); "
+                    f"{self.dropped} logs descartados"
+                )
+            return False
+
+        self._buffer.append(self._record(**fields))
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    async def log(self, db: AsyncSession, **fields) -> None:
+        """
+        Registra um log de validação: enfileira se a gravação em segundo
+        plano estiver ativa, senão grava na sessão da requisição.
+
+        Args:
+            db: Sessão do banco da requisição (usada só sem a fila)
+            **fields: Campos de crud.log_validation (license_key, success, ...)
+        """
+        if self.running:
+            self.enqueue(**fields)
+            return
+
+        from ..crud import log_validation
+        await log_validation(db, **fields)
+
+    async def _insert(self, session_factory: Callable, rows: List[Dict[str, Any]]) -> None:
+        async with session_factory() as db:
+            await db.execute(insert(ValidationLog), rows)
+            await db.commit()
+
+    async def flush(self, session_factory: Optional[Callable] = None) -> int:
+        """
+        Grava os logs enfileirados em lotes de até batch_size registros.
+
+        Args:
+            session_factory: Fábrica de sessões do banco (padrão: AsyncSessionLocal)
+
+        Returns:
+            Quantidade de logs gravados
+        """
+        factory = session_factory or AsyncSessionLocal
+        written = 0
+
+        while self._buffer:
+            count = min(self.batch_size, len(self._buffer))
+            batch = [self._buffer.popleft() for _ in range(count)]
+            try:
+                await self._insert(factory, batch)
+                written += len(batch)
+                continue
+            except asyncio.CancelledError:
+                self._buffer.extendleft(reversed(batch))
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"Erro ao gravar lote de {len(batch)} logs de validação, "
+                    f"regravando um a um: {e}"
+                )
+
+            for row in batch:
+                try:
+                    await self._insert(factory, [row])
+                    written += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.warning(
+                        f"Log de validação descartado ({row['license_key']}): {e}"
+                    )
+
+        self.written += written
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(), timeout=self.flush_interval_ms / 1000
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Erro ao gravar logs de validação: {e}")
+
+    def start(self) -> None:
+        """Inicia a gravação em segundo plano (chamado no startup da aplicação)"""
+        if self.enabled and not self.running:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Interrompe a tarefa de fundo e grava os logs pendentes"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Erro ao gravar logs de validação no shutdown: {e}")
+
+
+validation_log_writer = ValidationLogWriter(
+    settings.VALIDATION_LOG_BATCH_SIZE,
+    settings.VALIDATION_LOG_FLUSH_MS,
+    settings.VALIDATION_LOG_BUFFER_SIZE,
+)
@@ -19,8 +19,18 @@ API_URL = os.getenv("API_URL", "https://ifrs16-backend-1051753255664.us-central1
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 # Quantos meses buscar (últimos 3 para garantir atualizações retroativas)
+# No modo incremental, só vale para séries ainda sem registros no banco
 LAST_N_MONTHS = 3
 
+# Busca a partir do último mês armazenado de cada série (mais a janela de revisão)
+INCREMENTAL_SYNC = os.getenv("INCREMENTAL_SYNC", "true").lower() == "true"
+
+# Remensura logo após a sincronização só os contratos dos índices alterados.
+# Desligado por padrão: a remensuração roda dentro da requisição /sync-all e,
+# com muitos contratos, passa do timeout abaixo enquanto o servidor continua
+# gravando; o job mensal de remensuração continua sendo o caminho padrão
+REMEASURE_ON_CHANGE = os.getenv("REMEASURE_ON_CHANGE", "false").lower() == "true"
+
 
 def sync_indexes():
     """Sincroniza todos os índices econômicos do BCB."""
@@ -31,7 +41,11 @@ def sync_indexes():
         print("[ERROR] ADMIN_TOKEN não configurado!")
         sys.exit(1)
 
-    url = f"{API_URL}/api/economic-indexes/sync-all?last_n={LAST_N_MONTHS}"
+    url = (
+        f"{API_URL}/api/economic-indexes/sync-all?last_n={LAST_N_MONTHS}"
+        f"&remeasure={'true' if REMEASURE_ON_CHANGE else 'false'}"
+        f"&incremental={'true' if INCREMENTAL_SYNC else 'false'}"
+    )
     headers = {
         "X-Admin-Token": ADMIN_TOKEN,
         "Content-Type": "application/json",
@@ -50,6 +64,17 @@ def sync_indexes():
             data = response.json()
             print(f"[SUCCESS] {data.get('message', 'OK')}")
             print(f"[RESULTS] {data.get('results', {})}")
+            print(f"[CHANGES] {data.get('changes', {})}")
+            for index_type, timing in (data.get("timings_ms") or {}).items():
+                print(f"[TIMING] {index_type}: fetch={timing['fetch']} ms, write={timing['write']} ms")
+
+            remeasurement = data.get("remeasurement")
+            if remeasurement:
+                print(
+                    f"[REMEASUREMENT] índices={remeasurement.get('index_types')} "
+                    f"analisados={remeasurement.get('contracts_analyzed')} "
+                    f"remensurados={remeasurement.get('contracts_remeasured')}"
+                )
 
             if data.get("errors"):
                 print(f"[WARN] Erros em alguns índices: {data['errors']}")
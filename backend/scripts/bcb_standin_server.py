@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Servidor local que substitui a API SGS do Banco Central (api.bcb.gov.br)
+
+Serve o formato JSON de /dados/serie/bcdata.sgs.{codigo}/dados a partir de
+fixtures em disco, para rodar a sincronização e a remensuração sem rede
+(benchmarks e testes ponta a ponta determinísticos).
+
+Uso:
+    # Gravar as séries completas do BCB como fixtures (requer rede)
+    python -m scripts.bcb_standin_server record --fixtures scripts/fixtures/bcb
+
+    # Servir as fixtures (séries sem fixture usam dados sintéticos)
+    python -m scripts.bcb_standin_server serve --port 8765 --latency-ms 150
+
+    # Apontar a API para o servidor local
+    BCB_API_BASE_URL=http://127.0.0.1:8765 uvicorn app.main:app
+
+Fixtures: um arquivo <código SGS>.json por série, com a lista
+[{"data": "DD/MM/YYYY", "valor": "0.42"}, ...] exatamente como o BCB retorna.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Query
+
+from app.services.bcb_service import BCBService, BCB_SERIES_CODES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURES_DIR = Path(__file__).parent / "fixtures" / "bcb"
+
+# Faixa (% a.m.) das séries sintéticas, por código SGS
+SYNTHETIC_RANGES = {
+    4189: (0.15, 1.20),   # SELIC
+    189: (-1.00, 2.00),   # IGP-M
+    433: (-0.30, 1.30),   # IPCA
+    4391: (0.15, 1.20),   # CDI
+    188: (-0.30, 1.30),   # INPC
+    226: (0.00, 0.25),    # TR
+}
+
+# Fim fixo das séries sintéticas: os valores servidos não mudam com a data de execução
+SYNTHETIC_END = datetime(2026, 1, 1)
+
+
+def synthetic_series(codigo: int, months: int = 240, end: Optional[datetime] = None) -> List[Dict]:
+    """
+    Série mensal sintética e determinística (semente = código SGS), terminando
+    no mês anterior a `end` (padrão: SYNTHETIC_END).
+    Usada apenas quando não há fixture gravada para a série.
+    """
+    end = end or SYNTHETIC_END
+    rng = random.Random(codigo)
+    low, high = SYNTHETIC_RANGES.get(codigo, (0.0, 1.0))
+    last_key = end.year * 12 + end.month - 2  # último mês fechado
+
+    series = []
+    for key in range(last_key - months + 1, last_key + 1):
+        series.append({
+            "data": f"01/{key % 12 + 1:02d}/{key // 12}",
+            "valor": f"{rng.uniform(low, high):.2f}",
+        })
+    return series
+
+
+def load_fixtures(fixtures_dir: Path) -> Dict[int, List[Dict]]:
+    """Carrega as fixtures do diretório; séries ausentes ficam sintéticas"""
+    series = {}
+    for codigo in BCB_SERIES_CODES.values():
+        path = fixtures_dir / f"{codigo}.json"
+        if path.exists():
+            with open(path, encoding="utf-8") as file:
+                series[codigo] = json.load(file)
+            logger.info(f"Série {codigo}: {len(series[codigo])} registros de {path}")
+        else:
+            series[codigo] = synthetic_series(codigo)
+            logger.warning(f"Série {codigo}: sem fixture em {path}, usando dados SINTÉTICOS")
+    return series
+
+
+def _parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%d/%m/%Y")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Data inválida: '{value}' (use DD/MM/YYYY)")
+
+
+def create_app(fixtures_dir: Optional[Path] = None, latency_ms: int = 0) -> FastAPI:
+    """
+    Cria o app do servidor local.
+
+    Args:
+        fixtures_dir: Diretório das fixtures (padrão: scripts/fixtures/bcb)
+        latency_ms: Atraso artificial por requisição (simula a latência do BCB)
+    """
+    series = load_fixtures(Path(fixtures_dir or DEFAULT_FIXTURES_DIR))
+    app = FastAPI(title="BCB SGS (servidor local)")
+
+    async def respond(codigo: int, data: List[Dict]) -> List[Dict]:
+        if codigo not in series:
+            raise HTTPException(status_code=404, detail=f"Série {codigo} não encontrada")
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return data
+
+    @app.get("/dados/serie/bcdata.sgs.{codigo}/dados")
+    async def dados(
+        codigo: int,
+        formato: str = Query("json"),
+        dataInicial: Optional[str] = Query(None),
+        dataFinal: Optional[str] = Query(None),
+        ultimos: Optional[int] = Query(None, ge=1),
+    ):
+        data = series.get(codigo, [])
+        if dataInicial:
+            inicio = _parse_date(dataInicial)
+            data = [item for item in data if _parse_date(item["data"]) >= inicio]
+        if dataFinal:
+            fim = _parse_date(dataFinal)
+            data = [item for item in data if _parse_date(item["data"]) <= fim]
+        if ultimos:
+            data = data[-ultimos:]
+        return await respond(codigo, data)
+
+    @app.get("/dados/serie/bcdata.sgs.{codigo}/dados/ultimos/{n}")
+    async def ultimos(codigo: int, n: int, formato: str = Query("json")):
+        return await respond(codigo, series.get(codigo, [])[-n:])
+
+    return app
+
+
+async def record_fixtures(fixtures_dir: Path) -> None:
+    """Baixa as séries completas do BCB e grava como fixtures"""
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    for index_type, codigo in BCB_SERIES_CODES.items():
+        data = await BCBService.fetch_from_bcb(index_type)
+        path = fixtures_dir / f"{codigo}.json"
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=1)
+        logger.info(f"{index_type.upper()} ({codigo}): {len(data)} registros gravados em {path}")
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Servidor local da API SGS do BCB")
+    parser.add_argument("command", choices=["serve", "record"], nargs="?", default="serve")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record_fixtures(args.fixtures))
+        return
+
+    import uvicorn
+    uvicorn.run(create_app(args.fixtures, args.latency_ms), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
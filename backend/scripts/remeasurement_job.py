@@ -9,6 +9,10 @@ Uso:
 Configuração:
     - API_URL: URL da API (ex: https://ifrs16-backend-xxx.run.app)
     - INTERNAL_JOB_TOKEN: Token de autenticação para jobs internos
+    - REMEASUREMENT_PAGE_SIZE: Contratos por página no modo streaming (padrão: 0,
+      processa tudo de uma vez como antes). Com um valor > 0 (ex.: 1000), uma
+      execução interrompida retoma do último checkpoint ao rodar o script
+      novamente no mesmo mês.
 """
 
 import os
@@ -36,6 +40,9 @@ def run_remeasurement():
 
     endpoint = f"{api_url}/api/internal/jobs/remeasurement"
 
+    page_size = int(os.getenv('REMEASUREMENT_PAGE_SIZE', '0'))
+    params = {'page_size': page_size} if page_size > 0 else {}
+
     logger.info(f"Iniciando job de remensuração")
     logger.info(f"API URL: {api_url}")
 
@@ -46,6 +53,7 @@ def run_remeasurement():
                 'X-Internal-Token': job_token,
                 'Content-Type': 'application/json'
             },
+            params=params,
             timeout=300  # 5 minutos de timeout
         )
 
@@ -55,6 +63,8 @@ def run_remeasurement():
             logger.info(f"Contratos analisados: {result.get('result', {}).get('contracts_analyzed', 0)}")
             logger.info(f"Contratos remensurados: {result.get('result', {}).get('contracts_remeasured', 0)}")
             logger.info(f"Contratos ignorados: {result.get('result', {}).get('contracts_skipped', 0)}")
+            if result.get('result', {}).get('resumed_from'):
+                logger.info(f"Execução retomada após o contrato: {result['result']['resumed_from']}")
 
             errors = result.get('result', {}).get('errors', [])
             if errors:
@@ -20,6 +20,8 @@ from app.main import app
 from app.config import get_settings, Settings
 from app.models import License, LicenseStatus, LicenseType, AdminUser, AdminRole, User
 from app.auth import create_access_token, create_admin_token, create_user_token, hash_password
+from app.services.economic_index_cache import economic_index_cache
+from app.services.auth_cache import auth_session_cache
 
 
 # ============================================================
@@ -132,6 +134,8 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
     # Limpar tabelas após teste
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    # Últimos valores de índices em cache não podem vazar para o próximo teste
+    economic_index_cache.invalidate()
 
 
 @pytest_asyncio.fixture
@@ -144,12 +148,17 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield db_session
     
     app.dependency_overrides[get_db] = override_get_db
+    # Respostas em cache de um teste não podem vazar para o próximo
+    economic_index_cache.invalidate()
+    auth_session_cache.invalidate()
     
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
     
     app.dependency_overrides.clear()
+    economic_index_cache.invalidate()
+    auth_session_cache.invalidate()
 
 
 # ============================================================
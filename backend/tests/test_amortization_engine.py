@@ -0,0 +1,290 @@
+"""
+Testes do motor de amortização vetorizado (AmortizationEngine)
+Compara o resultado com a implementação iterativa do calculator.js
+"""
+
+import pytest
+from datetime import date
+
+from app.services.amortization_engine import AmortizationEngine
+from app.services.remeasurement_service import RemeasurementService
+
+
+# =============================================================================
+# REFERÊNCIA: porte direto (loop por mês) de assets/js/calculator.js
+# =============================================================================
+
+def calcular_referencia(data_inicio, prazo, carencia, taxa_anual, reajuste_anual, mes_reajuste, parcela_inicial):
+    taxa_mensal = (1 + taxa_anual / 100) ** (1 / 12) - 1
+    fluxo = []
+    total_vp = 0.0
+    for mes in range(1, prazo + 1):
+        offset = data_inicio.month - 1 + mes - 1
+        ano_atual = data_inicio.year + offset // 12
+        mes_atual = offset % 12 + 1
+        parcela = 0.0
+        if mes > carencia:
+            reajustes = 0
+            for ano in range(data_inicio.year + 1, ano_atual + 1):
+                if ano < ano_atual or (ano == ano_atual and mes_atual >= mes_reajuste):
+                    reajustes += 1
+            parcela = parcela_inicial * (1 + reajuste_anual / 100) ** reajustes
+        vp = parcela / (1 + taxa_mensal) ** mes
+        total_vp += vp
+        fluxo.append({'mes': mes, 'data': f"{mes_atual:02d}/{ano_atual}", 'parcela': parcela, 'valorPresente': vp})
+
+    contab = [{'mes': 0, 'juros': 0, 'pagamento': 0, 'passivoFinal': total_vp, 'despTotal': 0}]
+    passivo = total_vp
+    deprec = total_vp / prazo
+    for mes in range(1, prazo + 1):
+        juros = passivo * taxa_mensal
+        pagamento = fluxo[mes - 1]['parcela']
+        passivo = passivo + juros - pagamento
+        contab.append({'mes': mes, 'juros': juros, 'pagamento': pagamento, 'passivoFinal': passivo, 'despTotal': juros + deprec})
+
+    for index, item in enumerate(contab):
+        meses_cp = min(12, prazo - item['mes'])
+        cp = sum(contab[index + i]['pagamento'] - contab[index + i]['juros'] for i in range(1, meses_cp + 1))
+        item['passivoCP'] = min(item['passivoFinal'], max(0, cp))
+        item['passivoLP'] = max(0, item['passivoFinal'] - cp)
+
+    return {'fluxoCaixa': fluxo, 'contabilizacao': contab, 'totalVP': total_vp}
+
+
+class TestAmortizationEngine:
+    """Testes de equivalência com o calculator.js"""
+
+    @pytest.mark.parametrize("params", [
+        dict(data_inicio=date(2024, 1, 1), prazo=60, carencia=0, taxa_anual=12.0, reajuste_anual=0.0, mes_reajuste=1, parcela_inicial=5000.0),
+        dict(data_inicio=date(2023, 7, 15), prazo=36, carencia=3, taxa_anual=10.5, reajuste_anual=4.5, mes_reajuste=7, parcela_inicial=1200.0),
+        dict(data_inicio=date(2025, 11, 1), prazo=360, carencia=6, taxa_anual=13.25, reajuste_anual=5.0, mes_reajuste=3, parcela_inicial=25000.0),
+        dict(data_inicio=date(2024, 5, 1), prazo=7, carencia=0, taxa_anual=0.0, reajuste_anual=0.0, mes_reajuste=1, parcela_inicial=100.0),
+    ])
+    def test_matches_calculator_js(self, params):
+        """Fluxo, passivo, juros e CP/LP devem coincidir com o cálculo iterativo"""
+        ref = calcular_referencia(**params)
+        result = AmortizationEngine.calculate(
+            data_inicio=params['data_inicio'],
+            prazo_meses=params['prazo'],
+            parcela_inicial=params['parcela_inicial'],
+            taxa_desconto_anual=params['taxa_anual'],
+            carencia_meses=params['carencia'],
+            reajuste_anual=params['reajuste_anual'],
+            mes_reajuste=params['mes_reajuste']
+        )
+
+        assert result['totalVP'] == pytest.approx(ref['totalVP'], rel=1e-9)
+        assert len(result['fluxoCaixa']) == params['prazo']
+        assert len(result['contabilizacao']) == params['prazo'] + 1
+
+        for got, exp in zip(result['fluxoCaixa'], ref['fluxoCaixa']):
+            assert got['data'] == exp['data']
+            assert got['parcela'] == pytest.approx(exp['parcela'])
+            assert got['valorPresente'] == pytest.approx(exp['valorPresente'])
+
+        for got, exp in zip(result['contabilizacao'], ref['contabilizacao']):
+            for key in ('juros', 'pagamento', 'passivoFinal', 'despTotal', 'passivoCP', 'passivoLP'):
+                assert got[key] == pytest.approx(exp[key], rel=1e-7, abs=1e-6), (got['mes'], key)
+
+    def test_schema_matches_frontend(self):
+        """As chaves devem ser as mesmas gravadas pelo frontend em resultados_json"""
+        result = AmortizationEngine.calculate(date(2024, 1, 1), 12, 1000.0, 10.0)
+        resultados = AmortizationEngine.to_resultados_json(result)
+
+        assert set(resultados) == {'fluxoCaixa', 'contabilizacao', 'cpLp'}
+        assert set(resultados['fluxoCaixa'][0]) == {
+            'mes', 'data', 'dataObj', 'parcela', 'fatorDesconto', 'valorPresente'
+        }
+        assert set(resultados['contabilizacao'][0]) == {
+            'mes', 'data', 'passivoInicial', 'juros', 'pagamento', 'passivoFinal',
+            'ativoBruto', 'deprecAcum', 'ativoLiquido', 'despJuros', 'despDeprec',
+            'despTotal', 'passivoCP', 'passivoLP'
+        }
+        assert result['contabilizacao'][0]['data'] == '01/2024'
+        assert result['contabilizacao'][-1]['passivoFinal'] == pytest.approx(0, abs=1e-6)
+        assert result['contabilizacao'][-1]['ativoLiquido'] == pytest.approx(0, abs=1e-6)
+
+    def test_invalid_prazo(self):
+        """Prazo zero deve ser rejeitado"""
+        with pytest.raises(ValueError):
+            AmortizationEngine.calculate(date(2024, 1, 1), 0, 1000.0, 10.0)
+
+    @pytest.mark.asyncio
+    async def test_calculate_new_values_uses_engine(self):
+        """Remensuração deve gerar a contabilização completa"""
+        contract = {
+            'parcela_inicial': 1000.0,
+            'prazo_meses': 24,
+            'carencia_meses': 2,
+            'taxa_desconto_anual': 10.0,
+            'reajuste_valor': 5.0,
+            'data_inicio': date(2024, 1, 1),
+        }
+        new_values = await RemeasurementService.calculate_new_values(contract, 6.0)
+
+        assert new_values['nova_parcela'] == pytest.approx(1200.0)
+        assert new_values['total_nominal'] == pytest.approx(1200.0 * 22)
+        assert len(new_values['resultados']['contabilizacao']) == 25
+        assert new_values['resultados']['fluxoCaixa'][1]['parcela'] == 0
+
+
+class TestAmortizationEngineBatch:
+    """Testes do cálculo matricial (contratos x meses)"""
+
+    CONTRATOS = [
+        {'data_inicio': date(2024, 1, 1), 'prazo_meses': 60, 'parcela_inicial': 5000.0, 'taxa_desconto_anual': 12.0},
+        {'data_inicio': '2023-07-15', 'prazo_meses': 36, 'parcela_inicial': 1200.0, 'taxa_desconto_anual': 10.5,
+         'carencia_meses': 3, 'reajuste_anual': 4.5, 'mes_reajuste': 7},
+        {'data_inicio': date(2025, 11, 1), 'prazo_meses': 360, 'parcela_inicial': 25000.0, 'taxa_desconto_anual': 13.25,
+         'carencia_meses': 6, 'reajuste_anual': 5.0, 'mes_reajuste': 3},
+        {'data_inicio': date(2024, 5, 1), 'prazo_meses': 7, 'parcela_inicial': 100.0, 'taxa_desconto_anual': 0.0},
+    ]
+
+    def test_batch_matches_single_contract(self):
+        """Cada linha da matriz deve coincidir com o cálculo individual"""
+        batch = AmortizationEngine.calculate_batch(self.CONTRATOS)
+        summaries = AmortizationEngine.batch_summary(batch)
+
+        for index, params in enumerate(self.CONTRATOS):
+            single = AmortizationEngine.calculate(**params)
+            from_batch = AmortizationEngine.batch_result(batch, index)
+
+            assert len(from_batch['contabilizacao']) == params['prazo_meses'] + 1
+            assert summaries[index]['total_vp'] == pytest.approx(single['totalVP'])
+            assert summaries[index]['total_nominal'] == pytest.approx(single['totalNominal'])
+            assert summaries[index]['passivo_cp'] == pytest.approx(single['contabilizacao'][0]['passivoCP'])
+            assert summaries[index]['despesa_mes1'] == pytest.approx(single['contabilizacao'][1]['despTotal'])
+
+            for got, exp in zip(from_batch['contabilizacao'], single['contabilizacao']):
+                for key in ('passivoFinal', 'juros', 'passivoCP', 'passivoLP', 'ativoLiquido'):
+                    assert got[key] == pytest.approx(exp[key], abs=1e-6)
+
+    def test_batch_empty(self):
+        """Lote vazio não deve falhar"""
+        batch = AmortizationEngine.calculate_batch([])
+        assert AmortizationEngine.batch_summary(batch) == []
+
+    def test_schedule_summary_matches_batch_summary(self):
+        """Resumo extraído da contabilização coincide com os totais da matriz"""
+        batch = AmortizationEngine.calculate_batch(self.CONTRATOS)
+        summaries = AmortizationEngine.batch_summary(batch)
+
+        for index, params in enumerate(self.CONTRATOS):
+            resultados = AmortizationEngine.to_resultados_json(
+                AmortizationEngine.batch_result(batch, index)
+            )
+            resumo = AmortizationEngine.schedule_summary(
+                resultados, params['data_inicio'], params['prazo_meses']
+            )
+
+            for key in ('despesa_mes1', 'total_juros', 'total_deprec'):
+                assert resumo[key] == pytest.approx(summaries[index][key])
+            assert resumo['passivo_cp_inicial'] == pytest.approx(summaries[index]['passivo_cp'])
+            assert resumo['passivo_lp_inicial'] == pytest.approx(summaries[index]['passivo_lp'])
+
+        resumo = AmortizationEngine.schedule_summary({}, '2024-01-31', 13)
+        assert resumo['data_fim'] == date(2025, 2, 28)
+        assert resumo['despesa_mes1'] is None
+
+    def test_schedule_rows(self):
+        """Linhas do cronograma seguem a contabilização (data no 1º dia do mês)"""
+        result = AmortizationEngine.calculate(**self.CONTRATOS[0])
+        rows = AmortizationEngine.schedule_rows(AmortizationEngine.to_resultados_json(result))
+
+        assert len(rows) == 61
+        assert rows[0]['mes'] == 0
+        assert rows[1]['data'] == date(2024, 1, 1)
+        assert rows[-1]['passivo_final'] == pytest.approx(0.0, abs=1e-6)
+        assert sum(r['juros'] for r in rows) == pytest.approx(result['totalJuros'])
+        assert rows[0]['cp'] == pytest.approx(result['contabilizacao'][0]['passivoCP'])
+        assert AmortizationEngine.schedule_rows({}) == []
+
+    def test_schedule_rows_skips_malformed_and_duplicated_months(self):
+        """Sem mes, mes não inteiro ou valor não numérico é descartado; mes repetido fica com a última linha"""
+        rows = AmortizationEngine.schedule_rows({'contabilizacao': [
+            {'mes': 0, 'passivoFinal': 100.0},
+            {'mes': 1, 'juros': 1.0},
+            {'mes': 1, 'juros': 2.0},
+            {'juros': 3.0},
+            {'mes': 'x'},
+            {'mes': 2.5},
+            {'mes': 2, 'juros': "1.234,56"},
+            "linha",
+        ]})
+
+        assert [r['mes'] for r in rows] == [0, 1]
+        assert rows[1]['juros'] == 2.0
+
+
+class TestIncrementalRemeasurement:
+    """Testes da remensuração que reaproveita o cronograma anterior"""
+
+    def _anterior(self, prazo=36, carencia=2):
+        result = AmortizationEngine.calculate(date(2024, 1, 1), prazo, 1000.0, 10.0, carencia_meses=carencia)
+        return AmortizationEngine.to_resultados_json(result)
+
+    def test_effective_month(self):
+        """Parcela 1 vence no mês de início"""
+        assert AmortizationEngine.effective_month(date(2024, 1, 15), date(2024, 1, 1)) == 1
+        assert AmortizationEngine.effective_month('2024-11-01', '2025-02-10') == 4
+
+    def test_tail_matches_full_recalculation(self):
+        """Prefixo mantido; cauda igual ao recálculo completo com a nova parcela"""
+        anterior = self._anterior()
+        result = AmortizationEngine.remeasure_tail(anterior, date(2024, 1, 1), 36, 13, 1100.0, 10.0, 2)
+        completo = AmortizationEngine.calculate(date(2024, 1, 1), 36, 1100.0, 10.0, carencia_meses=2)
+
+        assert len(result['contabilizacao']) == 37
+        assert len(result['fluxoCaixa']) == 36
+        assert result['contabilizacao'][:13] == anterior['contabilizacao'][:13]
+        assert result['fluxoCaixa'][:12] == anterior['fluxoCaixa'][:12]
+
+        for got, exp in zip(result['contabilizacao'][13:], completo['contabilizacao'][13:]):
+            assert got['mes'] == exp['mes'] and got['data'] == exp['data']
+            for key in ('juros', 'pagamento', 'passivoFinal', 'passivoCP', 'passivoLP'):
+                assert got[key] == pytest.approx(exp[key], abs=1e-6), (got['mes'], key)
+        for got, exp in zip(result['fluxoCaixa'][12:], completo['fluxoCaixa'][12:]):
+            assert got['valorPresente'] == pytest.approx(exp['valorPresente'])
+
+        info = result['remensuracao']
+        assert info['passivo_anterior'] == anterior['contabilizacao'][12]['passivoFinal']
+        assert info['ajuste'] == pytest.approx(info['passivo_remensurado'] * (1 - 1000.0 / 1100.0))
+
+        juros = sum(row['juros'] for row in result['contabilizacao'])
+        assert result['totalJuros'] == pytest.approx(juros)
+        assert result['totalNominal'] == pytest.approx(1000.0 * 10 + 1100.0 * 24)
+        assert result['contabilizacao'][-1]['passivoFinal'] == pytest.approx(0, abs=1e-6)
+        assert result['contabilizacao'][-1]['ativoLiquido'] == pytest.approx(0, abs=1e-6)
+
+    def test_tail_rejects_mismatched_schedule(self):
+        """Cronograma de outro prazo ou mês fora do contrato deve falhar"""
+        anterior = self._anterior(prazo=24)
+        with pytest.raises(ValueError):
+            AmortizationEngine.remeasure_tail(anterior, date(2024, 1, 1), 36, 13, 1100.0, 10.0)
+        with pytest.raises(ValueError):
+            AmortizationEngine.remeasure_tail(anterior, date(2024, 1, 1), 24, 25, 1100.0, 10.0)
+
+    @pytest.mark.asyncio
+    async def test_calculate_new_values_incremental(self):
+        """Com cronograma anterior (TEXT), a remensuração só recalcula a cauda"""
+        import json
+
+        anterior = self._anterior()
+        contract = {
+            'parcela_inicial': 1000.0,
+            'prazo_meses': 36,
+            'carencia_meses': 2,
+            'taxa_desconto_anual': 10.0,
+            'reajuste_valor': 0,
+            'data_inicio': date(2024, 1, 1),
+            'resultados_json': json.dumps(anterior),
+        }
+        new_values = await RemeasurementService.calculate_new_values(
+            contract, 10.0, reference_date=date(2025, 1, 20)
+        )
+
+        assert new_values['remensuracao']['mes_efetivo'] == 13
+        resultados = new_values['resultados']
+        assert resultados['fluxoCaixa'][11]['parcela'] == pytest.approx(1000.0)
+        assert resultados['fluxoCaixa'][12]['parcela'] == pytest.approx(1100.0)
+        assert new_values['total_nominal'] == pytest.approx(1000.0 * 10 + 1100.0 * 24)
@@ -2,6 +2,9 @@
 Testes para funções de autenticação JWT
 """
 
+import asyncio
+import time
+
 import pytest
 from datetime import timedelta
 from jose import jwt
@@ -11,7 +14,10 @@ from app.auth import (
     verify_token,
     decode_token_unsafe,
     is_token_expired,
-    get_token_expiration
+    get_token_expiration,
+    hash_password_async,
+    verify_password_async,
+    PasswordHashExecutor,
 )
 from app.config import get_settings
 
@@ -257,3 +263,44 @@ def test_token_cannot_be_modified():
     decoded = verify_token(modified_token)
     assert decoded is None
 
+
+
+# ============================================================
+# Testes de Hash de Senha no Executor
+# ============================================================
+
+@pytest.mark.asyncio
+async def test_password_hash_async_roundtrip():
+    """Hash e verificação assíncronos produzem o mesmo resultado das versões síncronas"""
+    hashed = await hash_password_async("SenhaForte123!")
+
+    assert await verify_password_async("SenhaForte123!", hashed) is True
+    assert await verify_password_async("SenhaErrada123!", hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_password_hash_executor_caps_concurrency():
+    """Com 1 worker as tarefas ficam na fila e o tempo de fila é medido"""
+    executor = PasswordHashExecutor(max_workers=1)
+    try:
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        await asyncio.gather(*(executor.run(time.sleep, 0.1) for _ in range(3)))
+        ticker_task.cancel()
+
+        stats = executor.stats()
+        assert stats["completed"] == 3
+        assert stats["pending"] == 0
+        # A terceira tarefa esperou as duas primeiras
+        assert stats["queue_ms_max"] >= 150
+        # O event loop continuou respondendo durante os hashes
+        assert ticks >= 10
+    finally:
+        executor.shutdown()
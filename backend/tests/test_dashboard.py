@@ -69,6 +69,91 @@ class TestDashboardService:
             pytest.skip("Teste requer PostgreSQL")
 
 
+
+class TestDashboardEvolution:
+    """Evolução do passivo a partir de contract_schedule_rows"""
+
+    def test_aggregate_by_month(self):
+        """Soma por mês usando a última linha de cada versão no mês"""
+        import numpy as np
+
+        inicio = np.datetime64("2024-01", "M")
+        rows = [
+            # versão A: reconhecimento inicial e parcela 1 no mesmo mês
+            ("a", date(2024, 1, 1), 0, 1000.0),
+            ("a", date(2024, 1, 1), 1, 900.0),
+            ("a", date(2024, 2, 1), 2, 800.0),
+            # versão B começa no segundo mês
+            ("b", "2024-02-01", 0, 500.0),
+            ("b", "2024-02-01", 1, 450.0),
+            ("b", "2024-03-01", 2, 0.0),
+        ]
+
+        totais = DashboardService.aggregate_by_month(rows, inicio, 4)
+
+        assert totais.tolist() == [900.0, 1250.0, 0.0, 0.0]
+        assert DashboardService.aggregate_by_month([], inicio, 3).tolist() == [0.0, 0.0, 0.0]
+
+    @pytest.mark.asyncio
+    async def test_get_evolution_sums_current_schedules(self, db_session, test_user):
+        """Só a versão corrente de contratos ativos entra na evolução"""
+        await db_session.execute(text("""
+            CREATE TABLE IF NOT EXISTS contract_schedule_rows (
+                version_id TEXT NOT NULL,
+                mes INTEGER NOT NULL,
+                data DATE,
+                passivo_final REAL NOT NULL DEFAULT 0,
+                juros REAL NOT NULL DEFAULT 0,
+                pagamento REAL NOT NULL DEFAULT 0,
+                deprec REAL NOT NULL DEFAULT 0,
+                cp REAL NOT NULL DEFAULT 0,
+                lp REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (version_id, mes)
+            )
+        """))
+
+        hoje = date.today().replace(day=1)
+        mes_anterior = (hoje - timedelta(days=1)).replace(day=1)
+        atual, antiga, inativa = uuid4(), uuid4(), uuid4()
+
+        for name, status, version_id in (
+            ("Ativo", ContractStatus.ACTIVE, atual),
+            ("Rascunho", ContractStatus.DRAFT, inativa),
+        ):
+            db_session.add(Contract(
+                id=uuid4(), user_id=test_user.id, name=name,
+                status=status, current_version_id=version_id
+            ))
+
+        # No SQLite de testes o UUID é gravado em hexadecimal
+        for version_id, mes, data, passivo in (
+            (atual, 0, mes_anterior, 1000.0),
+            (atual, 1, mes_anterior, 950.0),
+            (atual, 2, hoje, 900.0),
+            (antiga, 1, hoje, 5000.0),
+            (inativa, 1, hoje, 7000.0),
+        ):
+            await db_session.execute(
+                text("""
+                    INSERT INTO contract_schedule_rows (version_id, mes, data, passivo_final)
+                    VALUES (:version_id, :mes, :data, :passivo)
+                """),
+                {"version_id": version_id.hex, "mes": mes, "data": data, "passivo": passivo}
+            )
+        await db_session.commit()
+
+        service = DashboardService(db_session)
+        try:
+            evolution = await service.get_evolution(str(test_user.id), months=3)
+        finally:
+            await db_session.execute(text("DROP TABLE contract_schedule_rows"))
+
+        assert [e["month"] for e in evolution][-2:] == [
+            mes_anterior.strftime("%Y-%m"), hoje.strftime("%Y-%m")
+        ]
+        assert [e["passivo"] for e in evolution] == [0.0, 950.0, 900.0]
+
+
 @pytest.mark.asyncio
 class TestDashboardEndpoints:
     """Testes para endpoints do dashboard"""
@@ -0,0 +1,232 @@
+"""
+Testes do controle de versão do schema (bootstrap no startup)
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import (
+    SCHEMA_VERSION,
+    ensure_contract_schedule_rows_table,
+    ensure_contract_versions_summary_columns,
+    ensure_schema,
+    get_schema_version,
+    set_schema_version,
+)
+from app.services.amortization_engine import AmortizationEngine
+from tests.conftest import test_engine
+
+# Backfills em JSON usam funções do PostgreSQL (jsonb, regex, plpgsql)
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+requires_postgres = pytest.mark.skipif(
+    not TEST_POSTGRES_URL,
+    reason="Teste requer PostgreSQL (defina TEST_POSTGRES_URL)"
+)
+
+
+@pytest_asyncio.fixture
+async def clean_schema_version():
+    async with test_engine.begin() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS schema_version"))
+    yield
+    async with test_engine.begin() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS schema_version"))
+
+
+@pytest.mark.asyncio
+async def test_schema_version_missing_table_returns_none(clean_schema_version):
+    """Sem a tabela schema_version a versão é None (banco novo)"""
+    assert await get_schema_version(test_engine) is None
+
+
+@pytest.mark.asyncio
+async def test_set_schema_version_upserts_single_row(clean_schema_version):
+    """A versão é gravada em uma única linha e pode ser atualizada"""
+    await set_schema_version(1, test_engine)
+    await set_schema_version(7, test_engine)
+
+    assert await get_schema_version(test_engine) == 7
+    async with test_engine.connect() as conn:
+        result = await conn.execute(text("SELECT COUNT(*) FROM schema_version"))
+        assert result.scalar() == 1
+
+
+@pytest.mark.asyncio
+async def test_ensure_schema_runs_migrations_only_on_version_change(clean_schema_version):
+    """Migrations rodam no primeiro boot e são puladas quando a versão confere"""
+    calls = []
+
+    async def migration():
+        calls.append(1)
+
+    assert await ensure_schema(test_engine, [migration, migration]) is True
+    assert len(calls) == 2
+    assert await get_schema_version(test_engine) == SCHEMA_VERSION
+
+    # Boot seguinte: só a leitura da versão, nenhum DDL
+    assert await ensure_schema(test_engine, [migration, migration]) is False
+    assert len(calls) == 2
+
+    # Versão antiga gravada: migrations reaplicadas
+    await set_schema_version(SCHEMA_VERSION - 1, test_engine)
+    assert await ensure_schema(test_engine, [migration]) is True
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_migration_keeps_old_version(clean_schema_version):
+    """Se uma migration falha a versão não é gravada (nova tentativa no próximo boot)"""
+    async def failing_migration():
+        raise RuntimeError("falha de DDL")
+
+    with pytest.raises(RuntimeError):
+        await ensure_schema(test_engine, [failing_migration])
+
+    assert await get_schema_version(test_engine) is None
+
+
+# Versões antigas com resultados_json enviado pelo cliente (válido e malformado)
+LEGACY_RESULTADOS = {
+    "valido": json.dumps({"contabilizacao": [
+        {"mes": 0, "passivoFinal": 1980.0, "passivoCP": 990.0, "passivoLP": 990.0},
+        {"mes": 1, "juros": 16.5, "despDeprec": 990.0, "despTotal": 1006.5,
+         "pagamento": 1000.0, "passivoFinal": 996.5, "data": "01/2024"},
+        {"mes": 2, "juros": 8.3, "despDeprec": 990.0, "despTotal": 998.3,
+         "pagamento": 1000.0, "passivoFinal": 0, "data": "02/2024"},
+    ]}),
+    "virgula_decimal": json.dumps({"contabilizacao": [
+        {"mes": 0, "passivoFinal": 1980.0},
+        {"mes": 1, "juros": "1.234,56", "despTotal": 10},
+    ]}),
+    "mes_invalido": json.dumps({"contabilizacao": [
+        {"mes": 0, "passivoFinal": 1980.0},
+        {"mes": 1.5, "juros": 3},
+        {"juros": 4},
+        {"mes": None, "juros": 5},
+        {"mes": "1", "juros": 6},
+        {"mes": 1, "juros": 7},
+        {"mes": 2, "juros": "1.234,56"},
+        "linha",
+    ]}),
+    "json_truncado": '{"contabilizacao": [{"mes": 0, "juros": 1',
+    "json_nulo": "null",
+}
+
+
+@pytest_asyncio.fixture
+async def postgres_engine():
+    """Engine PostgreSQL com contract_versions mínima e sem schema_version"""
+    pg_engine = create_async_engine(TEST_POSTGRES_URL)
+    reset = """
+        DROP TABLE IF EXISTS schema_version;
+        DROP TABLE IF EXISTS contract_schedule_rows;
+        DROP TABLE IF EXISTS contract_versions;
+    """
+    async with pg_engine.begin() as conn:
+        for statement in reset.split(";")[:-1]:
+            await conn.execute(text(statement))
+        await conn.execute(text("""
+            CREATE TABLE contract_versions (
+                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                notas TEXT,
+                data_inicio DATE,
+                prazo_meses INTEGER,
+                resultados_json TEXT
+            )
+        """))
+        for notas, resultados in LEGACY_RESULTADOS.items():
+            await conn.execute(
+                text("""
+                    INSERT INTO contract_versions (notas, data_inicio, prazo_meses, resultados_json)
+                    VALUES (:notas, '2024-01-01', 2, :resultados)
+                """),
+                {"notas": notas, "resultados": resultados}
+            )
+    yield pg_engine
+    async with pg_engine.begin() as conn:
+        for statement in reset.split(";")[:-1]:
+            await conn.execute(text(statement))
+    await pg_engine.dispose()
+
+
+@requires_postgres
+@pytest.mark.asyncio
+async def test_summary_backfill_tolerates_malformed_json(postgres_engine):
+    """Resumo preenchido como no Python; versões malformadas ficam NULL sem abortar a migration"""
+    with patch("app.database.engine", postgres_engine):
+        assert await ensure_schema(postgres_engine, [ensure_contract_versions_summary_columns]) is True
+    assert await get_schema_version(postgres_engine) == SCHEMA_VERSION
+
+    async with postgres_engine.connect() as conn:
+        result = await conn.execute(text("""
+            SELECT notas, despesa_mes1, passivo_cp_inicial, passivo_lp_inicial,
+                   total_juros, total_deprec, data_fim
+            FROM contract_versions
+        """))
+        rows = {
+            row[0]: tuple(None if value is None else float(value) for value in row[1:6]) + (row[6],)
+            for row in result.fetchall()
+        }
+
+    for notas, resultados in LEGACY_RESULTADOS.items():
+        try:
+            resultados = json.loads(resultados)
+        except ValueError:
+            resultados = {}
+        resumo = AmortizationEngine.schedule_summary(resultados, "2024-01-01", 2)
+        esperado = tuple(
+            None if resumo[key] is None else pytest.approx(resumo[key])
+            for key in ('despesa_mes1', 'passivo_cp_inicial', 'passivo_lp_inicial',
+                        'total_juros', 'total_deprec')
+        )
+        assert rows[notas][:5] == esperado, notas
+        assert rows[notas][5] == resumo['data_fim']
+
+    assert rows["valido"][0] is not None
+    assert rows["virgula_decimal"][0] is None
+
+
+@requires_postgres
+@pytest.mark.asyncio
+async def test_schedule_rows_backfill_tolerates_malformed_json(postgres_engine):
+    """Cronograma preenchido com as regras de schedule_rows; linhas ruins não abortam a migration"""
+    with patch("app.database.engine", postgres_engine):
+        assert await ensure_schema(postgres_engine, [ensure_contract_schedule_rows_table]) is True
+    assert await get_schema_version(postgres_engine) == SCHEMA_VERSION
+
+    async with postgres_engine.connect() as conn:
+        result = await conn.execute(text("""
+            SELECT v.notas, r.mes, r.data, r.passivo_final, r.juros, r.pagamento,
+                   r.deprec, r.cp, r.lp
+            FROM contract_schedule_rows r
+            JOIN contract_versions v ON v.id = r.version_id
+            ORDER BY v.notas, r.mes
+        """))
+        rows = {}
+        for row in result.fetchall():
+            rows.setdefault(row[0], []).append(
+                (row[1], row[2]) + tuple(float(value) for value in row[3:])
+            )
+
+    for notas, resultados in LEGACY_RESULTADOS.items():
+        try:
+            resultados = json.loads(resultados)
+        except ValueError:
+            resultados = {}
+        esperado = [
+            (r['mes'], r['data'], r['passivo_final'], r['juros'], r['pagamento'],
+             r['deprec'], r['cp'], r['lp'])
+            for r in AmortizationEngine.schedule_rows(resultados)
+        ]
+        assert rows.get(notas, []) == esperado, notas
+
+    # mes 1 repetido fica com a última linha válida; mes 2 com "1.234,56" é descartado
+    assert [(linha[0], linha[3]) for linha in rows["mes_invalido"]] == [(0, 0.0), (1, 7.0)]
+    assert "json_truncado" not in rows
@@ -3,6 +3,8 @@ Testes para API de Índices Econômicos (Funcionalidade 1)
 Cobre modelo, service e endpoints conforme PLANO_IMPLEMENTACAO_MELHORIAS.md
 """
 
+import asyncio
+import httpx
 import pytest
 import pytest_asyncio
 from datetime import datetime, date, timedelta
@@ -11,9 +13,11 @@ from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.models import EconomicIndex
+from app.models import EconomicIndex, EconomicIndexAccumulated
 from app.services.bcb_service import BCBService
 from app.services.remeasurement_service import RemeasurementService
+from app.services.index_series_cache import IndexSeriesCache
+from app.services.bcb_response_cache import BCBResponseCache, BCBReplayMissError
 from app.schemas import EconomicIndexTypeEnum
 
 
@@ -281,6 +285,205 @@ class TestBCBService:
             # Pode ter mais de um se houver múltiplas datas, mas não duplicatas da mesma data
             assert len([idx for idx in indexes if idx.reference_date == datetime(2024, 1, 1)]) == 1
     
+    @pytest.mark.asyncio
+    async def test_sync_index_to_db_change_set(self, db_session: AsyncSession):
+        """Testar que o change set recebe apenas pares inseridos ou alterados"""
+        def mock_bcb(valor):
+            mock_client = AsyncMock()
+            mock_response = MagicMock()
+            mock_response.json = MagicMock(return_value=[{"data": "01/01/2024", "valor": valor}])
+            mock_response.raise_for_status = MagicMock()
+            mock_client.get = AsyncMock(return_value=mock_response)
+            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
+            mock_client.__aexit__ = AsyncMock(return_value=None)
+            return mock_client
+
+        with patch('app.services.bcb_service.httpx.AsyncClient') as mock_client_class:
+            mock_client_class.return_value = mock_bcb("0.42")
+            inserted = set()
+            await BCBService.sync_index_to_db(db_session, "ipca", last_n=1, change_set=inserted)
+            assert inserted == {("ipca", datetime(2024, 1, 1))}
+
+            unchanged = set()
+            await BCBService.sync_index_to_db(db_session, "ipca", last_n=1, change_set=unchanged)
+            assert unchanged == set()
+
+            mock_client_class.return_value = mock_bcb("0.45")
+            revised = set()
+            await BCBService.sync_index_to_db(db_session, "ipca", last_n=1, change_set=revised)
+            assert revised == {("ipca", datetime(2024, 1, 1))}
+    
+    @pytest.mark.asyncio
+    async def test_upsert_index_values_counts(self, db_session: AsyncSession):
+        """Testar upsert por conjunto: inseridos, alterados e inalterados"""
+        counts = await BCBService.upsert_index_values(db_session, "igpm", [
+            {"data": "01/01/2024", "valor": "0.07"},
+            {"data": "01/02/2024", "valor": "-0.52"},
+            {"data": "sem-data", "valor": "1.00"},
+        ])
+        await db_session.commit()
+        assert counts == {"inserted": 2, "updated": 0}
+
+        change_set = set()
+        counts = await BCBService.upsert_index_values(db_session, "igpm", [
+            {"data": "01/01/2024", "valor": "0.07"},
+            {"data": "01/02/2024", "valor": "-0.50"},
+            {"data": "01/03/2024", "valor": "-0.47"},
+        ], change_set)
+        await db_session.commit()
+        assert counts == {"inserted": 1, "updated": 1}
+        assert change_set == {("igpm", datetime(2024, 2, 1)), ("igpm", datetime(2024, 3, 1))}
+
+        result = await db_session.execute(
+            select(EconomicIndex).where(EconomicIndex.index_type == "igpm")
+            .order_by(EconomicIndex.reference_date)
+        )
+        assert [i.value for i in result.scalars().all()] == ["0.07", "-0.50", "-0.47"]
+
+    def test_incremental_start_date(self):
+        """Testar janela de revisão do sync incremental (inclusive na virada do ano)"""
+        assert BCBService.incremental_start_date(datetime(2024, 6, 1)) == datetime(2024, 3, 1)
+        assert BCBService.incremental_start_date(datetime(2024, 2, 1)) == datetime(2023, 11, 1)
+        assert BCBService.incremental_start_date(datetime(2024, 2, 1), revision_months=0) == datetime(2024, 2, 1)
+
+    @pytest.mark.asyncio
+    async def test_sync_all_indexes_incremental(self, db_session: AsyncSession):
+        """Testar sync incremental: busca a partir do último mês e não grava sem alterações"""
+        for month in range(1, 7):
+            db_session.add(EconomicIndex(
+                index_type="ipca", reference_date=datetime(2024, month, 1),
+                value=f"0.{month}0", source="BCB"
+            ))
+        await db_session.commit()
+
+        bcb_ipca = [{"data": f"01/0{m}/2024", "valor": f"0.{m}0"} for m in range(3, 7)]
+        requests = {}
+
+        async def get(url, params=None):
+            requests[url.split("bcdata.sgs.")[1].split("/")[0]] = params
+            response = MagicMock()
+            response.json = MagicMock(return_value=bcb_ipca if "bcdata.sgs.433/" in url else [])
+            response.raise_for_status = MagicMock()
+            return response
+
+        with patch('app.services.bcb_service.httpx.AsyncClient') as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(side_effect=get)
+            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
+            mock_client.__aexit__ = AsyncMock(return_value=None)
+            mock_client_class.return_value = mock_client
+
+            with patch.object(
+                BCBService, 'upsert_index_values', wraps=BCBService.upsert_index_values
+            ) as mock_upsert:
+                results = await BCBService.sync_all_indexes(db_session, last_n=3, incremental=True)
+                assert results["ipca"] == 0
+                mock_upsert.assert_not_called()
+
+            assert requests["433"]["dataInicial"] == "01/03/2024"
+            assert "ultimos" not in requests["433"]
+            assert requests["189"]["ultimos"] == 3
+
+            bcb_ipca[-1] = {"data": "01/06/2024", "valor": "0.65"}
+            bcb_ipca.append({"data": "01/07/2024", "valor": "0.70"})
+            change_set = set()
+            upserts = {}
+            results = await BCBService.sync_all_indexes(
+                db_session, incremental=True, change_set=change_set, upsert_counts=upserts
+            )
+
+        assert results["ipca"] == 2
+        assert upserts["ipca"] == {"inserted": 1, "updated": 1}
+        assert change_set == {("ipca", datetime(2024, 6, 1)), ("ipca", datetime(2024, 7, 1))}
+
+    @pytest.mark.asyncio
+    async def test_upsert_refreshes_accumulated(self, db_session: AsyncSession):
+        """Testar valor numérico e taxa acumulada pré-calculados na sincronização"""
+        igpm = [{"data": f"01/{m:02d}/2023", "valor": "1.00"} for m in range(1, 13)]
+        igpm.append({"data": "01/01/2024", "valor": "1.00"})
+        await BCBService.upsert_index_values(db_session, "igpm", igpm)
+        await db_session.commit()
+
+        stored = await db_session.execute(
+            select(EconomicIndex).where(EconomicIndex.index_type == "igpm")
+        )
+        assert all(float(i.value_numeric) == 1.0 for i in stored.scalars().all())
+
+        async def accumulated_at(month: datetime) -> EconomicIndexAccumulated:
+            result = await db_session.execute(
+                select(EconomicIndexAccumulated).where(
+                    EconomicIndexAccumulated.index_type == "igpm",
+                    EconomicIndexAccumulated.reference_date == month
+                )
+            )
+            return result.scalar_one()
+
+        janeiro = await accumulated_at(datetime(2024, 1, 1))
+        assert janeiro.months_used == 12
+        assert float(janeiro.accumulated_12m) == pytest.approx((1.01 ** 12 - 1) * 100)
+        assert (await accumulated_at(datetime(2023, 1, 1))).months_used == 1
+
+        # Revisão de um mês recalcula só os registros a partir dele
+        await BCBService.upsert_index_values(
+            db_session, "igpm", [{"data": "01/06/2023", "valor": "2.00"}]
+        )
+        await db_session.commit()
+
+        janeiro = await accumulated_at(datetime(2024, 1, 1))
+        assert float(janeiro.accumulated_12m) == pytest.approx((1.01 ** 11 * 1.02 - 1) * 100)
+        assert float((await accumulated_at(datetime(2023, 5, 1))).accumulated_12m) == pytest.approx(
+            (1.01 ** 5 - 1) * 100
+        )
+
+        accumulated = await RemeasurementService.get_accumulated_annual_index(
+            db_session, "igpm", date(2024, 2, 15)
+        )
+        assert accumulated['reference_date'] == datetime(2024, 1, 1)
+        assert accumulated['value'] == str(round((1.01 ** 11 * 1.02 - 1) * 100, 4))
+
+    @pytest.mark.asyncio
+    async def test_sync_all_indexes_concurrent_shared_client(self, db_session: AsyncSession):
+        """Testar sync paralelo: um único cliente, limite de concorrência e tempos por série"""
+        in_flight = 0
+        max_in_flight = 0
+
+        async def get(url, params=None):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if "bcdata.sgs.226/" in url:
+                raise httpx.ConnectError("falha de rede")
+            response = MagicMock()
+            response.json = MagicMock(return_value=[{"data": "01/01/2024", "valor": "0.50"}])
+            response.raise_for_status = MagicMock()
+            return response
+
+        with patch('app.services.bcb_service.httpx.AsyncClient') as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(side_effect=get)
+            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
+            mock_client.__aexit__ = AsyncMock(return_value=None)
+            mock_client_class.return_value = mock_client
+
+            timings = {}
+            results = await BCBService.sync_all_indexes(
+                db_session, last_n=1, max_concurrency=2, timings=timings
+            )
+
+        assert mock_client_class.call_count == 1
+        assert mock_client.get.await_count == 6
+        assert max_in_flight == 2
+        assert results["tr"] == -1
+        assert all(results[t] == 1 for t in ("selic", "igpm", "ipca", "cdi", "inpc"))
+        assert set(timings) == set(results)
+        assert timings["ipca"]["fetch"] > 0
+        assert timings["tr"]["write"] == 0
+
+        result = await db_session.execute(select(EconomicIndex))
+        assert len(result.scalars().all()) == 5
+
     @pytest.mark.asyncio
     async def test_get_latest_value(self, db_session: AsyncSession, multiple_economic_indexes: list[EconomicIndex]):
         """Teste 1.2.3: Testar busca do mais recente"""
@@ -332,6 +535,8 @@ class TestBCBService:
             )
             db_session.add(index)
         await db_session.commit()
+        # Taxas acumuladas são derivadas na sincronização/startup
+        await BCBService.rebuild_accumulated(db_session)
         
         # Buscar índice acumulado
         accumulated = await RemeasurementService.get_accumulated_annual_index(
@@ -478,6 +683,28 @@ class TestEconomicIndexesAPI:
             data = response.json()
             assert "results" in data
     
+    @pytest.mark.asyncio
+    async def test_get_accumulated_index(self, client: AsyncClient, db_session: AsyncSession):
+        """Testar endpoint da taxa acumulada em 12 meses"""
+        response = await client.get("/api/economic-indexes/ipca/accumulated")
+        assert response.status_code == 404
+
+        await BCBService.upsert_index_values(db_session, "ipca", [
+            {"data": "01/01/2024", "valor": "0.42"},
+            {"data": "01/02/2024", "valor": "0.83"},
+        ])
+        await db_session.commit()
+
+        response = await client.get(
+            "/api/economic-indexes/ipca/accumulated?reference_date=2024-02-20"
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["index_type"] == "ipca"
+        assert data["months_used"] == 2
+        assert data["monthly_value"] == "0.83"
+        assert float(data["accumulated_12m"]) == pytest.approx((1.0042 * 1.0083 - 1) * 100, abs=1e-4)
+
     @pytest.mark.asyncio
     async def test_invalid_index_type(self, client: AsyncClient):
         """Testar tipo de índice inválido"""
@@ -509,6 +736,143 @@ class TestEconomicIndexesAPI:
 # TESTES DE CACHE (Melhoria)
 # =============================================================================
 
+class TestEconomicIndexReadCache:
+    """Testes do cache de leituras dos endpoints de índices econômicos"""
+
+    @pytest.mark.asyncio
+    async def test_list_served_from_cache(self, client: AsyncClient, multiple_economic_indexes: list[EconomicIndex]):
+        """Segunda leitura não consulta o banco"""
+        with patch.object(
+            BCBService, 'get_index_history', wraps=BCBService.get_index_history
+        ) as mock_history:
+            first = await client.get("/api/economic-indexes?index_type=selic")
+            second = await client.get("/api/economic-indexes?index_type=selic")
+
+        assert first.status_code == 200
+        assert second.json() == first.json()
+        assert second.headers["etag"] == first.headers["etag"]
+        assert "last-modified" in first.headers
+        assert mock_history.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_conditional_requests(self, client: AsyncClient, multiple_economic_indexes: list[EconomicIndex]):
+        """If-None-Match e If-Modified-Since retornam 304"""
+        response = await client.get("/api/economic-indexes/selic/latest")
+        etag = response.headers["etag"]
+
+        not_modified = await client.get(
+            "/api/economic-indexes/selic/latest", headers={"If-None-Match": etag}
+        )
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+
+        not_modified = await client.get(
+            "/api/economic-indexes/selic/latest",
+            headers={"If-Modified-Since": response.headers["last-modified"]}
+        )
+        assert not_modified.status_code == 304
+
+        modified = await client.get(
+            "/api/economic-indexes/selic/latest", headers={"If-None-Match": '"outro"'}
+        )
+        assert modified.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_sync_invalidates_cache(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        multiple_economic_indexes: list[EconomicIndex]
+    ):
+        """Sincronização com alterações descarta as respostas em cache"""
+        before = await client.get("/api/economic-indexes/selic/latest")
+
+        with patch('app.services.bcb_service.httpx.AsyncClient') as mock_client_class:
+            mock_client = AsyncMock()
+            mock_response = MagicMock()
+            mock_response.json = MagicMock(return_value=[{"data": "01/01/2030", "valor": "9.99"}])
+            mock_response.raise_for_status = MagicMock()
+            mock_client.get = AsyncMock(return_value=mock_response)
+            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
+            mock_client.__aexit__ = AsyncMock(return_value=None)
+            mock_client_class.return_value = mock_client
+
+            await BCBService.sync_index_to_db(db_session, "selic", last_n=1)
+
+        after = await client.get(
+            "/api/economic-indexes/selic/latest", headers={"If-None-Match": before.headers["etag"]}
+        )
+        assert after.status_code == 200
+        assert after.json()["value"] == "9.99"
+        assert after.headers["etag"] != before.headers["etag"]
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, client: AsyncClient, db_session: AsyncSession):
+        """404 (índice ainda não sincronizado) não fica em cache"""
+        response = await client.get("/api/economic-indexes/tr/latest")
+        assert response.status_code == 404
+
+        await BCBService.upsert_index_values(db_session, "tr", [{"data": "01/01/2024", "valor": "0.08"}])
+        await db_session.commit()
+
+        response = await client.get("/api/economic-indexes/tr/latest")
+        assert response.status_code == 200
+
+
+    def test_last_modified_follows_content_without_invalidation(self):
+        """Instância sem invalidate() avança o Last-Modified ao reconstruir com dados novos"""
+        from datetime import datetime, timezone
+        from email.utils import format_datetime
+        from app.services.economic_index_cache import EconomicIndexReadCache
+
+        t0 = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+        t1 = datetime(2026, 1, 2, 12, 0, tzinfo=timezone.utc)
+        sync_worker = EconomicIndexReadCache(ttl_seconds=60)
+        other_worker = EconomicIndexReadCache(ttl_seconds=60)
+
+        with patch.object(EconomicIndexReadCache, '_now', return_value=t0):
+            sync_worker.put("selic", b'{"value":"1.00"}')
+            old = other_worker.put("selic", b'{"value":"1.00"}')
+        client_since = format_datetime(old['last_modified'], usegmt=True)
+
+        # Sincronização roda só em sync_worker; other_worker apenas expira pelo TTL
+        with patch.object(EconomicIndexReadCache, '_now', return_value=t1):
+            sync_worker.invalidate()
+            other_worker._entries["selic"]['expires_at'] = 0
+            assert other_worker.get("selic") is None
+            rebuilt = other_worker.put("selic", b'{"value":"9.99"}')
+
+        assert rebuilt['etag'] != old['etag']
+        assert rebuilt['last_modified'] == t1
+        assert not other_worker.is_not_modified(rebuilt, None, client_since)
+
+        # Reconstrução com o mesmo conteúdo mantém o Last-Modified
+        with patch.object(EconomicIndexReadCache, '_now', return_value=t1.replace(day=3)):
+            same = other_worker.put("selic", b'{"value":"9.99"}')
+        assert same['last_modified'] == t1
+
+    @pytest.mark.asyncio
+    async def test_latest_value_is_cached_until_sync(self, db_session: AsyncSession):
+        """get_latest_value consulta o banco uma vez e volta a consultar após a sincronização"""
+        await BCBService.upsert_index_values(db_session, "ipca", [{"data": "01/01/2024", "valor": "0.42"}])
+        await db_session.commit()
+
+        first = await BCBService.get_latest_value(db_session, "ipca")
+        with patch.object(db_session, "execute", side_effect=AssertionError("consulta ao banco")):
+            cached = await BCBService.get_latest_value(db_session, "ipca")
+            latest = await RemeasurementService.get_latest_index(db_session, "ipca")
+        assert first.value == cached.value == latest['value'] == "0.42"
+
+        with patch.object(BCBService, "fetch_from_bcb", new_callable=AsyncMock,
+                          return_value=[{"data": "01/02/2024", "valor": "0.83"}]):
+            await BCBService.sync_index_to_db(db_session, "ipca", last_n=1)
+
+        refreshed = await BCBService.get_latest_value(db_session, "ipca")
+        assert refreshed.value == "0.83"
+        assert refreshed.reference_date == datetime(2024, 2, 1)
+
+
 class TestBCBServiceCache:
     """Testes para verificação de cache (índices recentes)"""
     
@@ -552,3 +916,173 @@ class TestBCBServiceCache:
         assert latest.value == "12.00"
         # Nota: A lógica atual sempre retorna do banco se existir
         # Para implementar cache agressivo, precisaria adicionar verificação de data
+
+
+class TestIndexSeriesCache:
+    """Testes das séries pré-carregadas usadas pelo job de remensuração"""
+
+    @pytest_asyncio.fixture
+    async def ipca_series(self, db_session: AsyncSession):
+        """24 meses de IPCA (dia 1) e um valor inválido"""
+        for i in range(24):
+            db_session.add(EconomicIndex(
+                index_type="ipca",
+                reference_date=datetime(2023 + i // 12, i % 12 + 1, 1),
+                value="invalido" if i == 5 else str(round(0.2 + 0.05 * i, 2)),
+                source="BCB"
+            ))
+        await db_session.commit()
+        await BCBService.rebuild_accumulated(db_session)
+
+    @pytest.mark.asyncio
+    async def test_matches_database_lookups(self, db_session: AsyncSession, ipca_series):
+        """Mesmo resultado das consultas por contrato, em qualquer mês"""
+        cache = await IndexSeriesCache.load(db_session, ["IPCA", "igpm"], date(2025, 12, 10))
+
+        for ref in [date(2023, 1, 10), date(2023, 9, 20), date(2024, 6, 30), date(2024, 12, 15), date(2025, 2, 10)]:
+            esperado = await RemeasurementService.get_accumulated_annual_index(db_session, "ipca", ref)
+            obtido = cache.get_accumulated_annual_index("ipca", ref)
+            assert obtido['value'] == esperado['value'], ref
+            assert obtido['months_used'] == esperado['months_used']
+            assert obtido['reference_date'] == esperado['reference_date']
+
+            esperado = await RemeasurementService.get_latest_index(db_session, "ipca", ref)
+            assert cache.get_index_for_remeasurement("ipca", "mensal", ref) == esperado
+
+        # Sem publicação nos 12 meses anteriores à referência
+        assert await RemeasurementService.get_accumulated_annual_index(
+            db_session, "ipca", date(2025, 12, 10)
+        ) is None
+        assert cache.get_accumulated_annual_index("ipca", date(2025, 12, 10)) is None
+
+        assert cache.get_latest_index("ipca", date(2022, 12, 31)) is None
+        assert cache.get_index_for_remeasurement("igpm", "anual") is None
+
+    @pytest.mark.asyncio
+    async def test_rejects_date_after_reference(self, db_session: AsyncSession, ipca_series):
+        """Índices posteriores à referência não foram carregados"""
+        cache = await IndexSeriesCache.load(db_session, ["ipca"], date(2024, 6, 1))
+        with pytest.raises(ValueError):
+            cache.get_latest_index("ipca", date(2024, 7, 1))
+
+
+class TestBCBOffline:
+    """Testes do servidor local do BCB e do cache de respostas em disco"""
+
+    IPCA_FIXTURE = [
+        {"data": f"01/{m:02d}/2024", "valor": f"0.{m:02d}"} for m in range(1, 13)
+    ]
+
+    @pytest_asyncio.fixture
+    async def standin_client(self, tmp_path):
+        """Cliente HTTP ligado ao servidor local (sem rede), com fixture de IPCA"""
+        import json
+        from scripts.bcb_standin_server import create_app
+
+        fixtures = tmp_path / "fixtures"
+        fixtures.mkdir()
+        (fixtures / "433.json").write_text(json.dumps(self.IPCA_FIXTURE))
+
+        transport = httpx.ASGITransport(app=create_app(fixtures))
+        with patch.object(
+            BCBService, "BASE_URL", "http://bcb.local/dados/serie/bcdata.sgs.{codigo}/dados"
+        ):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bcb.local") as client:
+                yield client
+
+    @pytest.mark.asyncio
+    async def test_standin_serves_sgs_format(self, standin_client):
+        """Filtros ultimos/dataInicial/dataFinal no formato da API SGS"""
+        data = await BCBService.fetch_from_bcb("ipca", last_n=2, client=standin_client)
+        assert data == self.IPCA_FIXTURE[-2:]
+
+        data = await BCBService.fetch_from_bcb(
+            "ipca", start_date="01/03/2024", end_date="01/05/2024", client=standin_client
+        )
+        assert [item["data"] for item in data] == ["01/03/2024", "01/04/2024", "01/05/2024"]
+
+        response = await standin_client.get("/dados/serie/bcdata.sgs.433/dados/ultimos/1")
+        assert response.json() == self.IPCA_FIXTURE[-1:]
+
+        # Série sem fixture: dados sintéticos determinísticos
+        selic = await BCBService.fetch_from_bcb("selic", last_n=3, client=standin_client)
+        assert len(selic) == 3
+        assert selic == await BCBService.fetch_from_bcb("selic", last_n=3, client=standin_client)
+        # Fim fixo: os valores não dependem da data de execução
+        from scripts.bcb_standin_server import synthetic_series
+        assert selic[-1]["data"] == "01/12/2025"
+        assert selic == synthetic_series(4189)[-3:]
+
+    @pytest.mark.asyncio
+    async def test_record_then_replay(self, standin_client, db_session: AsyncSession, tmp_path):
+        """Respostas gravadas são reproduzidas sem acesso à rede"""
+        cache_dir = tmp_path / "cache"
+        with patch.object(BCBService, "response_cache", BCBResponseCache(str(cache_dir), "record")):
+            recorded = await BCBService.fetch_from_bcb("ipca", last_n=6, client=standin_client)
+        assert len(list(cache_dir.glob("sgs-433-*.json"))) == 1
+
+        with patch.object(BCBService, "response_cache", BCBResponseCache(str(cache_dir), "replay")), \
+                patch('app.services.bcb_service.httpx.AsyncClient', side_effect=AssertionError("rede")):
+            assert await BCBService.fetch_from_bcb("ipca", last_n=6) == recorded
+
+            synced = await BCBService.sync_index_to_db(db_session, "ipca", last_n=6)
+            assert synced == 6
+
+            with pytest.raises(BCBReplayMissError):
+                await BCBService.fetch_from_bcb("igpm", last_n=6)
+
+    @pytest.mark.asyncio
+    async def test_incremental_recording_replays_on_later_day(self, standin_client, tmp_path):
+        """dataFinal (hoje) não entra na chave: a gravação de ontem é reproduzida hoje"""
+        cache_dir = tmp_path / "cache"
+        with patch.object(BCBService, "response_cache", BCBResponseCache(str(cache_dir), "record")):
+            recorded = await BCBService.fetch_from_bcb(
+                "ipca", start_date="01/06/2024", end_date="15/12/2024", client=standin_client
+            )
+        assert len(recorded) == 7
+
+        with patch.object(BCBService, "response_cache", BCBResponseCache(str(cache_dir), "replay")), \
+                patch('app.services.bcb_service.httpx.AsyncClient', side_effect=AssertionError("rede")):
+            assert await BCBService.fetch_from_bcb(
+                "ipca", start_date="01/06/2024", end_date="16/12/2024"
+            ) == recorded
+
+            # Intervalo menor: filtrado como no servidor local
+            data = await BCBService.fetch_from_bcb(
+                "ipca", start_date="01/06/2024", end_date="31/08/2024"
+            )
+            assert [item["data"] for item in data] == ["01/06/2024", "01/07/2024", "01/08/2024"]
+
+            with pytest.raises(BCBReplayMissError):
+                await BCBService.fetch_from_bcb("ipca", start_date="01/07/2024", end_date="16/12/2024")
+
+    @pytest.mark.asyncio
+    async def test_narrower_recording_keeps_wider_history(self, standin_client, tmp_path):
+        """Gravação com dataFinal menor é mesclada, sem apagar o histórico gravado"""
+        cache_dir = tmp_path / "cache"
+        with patch.object(BCBService, "response_cache", BCBResponseCache(str(cache_dir), "record")):
+            wide = await BCBService.fetch_from_bcb(
+                "ipca", start_date="01/01/2024", end_date="15/12/2024", client=standin_client
+            )
+            await BCBService.fetch_from_bcb(
+                "ipca", start_date="01/01/2024", end_date="31/03/2024", client=standin_client
+            )
+        assert len(list(cache_dir.glob("sgs-433-*.json"))) == 1
+
+        cache = BCBResponseCache(str(cache_dir), "replay")
+        params = {"formato": "json", "dataInicial": "01/01/2024", "dataFinal": "15/12/2024"}
+        assert cache.load(433, params) == wide
+
+        # Resposta nova prevalece nas datas repetidas
+        cache.store(433, params, [{"data": "01/02/2024", "valor": "9.99"}])
+        data = cache.load(433, params)
+        assert [item["data"] for item in data] == [item["data"] for item in wide]
+        assert data[1] == {"data": "01/02/2024", "valor": "9.99"}
+
+    def test_invalid_cache_mode(self, tmp_path):
+        """Modo desconhecido ou sem diretório é rejeitado"""
+        with pytest.raises(ValueError):
+            BCBResponseCache(str(tmp_path), "sometimes")
+        with pytest.raises(ValueError):
+            BCBResponseCache(None, "replay")
+        assert BCBResponseCache(None, "off").replaying is False
@@ -0,0 +1,168 @@
+"""
+Testes para recálculo em lote da carteira de contratos
+"""
+
+import pytest
+from datetime import date, datetime
+from unittest.mock import AsyncMock, patch
+from httpx import AsyncClient
+
+from app.models import EconomicIndex
+from app.services.amortization_engine import AmortizationEngine
+from app.services.recalculation_service import RecalculationService
+
+
+def make_version(contract_id: str, **overrides) -> dict:
+    version = {
+        'contract_id': contract_id,
+        'contract_name': f"Contrato {contract_id}",
+        'version_id': f"v-{contract_id}",
+        'version_number': 1,
+        'data_inicio': date(2024, 1, 1),
+        'prazo_meses': 24,
+        'carencia_meses': 0,
+        'parcela_inicial': 1000.0,
+        'taxa_desconto_anual': 10.0,
+        'reajuste_tipo': 'manual',
+        'reajuste_valor': 5.0,
+        'mes_reajuste': 1,
+        'total_vp': 0,
+        'total_nominal': 0,
+        'avp': 0,
+    }
+    version.update(overrides)
+    return version
+
+
+class TestRecalculationService:
+    """Testes do RecalculationService"""
+
+    def test_manual_reajuste_is_applied(self):
+        """Reajuste manual usa reajuste_valor; indexado usa o índice mais recente"""
+        latest = {'igpm': 3.25}
+        manual = RecalculationService.to_engine_params(make_version('a'), latest)
+        indexado = RecalculationService.to_engine_params(
+            make_version('b', reajuste_tipo='igpm', reajuste_valor=None), latest
+        )
+        sem_indice = RecalculationService.to_engine_params(
+            make_version('c', reajuste_tipo='ipca', reajuste_valor=None), latest
+        )
+        remensurado = RecalculationService.to_engine_params(
+            make_version('d', reajuste_tipo='igpm', reajuste_valor=4.1, version_number=2), latest
+        )
+
+        assert manual['reajuste_anual'] == 5.0
+        assert indexado['reajuste_anual'] == 3.25
+        assert sem_indice['reajuste_anual'] == 0
+        # Índice já aplicado em parcela_inicial pela remensuração: não reaplica
+        assert remensurado['reajuste_anual'] == 0
+
+    @pytest.mark.asyncio
+    async def test_indexed_contract_matches_browser_calculation(self, db_session):
+        """Contrato IPCA nunca remensurado usa o último IPCA como reajusteAnual, como o navegador"""
+        for reference_date, value in [(datetime(2024, 5, 1), "0.46"), (datetime(2024, 6, 1), "0.214")]:
+            db_session.add(EconomicIndex(index_type="ipca", reference_date=reference_date, value=value))
+        await db_session.commit()
+
+        version = make_version('ipca', reajuste_tipo='ipca', reajuste_valor=None, mes_reajuste=3)
+        with patch.object(
+            RecalculationService, 'get_latest_versions', new_callable=AsyncMock
+        ) as mock_versions:
+            mock_versions.return_value = [version]
+            report = await RecalculationService.recalculate_portfolio(db=db_session, user_id='u')
+
+        # handleReajusteChange: parseFloat(latest.value).toFixed(2)
+        browser = AmortizationEngine.calculate(
+            data_inicio=version['data_inicio'],
+            prazo_meses=version['prazo_meses'],
+            parcela_inicial=version['parcela_inicial'],
+            taxa_desconto_anual=version['taxa_desconto_anual'],
+            carencia_meses=version['carencia_meses'],
+            reajuste_anual=0.21,
+            mes_reajuste=3,
+        )
+        result = report['contracts'][0]
+        assert result['total_vp'] == pytest.approx(round(browser['totalVP'], 2))
+        assert result['total_nominal'] == pytest.approx(round(browser['totalNominal'], 2))
+
+    def test_recalculate_versions_in_chunks(self):
+        """Resultado deve ser igual ao cálculo individual mesmo dividido em lotes"""
+        versions = [make_version(str(i), prazo_meses=12 + i * 7) for i in range(5)]
+
+        with patch.object(RecalculationService, 'CHUNK_SIZE', 2):
+            results = RecalculationService.recalculate_versions(versions, include_schedule=True)
+
+        assert [r['contract_id'] for r in results] == [v['contract_id'] for v in versions]
+        for version, result in zip(versions, results):
+            single = AmortizationEngine.calculate(**RecalculationService.to_engine_params(version))
+            assert result['total_vp'] == pytest.approx(round(single['totalVP'], 2))
+            assert len(result['resultados_json']['contabilizacao']) == version['prazo_meses'] + 1
+
+    @pytest.mark.asyncio
+    async def test_recalculate_portfolio_reports_not_found(self):
+        """IDs sem versão devem ser reportados em not_found"""
+        with patch.object(
+            RecalculationService, 'get_latest_versions', new_callable=AsyncMock
+        ) as mock_versions:
+            mock_versions.return_value = [make_version('a')]
+            report = await RecalculationService.recalculate_portfolio(
+                db=None, user_id='u', contract_ids=['a', 'b']
+            )
+
+        assert report['total'] == 1
+        assert report['not_found'] == ['b']
+        assert report['invalid'] == []
+        assert 'resultados_json' not in report['contracts'][0]
+        assert set(report['timings_ms']) == {'fetch', 'calculation'}
+
+    @pytest.mark.asyncio
+    async def test_invalid_versions_are_reported_not_fatal(self):
+        """Versão legada com prazo ou data inválidos não derruba o lote"""
+        versions = [
+            make_version('a'),
+            make_version('b', prazo_meses=0),
+            make_version('c', prazo_meses=None),
+            make_version('d', data_inicio=None),
+            make_version('e', data_inicio='31/31/2024'),
+        ]
+        with patch.object(
+            RecalculationService, 'get_latest_versions', new_callable=AsyncMock
+        ) as mock_versions:
+            mock_versions.return_value = versions
+            report = await RecalculationService.recalculate_portfolio(db=None, user_id='u')
+
+        assert report['total'] == 1
+        assert report['contracts'][0]['contract_id'] == 'a'
+        assert [item['contract_id'] for item in report['invalid']] == ['b', 'c', 'd', 'e']
+        assert report['invalid'][0] == {
+            'contract_id': 'b',
+            'version_id': 'v-b',
+            'error': 'prazo_meses deve ser maior que zero',
+        }
+
+    def test_remeasured_version_matches_remeasurement_schedule(self):
+        """Versão remensurada recalcula igual ao cronograma gravado pela remensuração"""
+        from app.services.remeasurement_service import RemeasurementService
+
+        original = make_version('r', reajuste_tipo='igpm', reajuste_valor=None, mes_reajuste=1)
+        new_values = RemeasurementService.compute_new_values(
+            {**original, 'resultados_json': None}, new_index_value=4.1
+        )
+        remensurada = make_version(
+            'r', reajuste_tipo='igpm', reajuste_valor=4.1, version_number=2,
+            parcela_inicial=new_values['nova_parcela']
+        )
+
+        [result] = RecalculationService.recalculate_versions([remensurada], latest_indexes={'igpm': 4.1})
+        assert result['total_vp'] == pytest.approx(new_values['total_vp'])
+        assert result['total_nominal'] == pytest.approx(new_values['total_nominal'])
+
+
+class TestRecalculateEndpoint:
+    """Testes do endpoint POST /api/contracts/recalculate"""
+
+    @pytest.mark.asyncio
+    async def test_recalculate_requires_auth(self, client: AsyncClient):
+        """Endpoint deve exigir autenticação"""
+        response = await client.post("/api/contracts/recalculate", json={"all_contracts": True})
+        assert response.status_code in [401, 403]
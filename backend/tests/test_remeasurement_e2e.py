@@ -9,10 +9,10 @@ import pytest_asyncio
 from datetime import datetime, date, timedelta
 from unittest.mock import AsyncMock, patch, MagicMock
 from uuid import uuid4
-from sqlalchemy import text
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Contract, User, Notification, NotificationType
+from app.models import Contract, User, Notification, NotificationType, RemeasurementCheckpoint
 from app.services.remeasurement_service import RemeasurementService
 from app.services.notification_service import NotificationService
 from app.services.email_service import EmailService
@@ -22,13 +22,29 @@ from app.services.email_service import EmailService
 # FIXTURES
 # =============================================================================
 
+CREATE_SCHEDULE_ROWS_TABLE = text("""
+    CREATE TABLE IF NOT EXISTS contract_schedule_rows (
+        version_id TEXT NOT NULL,
+        mes INTEGER NOT NULL,
+        data DATE,
+        passivo_final REAL NOT NULL DEFAULT 0,
+        juros REAL NOT NULL DEFAULT 0,
+        pagamento REAL NOT NULL DEFAULT 0,
+        deprec REAL NOT NULL DEFAULT 0,
+        cp REAL NOT NULL DEFAULT 0,
+        lp REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (version_id, mes)
+    )
+""")
+
+
 @pytest_asyncio.fixture
 async def test_contract_with_version(db_session: AsyncSession, test_user: User):
     """Cria um contrato com versão inicial para testes"""
     # Criar tabela contract_versions se não existir (SQLite)
     create_table_query = text("""
         CREATE TABLE IF NOT EXISTS contract_versions (
-            id TEXT PRIMARY KEY,
+            id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
             contract_id TEXT NOT NULL,
             version_number INTEGER NOT NULL,
             version_id TEXT,
@@ -46,12 +62,19 @@ async def test_contract_with_version(db_session: AsyncSession, test_user: User):
             total_nominal REAL NOT NULL,
             avp REAL NOT NULL,
             notas TEXT,
+            despesa_mes1 REAL,
+            passivo_cp_inicial REAL,
+            passivo_lp_inicial REAL,
+            total_juros REAL,
+            total_deprec REAL,
+            data_fim DATE,
             archived_at TIMESTAMP,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             UNIQUE(contract_id, version_number)
         )
     """)
     await db_session.execute(create_table_query)
+    await db_session.execute(CREATE_SCHEDULE_ROWS_TABLE)
     await db_session.commit()
     
     # Criar contrato
@@ -444,7 +467,7 @@ class TestRemeasurementE2E:
         # Criar tabela contract_versions se não existir
         create_table_query = text("""
             CREATE TABLE IF NOT EXISTS contract_versions (
-                id TEXT PRIMARY KEY,
+                id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
                 contract_id TEXT NOT NULL,
                 version_number INTEGER NOT NULL,
                 version_id TEXT,
@@ -462,12 +485,19 @@ class TestRemeasurementE2E:
                 total_nominal REAL NOT NULL,
                 avp REAL NOT NULL,
                 notas TEXT,
+                despesa_mes1 REAL,
+                passivo_cp_inicial REAL,
+                passivo_lp_inicial REAL,
+                total_juros REAL,
+                total_deprec REAL,
+                data_fim DATE,
                 archived_at TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE(contract_id, version_number)
             )
         """)
         await db_session.execute(create_table_query)
+        await db_session.execute(CREATE_SCHEDULE_ROWS_TABLE)
         await db_session.commit()
         
         contracts = []
@@ -810,3 +840,622 @@ class TestRemeasurementE2E:
                     # Verificar que email foi chamado (via NotificationService)
                     # O email é enviado automaticamente quando notificação é criada
                     # Como mockamos EmailService, a chamada deve ter ocorrido
+
+
+# =============================================================================
+# TESTES DO MODO EM LOTES
+# =============================================================================
+
+def monthly_contract_dict(contract_data, test_user):
+    """Contrato com reajuste mensal e versão antiga (elegível à remensuração)"""
+    return {
+        'contract_id': str(contract_data['contract'].id),
+        'contract_name': contract_data['contract'].name,
+        'user_id': str(test_user.id),
+        'categoria': contract_data['contract'].categoria,
+        'numero_sequencial': contract_data['contract'].numero_sequencial,
+        'version_id': contract_data['version_id'],
+        'version_number': contract_data['version_number'],
+        'data_inicio': date(2024, 1, 1),
+        'prazo_meses': 12,
+        'carencia_meses': 0,
+        'parcela_inicial': 1000.00,
+        'taxa_desconto_anual': 10.0,
+        'reajuste_tipo': 'igpm',
+        'reajuste_periodicidade': 'mensal',
+        'reajuste_valor': 5.5,
+        'mes_reajuste': 1,
+        'resultados_json': {'parcelas': []},
+        'total_vp': 10000.00,
+        'total_nominal': 12000.00,
+        'avp': 2000.00,
+        'notas': 'Versão inicial',
+        'version_created_at': datetime(2024, 1, 1)
+    }
+
+
+@pytest.mark.asyncio
+class TestRemeasurementChunked:
+    """Testes do job de remensuração em lotes (uma transação por lote)"""
+
+    async def _run(self, db_session, contracts, **kwargs):
+        from tests.conftest import TestSessionLocal
+
+        with patch.object(EmailService, 'send_email', new_callable=AsyncMock) as mock_email:
+            mock_email.return_value = True
+            with patch.object(
+                RemeasurementService,
+                'get_contracts_for_remeasurement',
+                new_callable=AsyncMock
+            ) as mock_get_contracts:
+                mock_get_contracts.return_value = contracts
+                result = await RemeasurementService.run_remeasurement_job_chunked(
+                    db_session, session_factory=TestSessionLocal, max_workers=1, **kwargs
+                )
+            return result, mock_email
+
+    async def test_chunked_job_creates_version_and_notification(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        test_contract_with_version,
+        economic_index_old,
+        economic_index_new
+    ):
+        """Lote gravado em uma transação; email enviado após o commit"""
+        contract = monthly_contract_dict(test_contract_with_version, test_user)
+        result, mock_email = await self._run(db_session, [contract])
+
+        assert result['errors'] == []
+        assert result['mode'] == 'chunked'
+        assert result['chunks'] == 1
+        assert result['contracts_remeasured'] == 1
+        assert result['contracts_per_second'] is not None
+        assert mock_email.await_count == 1
+
+        version = await db_session.execute(
+            text("""
+                SELECT version_number, resultados_json FROM contract_versions
+                WHERE contract_id = :id ORDER BY version_number DESC LIMIT 1
+            """),
+            {"id": contract['contract_id']}
+        )
+        version_number, resultados_json = version.fetchone()
+        resultados = json.loads(resultados_json)
+        assert version_number == 2
+        assert len(resultados['contabilizacao']) == 13
+        assert resultados['remeasurement_info']['new_value'] == 6.0
+
+    async def test_failed_chunk_is_rolled_back(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        test_contract_with_version,
+        economic_index_old,
+        economic_index_new
+    ):
+        """Falha em um lote desfaz só esse lote (versão duplicada no segundo)"""
+        contract = monthly_contract_dict(test_contract_with_version, test_user)
+        result, _ = await self._run(
+            db_session, [contract, dict(contract)], chunk_size=1, max_connections=1
+        )
+
+        assert result['chunks'] == 2
+        assert result['contracts_remeasured'] == 1
+        assert len(result['errors']) == 1
+
+        notifications = await db_session.execute(
+            text("SELECT COUNT(*) FROM notifications WHERE entity_id = :id"),
+            {"id": contract['contract_id'].replace('-', '')}
+        )
+        assert notifications.scalar() == 1
+
+    async def test_bulk_insert_assigns_version_numbers(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        test_contract_with_version
+    ):
+        """INSERT multi-row numera o lote inteiro e devolve os IDs na ordem"""
+        contract = monthly_contract_dict(test_contract_with_version, test_user)
+        new_values = RemeasurementService.compute_new_values(contract, 6.0, date(2024, 6, 1))
+        item = {
+            'contract': contract,
+            'new_values': new_values,
+            'new_index_value': 6.0,
+            'index_type': 'igpm',
+            'periodicidade': 'mensal',
+        }
+
+        with patch.object(RemeasurementService, 'BULK_INSERT_ROWS', 2):
+            created = await RemeasurementService.create_remeasured_versions_bulk(
+                db_session, [item, item, item]
+            )
+        await db_session.commit()
+
+        assert [v['version_number'] for v in created] == [2, 3, 4]
+        assert [v['version_id'] for v in created] == ['IDOT2-0001', 'IDOT3-0001', 'IDOT4-0001']
+
+        rows = await db_session.execute(
+            text("""
+                SELECT version_number, despesa_mes1, total_juros, data_fim
+                FROM contract_versions WHERE contract_id = :id ORDER BY version_number
+            """),
+            {"id": contract['contract_id']}
+        )
+        rows = rows.fetchall()
+        assert [r[0] for r in rows] == [1, 2, 3, 4]
+
+        # Resumo da contabilização gravado nas colunas da versão
+        resumo = new_values['resumo']
+        assert rows[1][1] == pytest.approx(resumo['despesa_mes1'])
+        assert rows[1][2] == pytest.approx(resumo['total_juros'])
+        assert str(rows[1][3]) == '2025-01-01'
+
+        # Cronograma de cada versão criada gravado em contract_schedule_rows
+        schedule = await db_session.execute(
+            text("""
+                SELECT version_id, COUNT(*), SUM(juros), MAX(data)
+                FROM contract_schedule_rows GROUP BY version_id
+            """)
+        )
+        schedule = {r[0]: r for r in schedule.fetchall()}
+        assert {v['id'] for v in created} <= set(schedule)
+        for version in created:
+            assert schedule[version['id']][1] == len(new_values['cronograma'])
+            assert schedule[version['id']][2] == pytest.approx(resumo['total_juros'])
+
+    async def test_compute_chunk_reports_errors(self):
+        """Erro de cálculo em um contrato não interrompe o lote"""
+        from app.services.remeasurement_service import _compute_chunk
+
+        valid = {
+            'parcela_inicial': 1000.0, 'prazo_meses': 12, 'carencia_meses': 0,
+            'taxa_desconto_anual': 10.0, 'reajuste_valor': 5.0, 'data_inicio': date(2024, 1, 1),
+        }
+        computed = _compute_chunk([(valid, 6.0), ({**valid, 'prazo_meses': 0}, 6.0)], date(2024, 6, 1))
+
+        assert computed[0][1] is None
+        assert computed[0][0]['nova_parcela'] == pytest.approx(1200.0)
+        assert computed[1][0] is None and computed[1][1]
+
+    async def test_compute_chunk_rejects_nan_results(self):
+        """NaN nos resultados vira erro do contrato (jsonb não aceita NaN)"""
+        from app.services.remeasurement_service import _compute_chunk
+
+        def compute(contract, new_index_value, reference_date):
+            return {'nova_parcela': 1.0, 'resultados': {'vp': contract['vp']}}
+
+        with patch.object(RemeasurementService, 'compute_new_values', side_effect=compute):
+            computed = _compute_chunk(
+                [({'vp': 1.0}, 6.0), ({'vp': float('nan')}, 6.0)], date(2024, 6, 1)
+            )
+
+        assert computed[0] == ({'nova_parcela': 1.0, 'resultados': '{"vp": 1.0}'}, None)
+        assert computed[1][0] is None and computed[1][1]
+
+    async def test_merge_resultados_json(self):
+        """resultados_json serializado é decodificado e mesclado como objeto"""
+        info = {'index_type': 'igpm'}
+
+        merged = RemeasurementService._merge_resultados_json('{"vp": 1.0}', info)
+        assert json.loads(merged) == {'vp': 1.0, 'remeasurement_info': info}
+        assert json.loads(RemeasurementService._merge_resultados_json({}, info)) == {
+            'remeasurement_info': info
+        }
+
+        for invalido in ('null', '[1, 2]', '{"vp": 1.0} {"x": 2}', '{"vp": 1.0}}'):
+            with pytest.raises(ValueError):
+                RemeasurementService._merge_resultados_json(invalido, info)
+        with pytest.raises(ValueError):
+            RemeasurementService._merge_resultados_json({'vp': float('inf')}, info)
+
+
+# =============================================================================
+# TESTES DO MODO STREAMING (KEYSET + CHECKPOINT)
+# =============================================================================
+
+@pytest.mark.asyncio
+class TestRemeasurementStreaming:
+    """Testes do job paginado por keyset com checkpoint"""
+
+    def _contracts(self, total):
+        """Contratos anuais fora do mês de reajuste (analisados e ignorados)"""
+        mes_reajuste = datetime.utcnow().month % 12 + 1
+        return [
+            {
+                'contract_id': f"00000000-0000-0000-0000-{i:012d}",
+                'reajuste_tipo': 'igpm',
+                'reajuste_periodicidade': 'anual',
+                'mes_reajuste': mes_reajuste,
+                'version_created_at': datetime(2024, 1, 1),
+            }
+            for i in range(1, total + 1)
+        ]
+
+    def _pager(self, contracts, fail_after=None):
+        """Simula get_contracts_for_remeasurement com keyset"""
+        calls = []
+
+        async def get_page(db, after_contract_id=None, limit=None, index_types=None):
+            calls.append(after_contract_id)
+            if fail_after is not None and len(calls) > fail_after:
+                raise RuntimeError("conexão perdida")
+            page = [c for c in contracts if after_contract_id is None or c['contract_id'] > after_contract_id]
+            return page[:limit] if limit else page
+
+        return get_page, calls
+
+    async def _run(self, db_session, get_page, **kwargs):
+        from tests.conftest import TestSessionLocal
+
+        with patch.object(RemeasurementService, 'get_contracts_for_remeasurement', side_effect=get_page):
+            return await RemeasurementService.run_remeasurement_job_chunked(
+                db_session, session_factory=TestSessionLocal, max_workers=1, **kwargs
+            )
+
+    async def test_streaming_walks_pages_and_completes_checkpoint(self, db_session: AsyncSession):
+        """Páginas por keyset; checkpoint concluído ao final"""
+        contracts = self._contracts(5)
+        get_page, calls = self._pager(contracts)
+        result = await self._run(db_session, get_page, page_size=2)
+
+        assert result['mode'] == 'streaming'
+        assert result['pages'] == 3
+        assert result['contracts_analyzed'] == 5
+        assert result['contracts_skipped'] == 5
+        assert 'remeasurements' not in result
+        assert calls == [None, contracts[1]['contract_id'], contracts[3]['contract_id']]
+
+        checkpoint = (await db_session.execute(select(RemeasurementCheckpoint))).scalar_one()
+        assert checkpoint.status == 'completed'
+        assert checkpoint.last_contract_id == contracts[-1]['contract_id']
+        assert checkpoint.contracts_analyzed == 5
+
+    async def test_interrupted_run_resumes_from_checkpoint(self, db_session: AsyncSession):
+        """Falha na segunda página; a próxima execução continua da primeira"""
+        contracts = self._contracts(5)
+        get_page, _ = self._pager(contracts, fail_after=1)
+        interrupted = await self._run(db_session, get_page, page_size=2)
+        assert any("conexão perdida" in e for e in interrupted['errors'])
+
+        checkpoint = (await db_session.execute(select(RemeasurementCheckpoint))).scalar_one()
+        assert checkpoint.status == 'running'
+        assert checkpoint.last_contract_id == contracts[1]['contract_id']
+
+        get_page, calls = self._pager(contracts)
+        resumed = await self._run(db_session, get_page, page_size=2)
+
+        assert resumed['resumed_from'] == contracts[1]['contract_id']
+        assert calls[0] == contracts[1]['contract_id']
+        assert resumed['contracts_analyzed'] == 5
+        assert resumed['pages'] == 3
+
+        await db_session.refresh(checkpoint)
+        assert checkpoint.status == 'completed'
+
+    async def test_failed_chunk_holds_checkpoint_for_resume(self, db_session: AsyncSession):
+        """Lote com falha de gravação: o checkpoint para antes dele e a retomada o reavalia"""
+        contracts = self._contracts(5)
+        failing_id = contracts[3]['contract_id']
+
+        async def eligible(db, contract, index_cache=None):
+            return {'contract': contract, 'new_value': 6.0}
+
+        async def write_chunk(session_factory, chunk, computed, results):
+            return chunk[0]['contract']['contract_id'] != failing_id
+
+        get_page, _ = self._pager(contracts)
+        with patch.object(RemeasurementService, 'check_if_needs_remeasurement', side_effect=eligible), \
+                patch.object(RemeasurementService, '_write_chunk', side_effect=write_chunk):
+            await self._run(db_session, get_page, page_size=2, chunk_size=1)
+
+        checkpoint = (await db_session.execute(select(RemeasurementCheckpoint))).scalar_one()
+        assert checkpoint.status == 'running'
+        assert checkpoint.last_contract_id == contracts[2]['contract_id']
+
+        get_page, calls = self._pager(contracts)
+        with patch.object(RemeasurementService, 'check_if_needs_remeasurement', side_effect=eligible), \
+                patch.object(RemeasurementService, '_write_chunk', new_callable=AsyncMock, return_value=True):
+            resumed = await self._run(db_session, get_page, page_size=2, chunk_size=1)
+
+        assert resumed['resumed_from'] == contracts[2]['contract_id']
+        assert calls[0] == contracts[2]['contract_id']
+        await db_session.refresh(checkpoint)
+        assert checkpoint.status == 'completed'
+        assert checkpoint.last_contract_id == contracts[-1]['contract_id']
+
+
+# =============================================================================
+# TESTES DO DRY-RUN
+# =============================================================================
+
+@pytest.mark.asyncio
+class TestRemeasurementDryRun:
+    """Testes do dry-run (cálculo sem gravação)"""
+
+    async def test_dry_run_returns_diff_without_writing(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        test_contract_with_version,
+        economic_index_old,
+        economic_index_new
+    ):
+        """Diff por contrato e tempos por fase; nenhuma versão ou notificação gravada"""
+        contract = monthly_contract_dict(test_contract_with_version, test_user)
+
+        with patch.object(EmailService, 'send_email', new_callable=AsyncMock) as mock_email:
+            with patch.object(
+                RemeasurementService,
+                'get_contracts_for_remeasurement',
+                new_callable=AsyncMock
+            ) as mock_get_contracts:
+                mock_get_contracts.return_value = [contract]
+                result = await RemeasurementService.run_remeasurement_job(db_session, dry_run=True)
+
+        assert result['dry_run'] is True
+        assert result['errors'] == []
+        assert result['contracts_remeasured'] == 0
+        assert len(result['diffs']) == 1
+        assert set(result['timings_ms']) == {'fetch', 'index_lookup', 'calculation', 'write'}
+        assert result['timings_ms']['write'] == 0
+
+        diff = result['diffs'][0]
+        assert diff['contract_id'] == contract['contract_id']
+        assert diff['new_index_value'] == 6.0
+        assert diff['parcela'] == {'old': 1000.0, 'new': pytest.approx(1000.0 * 6.0 / 5.5, abs=0.01)}
+        assert diff['total_vp']['old'] == 10000.0
+        assert diff['total_vp']['new'] > 0
+        mock_email.assert_not_awaited()
+
+        versions = await db_session.execute(
+            text("SELECT COUNT(*) FROM contract_versions WHERE contract_id = :id"),
+            {"id": contract['contract_id']}
+        )
+        assert versions.scalar() == 1
+        notifications = await db_session.execute(select(Notification))
+        assert notifications.scalars().all() == []
+
+
+@pytest.mark.asyncio
+class TestRemeasurementForChanges:
+    """Testes da remensuração disparada pelo change set da sincronização com o BCB"""
+
+    async def test_index_types_from_changes(self):
+        """Tipos afetados derivados dos pares (index_type, reference_date)"""
+        change_set = {
+            ('ipca', datetime(2024, 1, 1)),
+            ('ipca', datetime(2024, 2, 1)),
+            ('IGPM', datetime(2024, 2, 1)),
+            ('desconhecido', datetime(2024, 2, 1)),
+        }
+
+        assert RemeasurementService.index_types_from_changes(change_set) == ['igpm', 'ipca']
+        assert RemeasurementService.index_types_from_changes(set()) == []
+
+    async def test_only_changed_index_types_are_loaded(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        test_contract_with_version,
+        economic_index_old,
+        economic_index_new
+    ):
+        """Contratos carregados apenas para os índices alterados"""
+        contract = monthly_contract_dict(test_contract_with_version, test_user)
+
+        with patch.object(EmailService, 'send_email', new_callable=AsyncMock) as mock_email:
+            mock_email.return_value = True
+            with patch.object(
+                RemeasurementService,
+                'get_contracts_for_remeasurement',
+                new_callable=AsyncMock
+            ) as mock_get_contracts:
+                mock_get_contracts.return_value = [contract]
+                result = await RemeasurementService.run_remeasurement_for_changes(
+                    db_session, {('igpm', datetime(2024, 6, 1))}
+                )
+
+        mock_get_contracts.assert_awaited_once_with(db_session, index_types=['igpm'])
+        assert result['index_types'] == ['igpm']
+        assert result['contracts_remeasured'] == 1
+
+    async def test_empty_change_set_skips_contract_query(self, db_session: AsyncSession):
+        """Sem índices alterados, nenhum contrato é consultado"""
+        contracts = await RemeasurementService.get_contracts_for_remeasurement(
+            db_session, index_types=[]
+        )
+        assert contracts == []
+
+        result = await RemeasurementService.run_remeasurement_for_changes(db_session, set())
+        assert result['index_types'] == []
+        assert result['contracts_analyzed'] == 0
+        assert result['errors'] == []
+
+
+# =============================================================================
+# VERSÃO CORRENTE DO CONTRATO (contracts.current_version_*)
+# =============================================================================
+
+@pytest.mark.asyncio
+class TestCurrentVersionPointer:
+    """Ponteiro para a versão mais recente mantido em contracts"""
+
+    async def _add_version(self, db_session, contract_id, version_number, total_vp):
+        version_id = str(uuid4())
+        await db_session.execute(
+            text("""
+                INSERT INTO contract_versions (
+                    id, contract_id, version_number, version_id, data_inicio, prazo_meses,
+                    parcela_inicial, taxa_desconto_anual, resultados_json,
+                    total_vp, total_nominal, avp
+                )
+                VALUES (
+                    :id, :contract_id, :version_number, :version_id, :data_inicio, 24,
+                    1000.00, 10.0, '{}', :total_vp, 24000.00, 2000.00
+                )
+            """),
+            {
+                "id": version_id,
+                "contract_id": contract_id,
+                "version_number": version_number,
+                "version_id": f"IDOT{version_number}-0001",
+                "data_inicio": date(2024, version_number, 1),
+                "total_vp": total_vp,
+            }
+        )
+        return version_id
+
+    async def _current(self, db_session, contract_id):
+        result = await db_session.execute(
+            text("""
+                SELECT current_version_id, current_version_number, current_total_vp,
+                       current_data_inicio, current_prazo_meses
+                FROM contracts WHERE id = :id
+            """),
+            {"id": contract_id}
+        )
+        return result.fetchone()
+
+    async def test_refresh_follows_latest_version(
+        self,
+        db_session: AsyncSession,
+        test_contract_with_version
+    ):
+        """Criar e excluir versões move o ponteiro; sem versões fica NULL"""
+        from app.repositories.contracts import ContractRepository
+
+        # No SQLite de testes o UUID do contrato é gravado em hexadecimal
+        contract_id = test_contract_with_version['contract'].id.hex
+        await self._add_version(db_session, contract_id, 1, 10000.00)
+        latest = await self._add_version(db_session, contract_id, 2, 9500.00)
+        await ContractRepository.refresh_current_version(db_session, [contract_id])
+
+        row = await self._current(db_session, contract_id)
+        assert str(row[0]) == latest
+        assert row[1] == 2
+        assert float(row[2]) == 9500.00
+        assert str(row[3]) == "2024-02-01"
+        assert row[4] == 24
+
+        await db_session.execute(
+            text("DELETE FROM contract_versions WHERE id = :id"), {"id": latest}
+        )
+        await ContractRepository.refresh_current_version(db_session, [contract_id])
+        row = await self._current(db_session, contract_id)
+        assert row[1] == 1
+        assert float(row[2]) == 10000.00
+
+        await db_session.execute(
+            text("DELETE FROM contract_versions WHERE contract_id = :id"), {"id": contract_id}
+        )
+        await ContractRepository.refresh_current_version(db_session, [contract_id])
+        row = await self._current(db_session, contract_id)
+        assert row[0] is None
+        assert row[1] is None
+
+    async def test_refresh_without_contracts_is_noop(self, db_session: AsyncSession):
+        """Lista vazia não executa o UPDATE"""
+        from app.repositories.contracts import ContractRepository
+
+        await ContractRepository.refresh_current_version(db_session, [])
+
+
+class TestCreateVersionSchedule:
+    """Resumo e cronograma gravados por POST /api/contracts/{id}/versions"""
+
+    def _payload(self, contabilizacao):
+        from app.routers.contracts import ContractVersionCreate
+
+        return ContractVersionCreate(
+            data_inicio="2024-01-01",
+            prazo_meses=2,
+            parcela_inicial=1000.0,
+            taxa_desconto_anual=10.0,
+            resultados_json={'contabilizacao': contabilizacao},
+            total_vp=1980.0,
+            total_nominal=2000.0,
+            avp=20.0,
+        )
+
+    async def _create(self, db_session, contract, contabilizacao):
+        from types import SimpleNamespace
+        from app.routers.contracts import create_version
+
+        # No SQLite de testes os UUIDs são gravados em hexadecimal
+        user = SimpleNamespace(id=contract.user_id.hex)
+        try:
+            await create_version(
+                contract_id=contract.id.hex,
+                data=self._payload(contabilizacao),
+                user_data={"user": user},
+                db=db_session,
+            )
+        except AttributeError:
+            # SQLite devolve created_at do RETURNING como texto; a versão já foi gravada
+            pass
+
+        result = await db_session.execute(
+            text("""
+                SELECT id FROM contract_versions
+                WHERE contract_id = :contract_id
+                ORDER BY version_number DESC LIMIT 1
+            """),
+            {"contract_id": contract.id.hex}
+        )
+        return result.scalar()
+
+    async def test_non_numeric_summary_value_is_stored_as_null(
+        self,
+        db_session: AsyncSession,
+        test_contract_with_version
+    ):
+        """Valor como "1.234,56" não derruba a criação: resumo fica NULL"""
+        contract = test_contract_with_version['contract']
+        contabilizacao = [
+            {'mes': 0, 'passivoFinal': 1980.0},
+            {'mes': 1, 'juros': 16.0, 'pagamento': 1000.0, 'despTotal': "1.234,56"},
+        ]
+
+        version_id = await self._create(db_session, contract, contabilizacao)
+
+        result = await db_session.execute(
+            text("""
+                SELECT despesa_mes1, total_juros, data_fim
+                FROM contract_versions WHERE id = :id
+            """),
+            {"id": version_id}
+        )
+        row = result.fetchone()
+        assert row[0] is None
+        assert row[1] is None
+        assert str(row[2]) == "2024-03-01"
+
+    async def test_duplicated_and_malformed_schedule_rows(
+        self,
+        db_session: AsyncSession,
+        test_contract_with_version
+    ):
+        """Meses repetidos ou ausentes não violam a chave (version_id, mes)"""
+        contract = test_contract_with_version['contract']
+        contabilizacao = [
+            {'mes': 0, 'passivoFinal': 1980.0},
+            {'mes': 1, 'juros': 16.0, 'pagamento': 1000.0},
+            {'mes': 1, 'juros': 17.0, 'pagamento': 1000.0},
+            {'juros': 9.0},
+            {'mes': None, 'juros': 9.0},
+            {'mes': 2, 'juros': 8.0, 'pagamento': 1000.0},
+        ]
+
+        version_id = await self._create(db_session, contract, contabilizacao)
+        assert version_id is not None
+
+        result = await db_session.execute(
+            text("""
+                SELECT mes, juros FROM contract_schedule_rows
+                WHERE version_id = :id ORDER BY mes
+            """),
+            {"id": version_id}
+        )
+        assert [tuple(row) for row in result.fetchall()] == [(0, 0.0), (1, 17.0), (2, 8.0)]
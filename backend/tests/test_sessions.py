@@ -795,3 +795,207 @@ async def test_concurrent_logins_handle_race_conditions(
     )
     active_sessions = result.scalars().all()
     assert len(active_sessions) == 2
+
+
+# =============================================================================
+# TESTES DE HEARTBEAT EM LOTE (WRITE-BEHIND)
+# =============================================================================
+
+@pytest.mark.asyncio
+async def test_authenticated_request_buffers_last_activity(
+    client: AsyncClient,
+    basic_user: User,
+    db_session: AsyncSession
+):
+    """Requisições autenticadas não gravam last_activity; o flush grava em lote"""
+    from tests.conftest import TestSessionLocal
+    from app.services.session_activity import session_activity_buffer
+
+    from app.auth import create_user_token
+
+    now = datetime.utcnow()
+    session = UserSession(
+        user_id=basic_user.id,
+        session_token=str(uuid4()),
+        last_activity=now - timedelta(minutes=10),
+        expires_at=now + timedelta(hours=24),
+        is_active=True
+    )
+    db_session.add(session)
+    await db_session.commit()
+    auth_token = create_user_token(
+        basic_user.id, basic_user.email, session_token=session.session_token
+    )
+    last_activity_before = session.last_activity
+
+    for _ in range(3):
+        response = await client.get(
+            "/api/notifications",
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        assert response.status_code == 200
+
+    # Atividade pendente no buffer, banco inalterado
+    pending = session_activity_buffer.last_activity(session.id)
+    assert pending is not None
+    await db_session.refresh(session)
+    assert session.last_activity == last_activity_before
+
+    # Flush grava a atividade mais recente
+    assert await session_activity_buffer.flush(TestSessionLocal) >= 1
+    assert session_activity_buffer.last_activity(session.id) is None
+    await db_session.refresh(session)
+    assert session.last_activity.replace(tzinfo=None) == pending
+
+
+@pytest.mark.asyncio
+async def test_activity_buffer_coalesces_and_never_regresses(
+    db_session: AsyncSession,
+    basic_user: User
+):
+    """Várias atividades viram uma escrita; o flush não retrocede last_activity"""
+    from tests.conftest import TestSessionLocal
+    from app.services.session_activity import SessionActivityBuffer
+
+    now = datetime.utcnow()
+    recent = UserSession(
+        user_id=basic_user.id,
+        session_token=str(uuid4()),
+        last_activity=now - timedelta(minutes=10),
+        expires_at=now + timedelta(hours=24),
+        is_active=True
+    )
+    newer_in_db = UserSession(
+        user_id=basic_user.id,
+        session_token=str(uuid4()),
+        last_activity=now,
+        expires_at=now + timedelta(hours=24),
+        is_active=True
+    )
+    db_session.add_all([recent, newer_in_db])
+    await db_session.commit()
+
+    buffer = SessionActivityBuffer(flush_interval_seconds=60)
+    for minutes in (5, 1, 3):
+        buffer.record(recent.id, now - timedelta(minutes=minutes))
+    buffer.record(newer_in_db.id, now - timedelta(minutes=5))
+    assert buffer.pending_count() == 2
+    assert buffer.last_activity(recent.id) == now - timedelta(minutes=1)
+
+    assert await buffer.flush(TestSessionLocal) == 2
+    assert buffer.pending_count() == 0
+    assert await buffer.flush(TestSessionLocal) == 0
+
+    await db_session.refresh(recent)
+    await db_session.refresh(newer_in_db)
+    assert recent.last_activity.replace(tzinfo=None) == now - timedelta(minutes=1)
+    assert newer_in_db.last_activity.replace(tzinfo=None) == now
+
+
+# =============================================================================
+# TESTES DO CACHE DE VALIDAÇÃO (USUÁRIO/SESSÃO)
+# =============================================================================
+
+async def _create_session_token(db_session: AsyncSession, user: User) -> tuple:
+    """Cria sessão ativa direto no banco e retorna (sessão, JWT)"""
+    from app.auth import create_user_token
+
+    now = datetime.utcnow()
+    session = UserSession(
+        user_id=user.id,
+        session_token=str(uuid4()),
+        last_activity=now,
+        expires_at=now + timedelta(hours=24),
+        is_active=True
+    )
+    db_session.add(session)
+    await db_session.commit()
+    return session, create_user_token(user.id, user.email, session_token=session.session_token)
+
+
+@pytest.mark.asyncio
+async def test_auth_cache_serves_repeated_requests(
+    client: AsyncClient,
+    basic_user: User,
+    db_session: AsyncSession
+):
+    """Requisições seguintes da mesma sessão são validadas pelo cache"""
+    from app.services.auth_cache import auth_session_cache
+
+    _, auth_token = await _create_session_token(db_session, basic_user)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    response = await client.get("/api/notifications", headers=headers)
+    assert response.status_code == 200
+
+    hits_before = auth_session_cache.hits
+    for _ in range(3):
+        response = await client.get("/api/notifications", headers=headers)
+        assert response.status_code == 200
+
+    # Usuário e sessão vêm do cache em cada requisição
+    assert auth_session_cache.hits - hits_before == 6
+
+
+@pytest.mark.asyncio
+async def test_auth_cache_invalidated_by_terminate_session(
+    client: AsyncClient,
+    basic_user: User,
+    db_session: AsyncSession
+):
+    """Sessão encerrada perde acesso imediatamente, mesmo em cache"""
+    session, auth_token = await _create_session_token(db_session, basic_user)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    assert (await client.get("/api/notifications", headers=headers)).status_code == 200
+
+    response = await client.post(
+        f"/api/auth/sessions/terminate?session_token={session.session_token}",
+        headers=headers
+    )
+    assert response.status_code == 200
+
+    response = await client.get("/api/notifications", headers=headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_auth_cache_invalidated_by_user_update(
+    client: AsyncClient,
+    basic_user: User,
+    db_session: AsyncSession
+):
+    """Alteração do usuário pelo ORM (ex.: desativação) invalida o cache"""
+    _, auth_token = await _create_session_token(db_session, basic_user)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    assert (await client.get("/api/notifications", headers=headers)).status_code == 200
+
+    basic_user.is_active = False
+    await db_session.commit()
+
+    response = await client.get("/api/notifications", headers=headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_auth_cache_invalidated_by_admin_user_update(
+    client: AsyncClient,
+    basic_user: User,
+    admin_token: str,
+    db_session: AsyncSession
+):
+    """Desativação pelo admin bloqueia o usuário imediatamente"""
+    _, auth_token = await _create_session_token(db_session, basic_user)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    assert (await client.get("/api/notifications", headers=headers)).status_code == 200
+
+    response = await client.put(
+        f"/api/admin/users/{basic_user.id}?is_active=false",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+
+    response = await client.get("/api/notifications", headers=headers)
+    assert response.status_code == 401
@@ -641,6 +641,261 @@ class TestValidationLogs:
         assert len(logs) >= 3
 
 
+# ============================================================
+# TESTES DE GRAVAÇÃO EM LOTE DOS LOGS
+# ============================================================
+
+class TestValidationLogWriter:
+    """Testes da gravação em lote dos logs de validação"""
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_queued_logs_in_batches(
+        self, sample_license: License, db_session: AsyncSession
+    ):
+        """Teste: Logs enfileirados são gravados em lotes no flush"""
+        from tests.conftest import TestSessionLocal
+        from app.services.validation_log_writer import ValidationLogWriter
+
+        writer = ValidationLogWriter(batch_size=2, flush_interval_ms=500, max_buffer=10)
+        for i in range(5):
+            assert writer.enqueue(
+                license_key=sample_license.key.lower(),
+                success=i % 2 == 0,
+                machine_id=f"machine-{i}"
+            )
+        assert writer.pending_count() == 5
+
+        assert await writer.flush(TestSessionLocal) == 5
+        assert writer.pending_count() == 0
+
+        result = await db_session.execute(
+            select(ValidationLog)
+            .where(ValidationLog.license_key == sample_license.key)
+            .order_by(ValidationLog.timestamp)
+        )
+        logs = result.scalars().all()
+        assert [log.machine_id for log in logs] == [f"machine-{i}" for i in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_buffer_is_bounded(self):
+        """Teste: Fila cheia descarta novos logs"""
+        from app.services.validation_log_writer import ValidationLogWriter
+
+        writer = ValidationLogWriter(batch_size=10, flush_interval_ms=500, max_buffer=3)
+        accepted = [writer.enqueue(license_key="KEY", success=True) for _ in range(5)]
+
+        assert accepted == [True, True, True, False, False]
+        assert writer.pending_count() == 3
+        assert writer.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_invalid_record_does_not_drop_batch(
+        self, sample_license: License, db_session: AsyncSession
+    ):
+        """Teste: Registro inválido é descartado sozinho, o resto do lote é gravado"""
+        from tests.conftest import TestSessionLocal
+        from app.services.validation_log_writer import ValidationLogWriter
+
+        writer = ValidationLogWriter(batch_size=10, flush_interval_ms=500, max_buffer=10)
+        for i in range(3):
+            writer.enqueue(license_key=sample_license.key, success=True, machine_id=f"m-{i}")
+        writer._buffer[1]["success"] = None  # viola NOT NULL
+
+        assert await writer.flush(TestSessionLocal) == 2
+        assert writer.failed == 1
+
+        result = await db_session.execute(
+            select(ValidationLog).where(ValidationLog.license_key == sample_license.key)
+        )
+        assert sorted(log.machine_id for log in result.scalars().all()) == ["m-0", "m-2"]
+
+    @pytest.mark.asyncio
+    async def test_validation_enqueues_log_when_writer_running(
+        self, client: AsyncClient, sample_license: License, db_session: AsyncSession,
+        monkeypatch
+    ):
+        """Teste: Com a gravação em segundo plano ativa, a validação só enfileira o log"""
+        from tests.conftest import TestSessionLocal
+        from app.services.validation_log_writer import validation_log_writer
+        from app.routers.licenses import limiter
+
+        limiter.reset()  # rate limit de 30/min acumulado pelos testes anteriores
+        monkeypatch.setattr(validation_log_writer, "flush_interval_ms", 60_000)
+        validation_log_writer.start()
+        try:
+            response = await client.post(
+                "/api/validate-license",
+                json={"key": sample_license.key, "machine_id": "queued-machine"}
+            )
+            assert response.status_code == 200
+            assert validation_log_writer.pending_count() == 1
+
+            result = await db_session.execute(
+                select(ValidationLog).where(ValidationLog.machine_id == "queued-machine")
+            )
+            assert result.scalars().all() == []
+
+            assert await validation_log_writer.flush(TestSessionLocal) == 1
+        finally:
+            await validation_log_writer.stop()
+
+        result = await db_session.execute(
+            select(ValidationLog).where(ValidationLog.machine_id == "queued-machine")
+        )
+        log = result.scalar_one()
+        assert log.success is True
+        assert log.license_key == sample_license.key
+
+
+# ============================================================
+# TESTES DE TOKENS DE LICENÇA ASSINADOS
+# ============================================================
+
+class TestSignedLicenseToken:
+    """Testes do token de licença Ed25519 verificável sem o banco"""
+
+    @pytest.fixture(autouse=True)
+    def _reset_state(self):
+        from app.routers.licenses import limiter
+        from app.services.license_token_service import license_revocations
+
+        limiter.reset()
+        license_revocations._keys.clear()
+        license_revocations._local.clear()
+        yield
+        license_revocations._keys.clear()
+        license_revocations._local.clear()
+
+    async def _license_token(self, client: AsyncClient, license: License) -> str:
+        response = await client.post(
+            "/api/validate-license",
+            json={"key": license.key, "machine_id": "signed-machine"}
+        )
+        assert response.status_code == 200
+        token = response.json()["license_token"]
+        assert token.startswith("lic1.")
+        return token
+
+    @pytest.mark.asyncio
+    async def test_check_license_with_signed_token_skips_database(
+        self, client: AsyncClient, sample_license: License, db_session: AsyncSession
+    ):
+        """Teste: check-license com token assinado não consulta a licença no banco"""
+        token = await self._license_token(client, sample_license)
+
+        # Sem a licença no banco o token continua válido até expirar
+        await db_session.delete(sample_license)
+        await db_session.commit()
+
+        response = await client.post(
+            "/api/check-license",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["valid"] is True
+        assert data["status"] == "active"
+
+    @pytest.mark.asyncio
+    async def test_token_claims_and_tampering(
+        self, client: AsyncClient, sample_license: License
+    ):
+        """Teste: Token carrega tipo, ativações e expiração; alteração invalida a assinatura"""
+        import base64
+        import json
+        from app.services.license_token_service import license_token_service
+
+        token = await self._license_token(client, sample_license)
+        claims = license_token_service.verify(token)
+        assert claims["key"] == sample_license.key
+        assert claims["type"] == sample_license.license_type.value
+        assert claims["max_activations"] == sample_license.max_activations
+        assert claims["machine_id"] == "signed-machine"
+
+        prefix, body, signature = token.split(".")
+        forged = dict(claims, max_activations=99)
+        forged_body = base64.urlsafe_b64encode(
+            json.dumps(forged, separators=(",", ":"), sort_keys=True).encode()
+        ).rstrip(b"=").decode()
+        forged_token = f"{prefix}.{forged_body}.{signature}"
+
+        assert license_token_service.verify(forged_token) is None
+        response = await client.post(
+            "/api/check-license",
+            headers={"Authorization": f"Bearer {forged_token}"}
+        )
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_token_expires_with_ttl_or_license(self, sample_license: License):
+        """Teste: Token expira no TTL ou na expiração da licença, o que vier primeiro"""
+        from app.services.license_token_service import license_token_service
+
+        now = datetime.utcnow()
+        token = license_token_service.issue(sample_license, now=now)
+        ttl = timedelta(hours=license_token_service.ttl_hours)
+        assert license_token_service.verify(token, now=now + ttl - timedelta(minutes=1))
+        assert license_token_service.verify(token, now=now + ttl) is None
+
+        sample_license.expires_at = now + timedelta(hours=1)
+        token = license_token_service.issue(sample_license, now=now)
+        assert license_token_service.verify(token, now=now + timedelta(hours=2)) is None
+
+    @pytest.mark.asyncio
+    async def test_admin_revocation_invalidates_issued_tokens(
+        self, client: AsyncClient, sample_license: License, admin_token: str
+    ):
+        """Teste: Revogação pelo admin invalida tokens já emitidos sem esperar o refresh"""
+        token = await self._license_token(client, sample_license)
+
+        response = await client.post(
+            "/api/admin/revoke-license",
+            json={"key": sample_license.key, "reason": "Teste"},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 200
+
+        response = await client.post(
+            "/api/check-license",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        assert response.json()["valid"] is False
+
+    @pytest.mark.asyncio
+    async def test_revocation_list_refresh_and_signature(
+        self, client: AsyncClient, sample_license: License,
+        revoked_license: License, suspended_license: License, db_session: AsyncSession
+    ):
+        """Teste: Lista de revogação vem do banco e é assinada com a chave dos tokens"""
+        import base64
+        import json
+        from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+        from app.services.license_token_service import license_revocations
+
+        assert await license_revocations.refresh(db_session) == 2
+
+        key_response = await client.get("/api/license-public-key")
+        assert key_response.status_code == 200
+        response = await client.get("/api/license-revocations")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["keys"] == sorted([revoked_license.key, suspended_license.key])
+        assert data["kid"] == key_response.json()["kid"]
+
+        def b64decode(value: str) -> bytes:
+            return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+        public_key = Ed25519PublicKey.from_public_bytes(
+            b64decode(key_response.json()["public_key"])
+        )
+        signed = json.dumps(
+            {"issued_at": data["issued_at"], "keys": data["keys"]},
+            separators=(",", ":"), sort_keys=True
+        ).encode()
+        public_key.verify(b64decode(data["signature"]), signed)
+
+
 # ============================================================
 # TESTES DE FLUXO COMPLETO
 # ============================================================